@@ -0,0 +1,442 @@
+import asyncio
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import websockets
+from adapters.http_client import ConditionalGet, NOT_MODIFIED
+from adapters.scheduler import SongScheduler, parse_start
+from adapters.listeners import append_sample, listen_coalesced
+from adapters.schema import compile_schema, get_path
+from record import Record
+import codec
+import logger
+import metrics
+
+# Záznam ešte neprešiel validáciou (None znamená platný záznam)
+UNCHECKED = object()
+TRANSPORTS = {"song": ("poll", "webhook"), "listeners": ("poll", "ws", "webhook")}
+# Polia song sekcie, bez ktorých worker nevie detegovať a vypísať skladbu
+SONG_REQUIRED = ("change_keys", "display")
+# radio_name je časť ciest v spool/ a data/ aj R2 kľúča bronze/<RADIO>/...
+RADIO_NAME = re.compile(r"[A-Z0-9_-]+")
+# Voliteľné intervaly stanice v sekundách (stations.json aj PATCH admin API)
+INTERVAL_FIELDS = ("song_interval", "listeners_interval", "upload_interval")
+# WebSocket listeners: "sample" = jeden rámec za interval, "coalesce" = zlučovanie všetkých rámcov
+LISTENERS_MODES = ("sample", "coalesce")
+# Ako dlho stop() čaká na dokončenie zrušeného WebSocket tasku pred zápisom posledných rámcov
+WS_STOP_TIMEOUT = 5
+
+
+def load_stations(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_stations(path, stations):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(stations, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def check_station(station):
+    """Overí konfiguráciu stanice pred spustením, pri chybe vyhodí ValueError s názvom poľa."""
+    if not isinstance(station, dict):
+        raise ValueError("stanica: nie je objekt")
+    if not isinstance(station.get("radio_name"), str) or not station["radio_name"]:
+        raise ValueError("radio_name: chýba")
+    if not RADIO_NAME.fullmatch(station["radio_name"]):
+        raise ValueError(f"radio_name: očakávané {RADIO_NAME.pattern}")
+    check_intervals(station)
+    if "listeners_mode" in station and station["listeners_mode"] not in LISTENERS_MODES:
+        raise ValueError(f"listeners_mode: očakávaný {' | '.join(LISTENERS_MODES)}")
+    for typ, transports in TRANSPORTS.items():
+        config = station.get(typ)
+        if not isinstance(config, dict):
+            raise ValueError(f"{typ}: chýba")
+        if config.get("transport") not in transports:
+            raise ValueError(f"{typ}.transport: očakávaný {' | '.join(transports)}")
+        if config["transport"] != "webhook" and not config.get("url"):
+            raise ValueError(f"{typ}.url: chýba")
+        if config["transport"] == "webhook":
+            port = config.get("port")
+            if not isinstance(port, int) or isinstance(port, bool) or not 0 < port < 65536:
+                raise ValueError(f"{typ}.port: očakávané číslo portu 1-65535")
+            if not is_paths(config.get("paths", [])):
+                raise ValueError(f"{typ}.paths: očakávaný zoznam ciest")
+        if typ == "listeners" and "count_key" in config and (
+                not isinstance(config["count_key"], str) or not config["count_key"]):
+            raise ValueError("listeners.count_key: očakávaný názov poľa")
+        if "schema" not in config:
+            raise ValueError(f"{typ}.schema: chýba")
+        try:
+            compile_schema(config["schema"])
+        except Exception as e:
+            raise ValueError(f"{typ}.schema: {e}") from e
+    song = station["song"]
+    for field in SONG_REQUIRED:
+        if field not in song:
+            raise ValueError(f"song.{field}: chýba")
+    if not is_paths(song["display"], non_empty=True):
+        raise ValueError("song.display: očakávaný neprázdny zoznam ciest")
+    # null = každá platná správa je nová skladba (webhook)
+    if song["change_keys"] is not None and not is_paths(song["change_keys"], non_empty=True):
+        raise ValueError("song.change_keys: očakávaný neprázdny zoznam ciest alebo null")
+    # start_time: alternatívy, každá je zoznam ciest pre parse_start (napr. [["time", "date"], ["last_update"]])
+    start_time = song.get("start_time", [])
+    if not isinstance(start_time, list) or not all(is_paths(paths, non_empty=True) for paths in start_time):
+        raise ValueError("song.start_time: očakávaný zoznam zoznamov ciest")
+
+
+def is_paths(value, non_empty=False):
+    """Zoznam neprázdnych reťazcov (bodkové cesty alebo URL cesty webhooku)."""
+    if not isinstance(value, list) or (non_empty and not value):
+        return False
+    return all(isinstance(path, str) and path for path in value)
+
+
+def check_intervals(fields):
+    """Overí intervaly a song_bounds ([min, max], null = fixný poll), ostatné polia ignoruje."""
+    for field, value in fields.items():
+        if field == "song_bounds":
+            if value is None:
+                continue
+            if not isinstance(value, list) or len(value) != 2:
+                raise ValueError("song_bounds: očakávané [min, max]")
+            values = value
+        elif field in INTERVAL_FIELDS:
+            values = [value]
+        else:
+            continue
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and v > 0 for v in values):
+            raise ValueError(f"{field}: očakávané kladné číslo")
+
+
+class StationWorker:
+    """
+    Generický worker jednej stanice riadený konfiguráciou zo stations.json.
+
+    Sekcie "song" a "listeners" určujú transport (poll / ws / webhook),
+    endpoint, schému, kľúče pre detekciu zmeny skladby a polia pre log.
+    """
+
+    def __init__(self, key, station, song_interval, listeners_interval, songs_cache, listeners_cache,
+                 song_bounds=None, listeners_mode="sample", listeners_rollup=None,
+                 song_sessions=None):
+        self.key = key
+        self.station = station
+        self.radio_name = station["radio_name"]
+        self.song_config = station["song"]
+        self.listeners_config = station["listeners"]
+        # Pole s počtom poslucháčov v správe, pre agregácie a log
+        self.count_key = self.listeners_config.get("count_key", "listeners")
+        self.song_interval = song_interval
+        self.listeners_interval = listeners_interval
+        self.songs_cache = songs_cache
+        self.listeners_cache = listeners_cache
+        # Voliteľné priebežné agregácie poslucháčov po oknách (rollup.ListenerRollup)
+        self.listeners_rollup = listeners_rollup
+        # Voliteľný súhrn poslucháčov za skladbu (rollup.SongSessionSummary)
+        self.song_sessions = song_sessions
+        # "sample" = jeden rámec za interval, "coalesce" = priebežné čítanie a zlučovanie rámcov
+        self.listeners_mode = listeners_mode
+        self.frames_coalesced = 0
+        # ListenerCoalescer bežiaceho listen_coalesced, stop() z neho zapíše posledné rámce
+        self.coalescer = None
+        self.current_song_id = None
+        self.last_song = None
+        self.last_change = None
+        self.last_change_at = None
+        self.last_invalid = None
+        self.last_listeners = None
+        self.running = True
+        # Prebudí čakajúce poll slučky pri stop()
+        self.wake = threading.Event()
+        self.ws_loop = None
+        self.ws_task = None
+        # Nastaví run_ws, keď zrušený ws_task naozaj skončil (stop() potom bezpečne vyberie coalescer)
+        self.ws_done = None
+        # Chráni ws_loop/ws_task medzi stop() a koncom run_ws (zatvorenie loopu)
+        self.ws_lock = threading.Lock()
+        self.song_request = ConditionalGet(self.song_config["url"]) if self.song_config["transport"] == "poll" else None
+        self.listeners_request = ConditionalGet(self.listeners_config["url"]) if self.listeners_config["transport"] == "poll" else None
+        # Bez hraníc sa polluje fixne každých song_interval sekúnd, s hranicami je song_interval
+        # interval pred prvou pozorovanou zmenou skladby
+        self.scheduler = SongScheduler(*(song_bounds or (song_interval, song_interval)), idle_interval=song_interval)
+        # Schémy sa kompilujú raz, validácia správy je potom len séria porovnaní
+        self.song_error = compile_schema(self.song_config["schema"])
+        self.listeners_error = compile_schema(self.listeners_config["schema"])
+
+    def log(self, song_session_id, msg, kind="info", level="info", **fields):
+        # Zápis robí vlákno loggera, tu sa udalosť len zaradí do fronty
+        logger.log(self.radio_name, song_session_id, msg, kind, level, **fields)
+
+    def is_new_song(self, data):
+        change_keys = self.song_config["change_keys"]
+        # Bez kľúčov (webhook) je každá platná správa nová skladba
+        if change_keys is None:
+            return True
+        change = tuple(get_path(data, path) for path in change_keys)
+        return self.last_change is None or change != self.last_change
+
+    def song_start(self, data):
+        for paths in self.song_config.get("start_time", []):
+            start = parse_start(*(get_path(data, path) for path in paths))
+            if start is not None:
+                return start
+        return None
+
+    def song_display(self, data):
+        values = []
+        for path in self.song_config["display"]:
+            value = get_path(data, path)
+            if value is None:
+                continue
+            values.append(", ".join(map(str, value)) if isinstance(value, list) else str(value))
+        return " | ".join(values)
+
+    def make_entry(self, data, now, error, song_session_id):
+        # Neplatný záznam nesie dôvod: prvé pole, ktoré nesplnilo schému
+        return Record(data, self.key, now, error is None, song_session_id, error)
+
+    def _append(self, typ, entry, final=False):
+        # Po stop() stanicu už zbiera iný proces, neskoro prijaté správy zahodíme;
+        # final = posledná vzorka, ktorú zapisuje samotný stop()
+        if not self.running and not final:
+            return
+        cache = self.songs_cache if typ == "song" else self.listeners_cache
+        cache.append(entry)
+        metrics.RECORDS.inc(station=self.radio_name, type=typ, valid="true" if entry.valid else "false")
+
+    def observe_listeners(self, data, now):
+        if not self.running:
+            return
+        count = data.get(self.count_key)
+        # Schéma nemusí typ počtu overovať, agregácie berú len celé čísla
+        if not isinstance(count, int) or isinstance(count, bool):
+            return
+        if self.listeners_rollup is not None:
+            self.listeners_rollup.add(count, now)
+        if self.song_sessions is not None:
+            self.song_sessions.add(count, now)
+
+    def _observe_handle(self, typ, start):
+        metrics.HANDLE_SECONDS.observe(time.perf_counter() - start, station=self.radio_name, type=typ)
+
+    def _poll_error(self, typ, e):
+        metrics.POLL_ERRORS.inc(station=self.radio_name, type=typ, exception=type(e).__name__)
+        self.log(self.current_song_id, f"Chyba {typ} poll: {e}", typ, "error")
+
+    def handle_song(self, data, now):
+        error = self.song_error(data)
+        is_valid = error is None
+        if is_valid:
+            self.last_invalid = None
+        if is_valid and self.is_new_song(data):
+            self.current_song_id = str(uuid.uuid4())
+            self.last_change_at = time.time()
+            metrics.SONG_CHANGES.inc(station=self.radio_name)
+            self.scheduler.observe_change(self.song_start(data), self.last_change_at)
+            if self.song_config["change_keys"] is not None:
+                self.last_change = tuple(get_path(data, path) for path in self.song_config["change_keys"])
+            last_song_path = self.song_config.get("last_song")
+            self.last_song = get_path(data, last_song_path) if last_song_path else data
+            self.log(self.current_song_id, f"Nový song: {self.song_display(data)}", "song")
+            if self.song_sessions is not None and self.running:
+                self.song_sessions.rotate(self.current_song_id, self.last_song, now)
+            self._append("song", self.make_entry(data, now, None, self.current_song_id))
+        elif not is_valid and self.song_config.get("record_invalid"):
+            self.last_invalid = (data, error)
+            self.log("", f"Chybný formát song: {error}", "song", "warning", error=error)
+            self._append("song", self.make_entry(data, now, error, ""))
+
+    def handle_unchanged_song(self, now):
+        # Rovnaká odpoveď ako minule: neplatnú odpoveď zapíšeme znova, platná nie je nový song
+        if self.last_invalid is not None:
+            data, error = self.last_invalid
+            self._append("song", self.make_entry(data, now, error, ""))
+
+    def handle_listeners(self, data, now, error=UNCHECKED):
+        if error is UNCHECKED:
+            error = self.listeners_error(data)
+        self.last_listeners = (data, error)
+        entry = self.make_entry(data, now, error, self.current_song_id if self.current_song_id else "")
+        listeners = data.get(self.count_key, "N/A") if isinstance(data, dict) else "N/A"
+        self.log(entry.song_session_id, f"Počet poslucháčov: {listeners}", "listeners", listeners=listeners)
+        self._append("listeners", entry)
+        if error is None:
+            self.observe_listeners(data, now)
+
+    def handle_unchanged_listeners(self, now):
+        # Nezmenená odpoveď - zapíšeme znova bez dekódovania a validácie
+        self.handle_listeners(self.last_listeners[0], now, self.last_listeners[1])
+
+    def _handle_response(self, typ, status, data, start):
+        now = time.time()
+        metrics.POLL_SECONDS.observe(time.perf_counter() - start, station=self.radio_name, type=typ)
+        metrics.HTTP_RESPONSES.inc(station=self.radio_name, type=typ, status=status)
+        start = time.perf_counter()
+        if data is NOT_MODIFIED:
+            getattr(self, f"handle_unchanged_{typ}")(now)
+        elif status == 200:
+            getattr(self, f"handle_{typ}")(data, now)
+        else:
+            self.log(self.current_song_id, f"Chyba HTTP {typ}: {status}", typ, "error", status=status)
+        self._observe_handle(typ, start)
+
+    def poll_song(self):
+        while self.running:
+            start = time.perf_counter()
+            try:
+                self._handle_response("song", *self.song_request.fetch(), start)
+            except Exception as e:
+                self._poll_error("song", e)
+            self.wake.wait(self.scheduler.next_delay(time.time()))
+
+    async def poll_song_async(self, session):
+        while self.running:
+            start = time.perf_counter()
+            try:
+                self._handle_response("song", *await self.song_request.fetch_async(session), start)
+            except Exception as e:
+                self._poll_error("song", e)
+            await asyncio.sleep(self.scheduler.next_delay(time.time()))
+
+    def poll_listeners(self):
+        while self.running:
+            start = time.perf_counter()
+            try:
+                self._handle_response("listeners", *self.listeners_request.fetch(), start)
+            except Exception as e:
+                self._poll_error("listeners", e)
+            self.wake.wait(self.listeners_interval)
+
+    async def poll_listeners_async(self, session):
+        while self.running:
+            start = time.perf_counter()
+            try:
+                self._handle_response("listeners", *await self.listeners_request.fetch_async(session), start)
+            except Exception as e:
+                self._poll_error("listeners", e)
+            await asyncio.sleep(self.listeners_interval)
+
+    async def listen_listeners(self):
+        url = self.listeners_config["url"]
+        reconnect_delay = self.listeners_config.get("reconnect_delay", 0) + self.listeners_interval
+        if self.listeners_mode == "coalesce":
+            await listen_coalesced(self, url, self.log, reconnect_delay=reconnect_delay)
+            return
+        while self.running:
+            try:
+                async with websockets.connect(url) as ws:
+                    while self.running:
+                        msg = await ws.recv(decode=False)
+                        now = time.time()
+                        start = time.perf_counter()
+                        try:
+                            self.handle_listeners(codec.loads(msg), now)
+                        except Exception as ex:
+                            metrics.POLL_ERRORS.inc(station=self.radio_name, type="listeners", exception=type(ex).__name__)
+                            self.log(self.current_song_id, f"Chyba parsovania listeners: {ex}", "listeners", "error")
+                        self._observe_handle("listeners", start)
+                        await asyncio.sleep(self.listeners_interval)
+            except Exception as e:
+                metrics.WS_RECONNECTS.inc(station=self.radio_name)
+                self.log(self.current_song_id, f"WebSocket chyba: {e}", "websocket", "error")
+                await asyncio.sleep(reconnect_delay)
+
+    def handle_webhook(self, typ, data):
+        now = time.time()
+        start = time.perf_counter()
+        getattr(self, f"handle_{typ}")(data, now)
+        self._observe_handle(typ, start)
+
+    def webhooks(self):
+        """Dvojice (typ, konfigurácia) pre sekcie s transportom webhook."""
+        return [
+            (typ, config)
+            for typ, config in (("song", self.song_config), ("listeners", self.listeners_config))
+            if config["transport"] == "webhook"
+        ]
+
+    async def run(self, session):
+        tasks = []
+        if self.song_config["transport"] == "poll":
+            tasks.append(self.poll_song_async(session))
+        if self.listeners_config["transport"] == "poll":
+            tasks.append(self.poll_listeners_async(session))
+        elif self.listeners_config["transport"] == "ws":
+            tasks.append(self.listen_listeners())
+        await asyncio.gather(*tasks)
+
+    def stop(self):
+        """
+        Zastaví poll slučky aj WebSocket, nové záznamy sa už do cache nezapíšu.
+        Zlúčené rámce WebSocketu od posledného tiku sa ešte zapíšu ako vzorka.
+        """
+        self.running = False
+        self.wake.set()
+        # Opakované volanie (pauza, potom odobratie) je bez účinku, loop už môže byť zatvorený
+        with self.ws_lock:
+            ws_done = self.ws_done
+            if self.ws_task is not None:
+                self.ws_loop.call_soon_threadsafe(self.ws_task.cancel)
+        # Čaká mimo zámku, run_ws ho po skončení tasku ešte potrebuje; rámec prijatý
+        # počas rušenia tak skončí v coalesceri pred jeho vyprázdnením, nie po ňom
+        if ws_done is not None:
+            ws_done.wait(WS_STOP_TIMEOUT)
+        # Rámce od posledného tiku samplera ešte patria tejto stanici, flush po stop() ich odošle
+        entry = self.coalescer.drain(self.key) if self.coalescer is not None else None
+        if entry is not None:
+            append_sample(self, entry, self.log, final=True)
+
+    def retune(self, song_interval=None, listeners_interval=None, song_bounds=None):
+        """Nové intervaly platia od najbližšieho čakania, bez reštartu workera."""
+        if song_interval is not None:
+            self.song_interval = song_interval
+        if listeners_interval is not None:
+            self.listeners_interval = listeners_interval
+        if song_bounds is not None or song_interval is not None:
+            self.scheduler.idle_interval = self.song_interval
+            min_interval, max_interval = song_bounds or (self.song_interval, self.song_interval)
+            self.scheduler.min_interval = min_interval
+            self.scheduler.max_interval = max(min_interval, max_interval)
+
+    def take_state(self, previous):
+        """Prevezme stav skladby od zastaveného workera tej istej stanice (pokračovanie po pauze)."""
+        self.current_song_id = previous.current_song_id
+        self.last_song = previous.last_song
+        self.last_change = previous.last_change
+        self.last_change_at = previous.last_change_at
+        self.last_invalid = previous.last_invalid
+        self.last_listeners = previous.last_listeners
+        self.scheduler.durations = previous.scheduler.durations
+        self.scheduler.track_start = previous.scheduler.track_start
+
+    def start(self):
+        if self.song_config["transport"] == "poll":
+            threading.Thread(target=self.poll_song, daemon=True).start()
+        if self.listeners_config["transport"] == "poll":
+            threading.Thread(target=self.poll_listeners, daemon=True).start()
+        elif self.listeners_config["transport"] == "ws":
+            def run_ws():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                done = threading.Event()
+                with self.ws_lock:
+                    self.ws_loop = loop
+                    self.ws_task = loop.create_task(self.listen_listeners())
+                    self.ws_done = done
+                with contextlib.suppress(asyncio.CancelledError):
+                    loop.run_until_complete(self.ws_task)
+                with self.ws_lock:
+                    self.ws_loop = None
+                    self.ws_task = None
+                loop.close()
+                done.set()
+            threading.Thread(target=run_ws, daemon=True).start()
@@ -0,0 +1,69 @@
+import requests
+from requests.adapters import HTTPAdapter
+import codec
+
+TIMEOUT = 5
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+
+# Odpoveď sa nezmenila (304 alebo rovnaké telo) - netreba dekódovať ani validovať
+NOT_MODIFIED = object()
+
+
+def create_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Zdieľaná keep-alive session pre všetky adaptéry v režime vlákien
+SESSION = create_session()
+
+
+class ConditionalGet:
+    """
+    GET na jednu URL s podmienenými hlavičkami.
+
+    Pamätá si ETag/Last-Modified a telo poslednej úspešnej odpovede. Ak server
+    vráti 304 alebo identické telo, fetch vráti NOT_MODIFIED namiesto dát.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.etag = None
+        self.last_modified = None
+        self.last_body = None
+
+    def headers(self):
+        headers = {}
+        if self.last_body is None:
+            return headers
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def _result(self, status, headers, body):
+        if status == 304 and self.last_body is not None:
+            return status, NOT_MODIFIED
+        if status != 200:
+            return status, None
+        if body == self.last_body:
+            return status, NOT_MODIFIED
+        data = codec.loads(body)
+        self.last_body = body
+        self.etag = headers.get("ETag")
+        self.last_modified = headers.get("Last-Modified")
+        return status, data
+
+    def fetch(self, session=SESSION):
+        resp = session.get(self.url, headers=self.headers(), timeout=TIMEOUT)
+        return self._result(resp.status_code, resp.headers, resp.content)
+
+    async def fetch_async(self, session):
+        async with session.get(self.url, headers=self.headers()) as resp:
+            body = await resp.read() if resp.status == 200 else None
+            return self._result(resp.status, resp.headers, body)
@@ -0,0 +1,128 @@
+import asyncio
+import contextlib
+import threading
+import time
+import websockets
+import codec
+import metrics
+from record import Record
+
+
+class ListenerCoalescer:
+    """
+    Zlúči všetky listeners rámce prijaté za jeden interval do jednej vzorky.
+
+    Drží len posledný rámec a priebežné min/max, takže pamäť je konštantná
+    bez ohľadu na to, ako často stanica posiela.
+    """
+
+    def __init__(self, count_key="listeners"):
+        # Pole s počtom poslucháčov (listeners.count_key stanice)
+        self.count_key = count_key
+        # add beží na loope WebSocketu, posledný drain aj vo vlákne, ktoré volá stop()
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.latest = None
+        self.latest_valid = False
+        self.latest_error = None
+        self.latest_at = None
+        self.latest_session_id = ""
+        self.min = None
+        self.max = None
+        self.frames = 0
+
+    def add(self, data, valid, now, song_session_id, error=None):
+        with self.lock:
+            self._add(data, valid, now, song_session_id, error)
+
+    def _add(self, data, valid, now, song_session_id, error):
+        self.frames += 1
+        count = data.get(self.count_key) if valid else None
+        if isinstance(count, int) and not isinstance(count, bool):
+            self.min = count if self.min is None else min(self.min, count)
+            self.max = count if self.max is None else max(self.max, count)
+        # Platný rámec má prednosť pred neskorším neplatným
+        if valid or not self.latest_valid:
+            self.latest = data
+            self.latest_valid = bool(valid)
+            self.latest_error = error
+            self.latest_at = now
+            self.latest_session_id = song_session_id
+
+    def drain(self, station=None):
+        with self.lock:
+            if not self.frames:
+                return None
+            entry = Record(
+                self.latest, station, self.latest_at, self.latest_valid, self.latest_session_id,
+                None if self.latest_valid else self.latest_error,
+                {"listeners_min": self.min, "listeners_max": self.max, "frames_coalesced": self.frames},
+            )
+            self.reset()
+        return entry
+
+
+def append_sample(worker, entry, log, final=False):
+    """Zapíše zlúčenú vzorku do cache workera; final = posledná vzorka pri stop()."""
+    frames = entry.extra["frames_coalesced"]
+    worker.frames_coalesced += frames
+    listeners = entry.payload.get(worker.count_key, "N/A") if isinstance(entry.payload, dict) else "N/A"
+    log(entry.song_session_id, f"Počet poslucháčov: {listeners} ({frames} rámcov)", "listeners",
+        listeners=listeners, frames=frames)
+    worker._append("listeners", entry, final)
+
+
+async def raw_frames(ws):
+    """Rámce WebSocketu ako surové bajty, bez dekódovania UTF-8 do str."""
+    with contextlib.suppress(websockets.ConnectionClosedOK):
+        while True:
+            yield await ws.recv(decode=False)
+
+
+async def listen_coalesced(worker, url, log, reconnect_delay):
+    """
+    Číta WebSocket rámce nepretržite a každých worker.listeners_interval
+    sekúnd zapíše do worker.listeners_cache jednu zlúčenú vzorku. Rámce
+    od posledného tiku zapíše worker.stop() cez worker.coalescer.
+    """
+    coalescer = worker.coalescer = ListenerCoalescer(worker.count_key)
+
+    async def sampler():
+        while worker.running:
+            await asyncio.sleep(worker.listeners_interval)
+            if not worker.running:
+                break
+            entry = coalescer.drain(worker.key)
+            if entry is not None:
+                append_sample(worker, entry, log)
+
+    sampler_task = asyncio.create_task(sampler())
+    try:
+        while worker.running:
+            try:
+                async with websockets.connect(url) as ws:
+                    async for msg in raw_frames(ws):
+                        now = time.time()
+                        start = time.perf_counter()
+                        try:
+                            listeners_data = codec.loads(msg)
+                            error = worker.listeners_error(listeners_data)
+                            coalescer.add(listeners_data, error is None, now, worker.current_song_id if worker.current_song_id else "", error)
+                            # Agregácie rátajú každý rámec, nie len zlúčenú vzorku
+                            if error is None:
+                                worker.observe_listeners(listeners_data, now)
+                        except Exception as ex:
+                            metrics.POLL_ERRORS.inc(station=worker.radio_name, type="listeners", exception=type(ex).__name__)
+                            log(worker.current_song_id, f"Chyba parsovania listeners: {ex}", "listeners", "error")
+                        worker._observe_handle("listeners", start)
+                        if not worker.running:
+                            break
+            except Exception as e:
+                log(worker.current_song_id, f"WebSocket chyba: {e}", "websocket", "error")
+            if worker.running:
+                metrics.WS_RECONNECTS.inc(station=worker.radio_name)
+            await asyncio.sleep(reconnect_delay)
+    finally:
+        sampler_task.cancel()
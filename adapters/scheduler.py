@@ -0,0 +1,102 @@
+import datetime
+import statistics
+from collections import deque
+from zoneinfo import ZoneInfo
+
+ZONE = ZoneInfo("Europe/Bratislava")
+
+DEFAULT_TRACK_LENGTH = 210
+MIN_TRACK_LENGTH = 60
+MAX_TRACK_LENGTH = 900
+HISTORY_SIZE = 20
+GUARD = 15  # sekundy pred predpokladanou zmenou, odkedy sa pollu husto
+
+
+def parse_start(value, date=None):
+    """
+    Prevedie časový údaj z payloadu na epoch sekundy, inak vráti None.
+
+    Podporuje epoch (s aj ms), ISO 8601 a samotný čas "HH:MM[:SS]" s voliteľným
+    dátumom "YYYY-MM-DD" alebo "DD.MM.YYYY" (bez dátumu sa berie dnešok).
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e11 else float(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=ZONE)
+        return dt.timestamp()
+    except ValueError:
+        pass
+    try:
+        parts = [int(p) for p in value.split(":")]
+        t = datetime.time(*parts[:3])
+    except (ValueError, TypeError):
+        return None
+    today = datetime.datetime.now(ZONE).date()
+    day = today
+    if isinstance(date, str):
+        for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%d-%m-%Y"):
+            try:
+                day = datetime.datetime.strptime(date.strip(), fmt).date()
+                break
+            except ValueError:
+                continue
+    start = datetime.datetime.combine(day, t, tzinfo=ZONE)
+    # Čas bez dátumu tesne po polnoci patrí ešte k včerajšku
+    if day == today and date is None and start.timestamp() - datetime.datetime.now(ZONE).timestamp() > 3600:
+        start -= datetime.timedelta(days=1)
+    return start.timestamp()
+
+
+class SongScheduler:
+    """
+    Volí pauzu medzi pollami podľa predpokladaného konca aktuálnej skladby.
+
+    Dĺžka skladby sa odhaduje mediánom pozorovaných dĺžok stanice. Ďaleko od
+    predpokladanej zmeny sa polluje riedko (až max_interval), v jej okolí
+    každých min_interval sekúnd. Kým nie je pozorovaná žiadna zmena (upstream
+    nedostupný, payload neprechádza validáciou), polluje sa každých
+    idle_interval sekúnd. Pri min_interval == max_interval je interval fixný.
+    """
+
+    def __init__(self, min_interval, max_interval, guard=GUARD, idle_interval=None):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.guard = guard
+        self.idle_interval = self.max_interval if idle_interval is None else idle_interval
+        self.durations = deque(maxlen=HISTORY_SIZE)
+        self.track_start = None
+
+    def observe_change(self, start, now):
+        # Začiatok z payloadu berieme len ak je vierohodný, inak čas detekcie
+        if start is None or start > now + 60 or start < now - MAX_TRACK_LENGTH:
+            start = now
+        if self.track_start is not None:
+            length = start - self.track_start
+            if MIN_TRACK_LENGTH <= length <= MAX_TRACK_LENGTH:
+                self.durations.append(length)
+        self.track_start = start
+
+    def expected_length(self):
+        if not self.durations:
+            return DEFAULT_TRACK_LENGTH
+        return statistics.median(self.durations)
+
+    def next_delay(self, now):
+        if self.min_interval == self.max_interval:
+            return self.min_interval
+        if self.track_start is None:
+            return min(self.max_interval, max(self.min_interval, self.idle_interval))
+        until_change = self.track_start + self.expected_length() - now
+        if until_change > self.guard:
+            delay = until_change - self.guard
+        else:
+            # Po predpokladanom konci postupne riedneme, ak sa zmena stále neukázala
+            delay = self.min_interval + max(0.0, -until_change) / 4
+        return min(self.max_interval, max(self.min_interval, delay))
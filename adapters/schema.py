@@ -0,0 +1,119 @@
+"""
+Deklaratívne schémy payloadov staníc (sekcia "schema" v stations.json).
+
+Schéma objektu môže obsahovať:
+    "keys"      - zoznam kľúčov, ktoré musia byť prítomné
+    "exact"     - true, ak objekt nesmie mať iné kľúče ako "keys"
+    "types"     - {kľúč: "str" | "int" | "list" | "dict"}
+    "equals"    - {kľúč: hodnota}, porovnáva sa aj typ (false != 0)
+    "nested"    - {kľúč: schéma} pre vnorené objekty
+Alternatívy sa zapisujú ako {"any_of": [schéma, ...]}.
+"""
+
+TYPES = {
+    "str": str,
+    "int": int,
+    "list": list,
+    "dict": dict,
+}
+
+
+def same_value(value, expected):
+    return type(value) is type(expected) and value == expected
+
+
+def _expression(schema, var, namespace, source=None):
+    """
+    Zdrojový kód jedného booleovského výrazu, ktorý overí schému nad
+    premennou var; ak je daný source, var sa naň najprv naviaže.
+    """
+    if "any_of" in schema:
+        return "(" + " or ".join(f"({_expression(option, var, namespace, source)})" for option in schema["any_of"]) + ")"
+
+    def const(value):
+        name = f"c{len(namespace)}"
+        namespace[name] = value
+        return name
+
+    keys = schema.get("keys", ())
+    parts = [f"type({var} := {source}) is dict" if source else f"type({var}) is dict"]
+    if schema.get("exact"):
+        # Porovnanie pohľadu na kľúče s množinou nevytvára nový set
+        parts.append(f"{var}.keys() == {const(frozenset(keys))}")
+    elif keys:
+        parts.append(f"{const(frozenset(keys))} <= {var}.keys()")
+
+    def item(key):
+        return f"{var}[{key!r}]" if key in keys else f"{var}.get({key!r})"
+
+    for key, type_name in schema.get("types", {}).items():
+        parts.append(f"isinstance({item(key)}, {const(TYPES[type_name])})")
+    for key, expected in schema.get("equals", {}).items():
+        if expected is None or isinstance(expected, bool):
+            parts.append(f"{item(key)} is {expected!r}")
+        elif isinstance(expected, str):
+            parts.append(f"{item(key)} == {const(expected)}")
+        else:
+            parts.append(f"same_value({item(key)}, {const(expected)})")
+    for key, nested in schema.get("nested", {}).items():
+        parts.append(_expression(nested, f"v{len(namespace)}", namespace, item(key)))
+    return " and ".join(parts)
+
+
+def _explainer(schema, prefix=""):
+    """Pomalá cesta: nájde prvé pole, ktoré nesplnilo schému."""
+    if "any_of" in schema:
+        options = [_explainer(option, prefix) for option in schema["any_of"]]
+        return lambda data: " | ".join(option(data) or "ok" for option in options)
+
+    where = prefix.rstrip(".") or "payload"
+    keys = tuple(schema.get("keys", ()))
+    nested = [(key, _explainer(sub, f"{prefix}{key}.")) for key, sub in schema.get("nested", {}).items()]
+
+    def explain(data):
+        if type(data) is not dict:
+            return f"{where}: nie je objekt"
+        for key in keys:
+            if key not in data:
+                return f"{prefix}{key}: chýba"
+        if schema.get("exact"):
+            extra = sorted(map(str, data.keys() - set(keys)))
+            if extra:
+                return f"{prefix}{extra[0]}: neočakávaný kľúč"
+        for key, type_name in schema.get("types", {}).items():
+            if not isinstance(data.get(key), TYPES[type_name]):
+                return f"{prefix}{key}: očakávaný typ {type_name}"
+        for key, expected in schema.get("equals", {}).items():
+            if not same_value(data.get(key), expected):
+                return f"{prefix}{key}: očakávaná hodnota {expected!r}"
+        for key, sub in nested:
+            error = sub(data.get(key))
+            if error is not None:
+                return error
+        return None
+    return explain
+
+
+def compile_schema(schema):
+    """
+    Skompiluje schému raz na validátor check(data) -> None | str.
+
+    Platný objekt overí jediný vygenerovaný výraz bez volaní a cyklov;
+    až pri neplatnom sa hľadá popis prvého zlyhaného poľa
+    (napr. "song.musicTitle: chýba").
+    """
+    namespace = {"same_value": same_value}
+    expression = _expression(schema, "data", namespace)
+    namespace["explain"] = _explainer(schema)
+    source = f"def check(data):\n    if {expression}:\n        return None\n    return explain(data)\n"
+    exec(compile(source, "<schema>", "exec"), namespace)
+    return namespace["check"]
+
+
+def get_path(data, path):
+    """Hodnota na bodkovej ceste ("song.musicTitle"), None ak neexistuje."""
+    for part in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
@@ -0,0 +1,283 @@
+"""
+Jednotný webhook server pre všetky stanice s transportom "webhook".
+
+Každá stanica má cestu /webhook/<stanica>/<typ> na WEBHOOK_PORT a navyše
+pôvodné cesty a porty zo stations.json (8001 /expres_webhook, 8002
+/callback ...). Telo môže byť jeden JSON objekt, JSON pole objektov alebo
+NDJSON. Správy idú do ohraničenej fronty stanice; keď je plná, server
+odpovie 429 s Retry-After a nič z dávky neprijme. Dávku väčšiu ako celá
+fronta odmietne s 413, opakovanie by nepomohlo.
+"""
+import asyncio
+import os
+import threading
+import time
+from aiohttp import web
+import codec
+import metrics
+
+WEBHOOK_HOST = "0.0.0.0"
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8000"))
+# Maximálny počet správ čakajúcich na spracovanie v jednej fronte
+WEBHOOK_QUEUE_SIZE = 10000
+WEBHOOK_MAX_BODY = 8 * 1024 * 1024
+WEBHOOK_RETRY_AFTER = 1
+# Koľko správ naraz spracuje jedno volanie v pracovnom vlákne
+WEBHOOK_DRAIN_BATCH = 500
+# Koľko sekúnd close() čaká na zatvorenie portov
+WEBHOOK_CLOSE_TIMEOUT = 10
+
+
+def parse_body(body, content_type=""):
+    """Zoznam správ z tela požiadavky: objekt, JSON pole alebo NDJSON."""
+    body = body.strip()
+    if not body:
+        return []
+    if "ndjson" in content_type:
+        return [codec.loads(line) for line in body.splitlines() if line.strip()]
+    try:
+        data = codec.loads(body)
+    except ValueError:
+        # Bez hlavičky rozpoznáme NDJSON podľa viacerých riadkov
+        return [codec.loads(line) for line in body.splitlines() if line.strip()]
+    return data if isinstance(data, list) else [data]
+
+
+class WebhookQueue:
+    """Ohraničená fronta jednej stanice a typu dát so spracovaním mimo event loopu."""
+
+    def __init__(self, worker, typ, maxsize=WEBHOOK_QUEUE_SIZE):
+        self.worker = worker
+        self.typ = typ
+        self.maxsize = maxsize
+        self.queue = asyncio.Queue()
+        self.accepted = 0
+        self.rejected = 0
+        self.busy = False
+
+    def offer(self, messages):
+        # Dávku prijmeme celú alebo vôbec, aby odosielateľ mohol celú zopakovať
+        if self.queue.qsize() + len(messages) > self.maxsize:
+            self.reject(messages)
+            return False
+        for message in messages:
+            self.queue.put_nowait(message)
+        self.accepted += len(messages)
+        metrics.WEBHOOK_MESSAGES.inc(len(messages), result="accepted", station=self.worker.radio_name, type=self.typ)
+        return True
+
+    def reject(self, messages):
+        self.rejected += len(messages)
+        metrics.WEBHOOK_MESSAGES.inc(len(messages), result="rejected", station=self.worker.radio_name, type=self.typ)
+
+    def _process(self, messages):
+        for message in messages:
+            try:
+                self.worker.handle_webhook(self.typ, message)
+            except Exception as e:
+                self.worker.log(self.worker.current_song_id, f"Chyba webhook {self.typ}: {e}", self.typ, "error")
+
+    async def consume(self):
+        while True:
+            messages = [await self.queue.get()]
+            while len(messages) < WEBHOOK_DRAIN_BATCH and not self.queue.empty():
+                messages.append(self.queue.get_nowait())
+            # Zápis do cache (spool, fsync) nesmie blokovať príjem požiadaviek
+            self.busy = True
+            try:
+                await asyncio.to_thread(self._process, messages)
+            finally:
+                self.busy = False
+
+    def idle(self):
+        return self.queue.empty() and not self.busy
+
+
+def make_handler(find_queue):
+    async def handler(request):
+        webhook_queue = find_queue(request)
+        if webhook_queue is None:
+            return web.json_response({"status": "error", "error": "neznáma stanica"}, status=404)
+        if not webhook_queue.worker.running:
+            # Pozastavená stanica: odosielateľ má skúsiť neskôr, nič sa nestratí
+            return web.json_response(
+                {"status": "paused"}, status=503, headers={"Retry-After": str(WEBHOOK_RETRY_AFTER)}
+            )
+        try:
+            messages = parse_body(await request.read(), request.content_type)
+        except ValueError as e:
+            return web.json_response({"status": "error", "error": f"neplatný JSON: {e}"}, status=400)
+        if len(messages) > webhook_queue.maxsize:
+            # Takú dávku neprijme ani prázdna fronta, 429 s Retry-After by odosielateľ opakoval donekonečna
+            webhook_queue.reject(messages)
+            return web.json_response(
+                {"status": "error", "error": f"dávka má {len(messages)} správ, fronta najviac {webhook_queue.maxsize}"},
+                status=413,
+            )
+        if not webhook_queue.offer(messages):
+            return web.json_response(
+                {"status": "busy"}, status=429, headers={"Retry-After": str(WEBHOOK_RETRY_AFTER)}
+            )
+        return web.json_response({"status": "ok", "accepted": len(messages)})
+    return handler
+
+
+class WebhookServer:
+    """
+    Webhook server s registrom front podľa (stanica, typ).
+
+    Cesta /webhook/<stanica>/<typ> aj pôvodné cesty z konfigurácie sa
+    hľadajú v registri pri každej požiadavke, takže stanice sa dajú pridať,
+    nahradiť (po pauze) a odobrať za behu. Port z konfigurácie sa otvorí pri
+    štarte servera alebo pri pridaní prvej stanice, ktorá ho používa.
+    """
+
+    def __init__(self, host=WEBHOOK_HOST, port=WEBHOOK_PORT):
+        self.host = host
+        self.port = port
+        self.queues = {}
+        self.tasks = {}
+        # Pôvodné cesty: {port: {cesta: (stanica, typ)}}
+        self.paths = {}
+        self.runners = {}
+        self.loop = None
+
+    def _attach(self, worker):
+        for typ, config in worker.webhooks():
+            webhook_queue = self.queues.get((worker.key, typ))
+            if webhook_queue is not None:
+                webhook_queue.worker = worker
+                continue
+            webhook_queue = WebhookQueue(worker, typ, config.get("queue_size", WEBHOOK_QUEUE_SIZE))
+            self.queues[(worker.key, typ)] = webhook_queue
+            self.tasks[(worker.key, typ)] = asyncio.get_running_loop().create_task(webhook_queue.consume())
+
+    def _detach(self, key):
+        for queue_key in [queue_key for queue_key in self.queues if queue_key[0] == key]:
+            del self.queues[queue_key]
+            self.tasks.pop(queue_key).cancel()
+        # Otvorený port ostane, bez ciest len odpovedá 404
+        for port_paths in self.paths.values():
+            for path in [path for path, queue_key in port_paths.items() if queue_key[0] == key]:
+                del port_paths[path]
+
+    def _register(self, worker):
+        """Zapíše pôvodné cesty stanice; cesta inej stanice na tom istom porte je ValueError."""
+        routes = [((config["port"], path), (worker.key, typ))
+                  for typ, config in worker.webhooks() for path in config.get("paths", [])]
+        for (port, path), queue_key in routes:
+            owner = self.paths.get(port, {}).get(path)
+            if owner is not None and owner[0] != worker.key:
+                raise ValueError(f"{queue_key[1]}.paths: {path} na porte {port} už používa stanica {owner[0]}")
+        for (port, path), queue_key in routes:
+            self.paths.setdefault(port, {})[path] = queue_key
+
+    async def _bind(self, port):
+        if port in self.runners:
+            return
+        app = web.Application(client_max_size=WEBHOOK_MAX_BODY)
+        if port == self.port:
+            app.router.add_post("/webhook/{key}/{typ}", make_handler(lambda request: self.queues.get(
+                (request.match_info["key"], request.match_info["typ"])
+            )))
+        app.router.add_post("/{path:.*}", make_handler(lambda request: self._declared(port, request.path)))
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, port).start()
+        except Exception:
+            await runner.cleanup()
+            raise
+        self.runners[port] = runner
+
+    def _declared(self, port, path):
+        queue_key = self.paths.get(port, {}).get(path)
+        return self.queues.get(queue_key) if queue_key is not None else None
+
+    async def _attach_bound(self, worker):
+        self._register(worker)
+        self._attach(worker)
+        for typ, config in worker.webhooks():
+            try:
+                await self._bind(config["port"])
+            except OSError as e:
+                self._detach(worker.key)
+                raise ValueError(f"{typ}.port: port {config['port']} sa nedá otvoriť: {e}") from e
+
+    def attach(self, worker, timeout=WEBHOOK_CLOSE_TIMEOUT):
+        """
+        Pridá stanicu alebo vymení workera existujúcej (z iného vlákna) a otvorí
+        jej port z konfigurácie. Obsadenú cestu alebo port vráti ako ValueError.
+        """
+        asyncio.run_coroutine_threadsafe(self._attach_bound(worker), self.loop).result(timeout)
+
+    def detach(self, key):
+        self.loop.call_soon_threadsafe(self._detach, key)
+
+    async def serve(self, workers):
+        self.loop = asyncio.get_running_loop()
+        for worker in workers:
+            self._register(worker)
+            self._attach(worker)
+        await self._bind(self.port)
+        for port in list(self.paths):
+            await self._bind(port)
+        return self
+
+    async def cleanup(self, timeout=WEBHOOK_CLOSE_TIMEOUT):
+        for runner in self.runners.values():
+            await runner.cleanup()
+        self.runners.clear()
+        # Prijaté správy (odosielateľ dostal 200) ešte zapíšeme do cache
+        deadline = time.monotonic() + timeout / 2
+        while not all(webhook_queue.idle() for webhook_queue in self.queues.values()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        tasks = list(self.tasks.values())
+        self.queues.clear()
+        self.tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self, timeout=WEBHOOK_CLOSE_TIMEOUT):
+        """Uvoľní porty a zastaví event loop servera (z iného vlákna)."""
+        asyncio.run_coroutine_threadsafe(self.cleanup(timeout), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+async def serve_webhooks(workers, host=WEBHOOK_HOST, port=WEBHOOK_PORT):
+    """Spustí server na všetkých portoch v bežiacom event loope."""
+    return await WebhookServer(host, port).serve(workers)
+
+
+def start_webhooks(workers, host=WEBHOOK_HOST, port=WEBHOOK_PORT, always=False):
+    """
+    Webhook server vo vlastnom vlákne s vlastným event loopom.
+
+    Bez webhook staníc sa nespustí (vráti None), ak nie je always=True.
+    Ak sa niektorý port nepodarí otvoriť, uvoľní ostatné a výnimka prepadne volajúcemu.
+    """
+    if not always and not any(worker.webhooks() for worker in workers):
+        return None
+    server = WebhookServer(host, port)
+    ready = threading.Event()
+    errors = []
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(server.serve(workers))
+        except Exception as e:
+            errors.append(e)
+            loop.run_until_complete(server.cleanup())
+        finally:
+            ready.set()
+        if not errors:
+            loop.run_forever()
+        loop.close()
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    if errors:
+        raise errors[0]
+    return server
@@ -0,0 +1,111 @@
+"""
+Admin API na správu staníc za behu, bez reštartu a straty cache.
+
+    GET    /stations                 zoznam staníc so stavom a hĺbkou cache
+    POST   /stations                 {"key": "...", "station": {...}} pridá a spustí stanicu
+    PATCH  /stations/<key>           {"song_interval": 20, ...} zmení intervaly; adaptívne
+                                     pollovaná stanica berie song_interval len spolu
+                                     so song_bounds ([min, max] alebo null = fixne)
+    POST   /stations/<key>/pause     zastaví zber, nazbierané dáta sa odošlú
+    POST   /stations/<key>/resume    znova spustí zber, song session pokračuje
+    DELETE /stations/<key>           zastaví a odoberie stanicu
+
+Zmeny sa zapisujú do STATIONS_FILE, pozastavená stanica ostane
+pozastavená aj po reštarte. Ak je nastavený ADMIN_TOKEN, požiadavka musí
+mať hlavičku "Authorization: Bearer <token>".
+"""
+import asyncio
+import hmac
+import os
+import threading
+from aiohttp import web
+
+ADMIN_HOST = os.getenv("ADMIN_HOST", "127.0.0.1")
+# 0 = admin API vypnuté
+ADMIN_PORT = int(os.getenv("ADMIN_PORT", "8090"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+class NotFound(Exception):
+    pass
+
+
+class Conflict(Exception):
+    pass
+
+
+def make_admin_app(manager, token=ADMIN_TOKEN):
+    @web.middleware
+    async def errors(request, handler):
+        if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return web.json_response({"status": "error", "error": "neautorizované"}, status=401)
+        try:
+            return await handler(request)
+        except NotFound as e:
+            return web.json_response({"status": "error", "error": f"neznáma stanica: {e}"}, status=404)
+        except Conflict as e:
+            return web.json_response({"status": "error", "error": str(e)}, status=409)
+        except ValueError as e:
+            return web.json_response({"status": "error", "error": str(e)}, status=400)
+
+    async def body(request):
+        try:
+            data = await request.json()
+        except ValueError as e:
+            raise ValueError(f"neplatný JSON: {e}") from e
+        if not isinstance(data, dict):
+            raise ValueError("telo: nie je objekt")
+        return data
+
+    # Operácie blokujú (flush na disk), preto bežia mimo event loopu
+    async def list_stations(request):
+        return web.json_response(await asyncio.to_thread(manager.list))
+
+    async def add_station(request):
+        data = await body(request)
+        if not isinstance(data.get("key"), str) or not data["key"]:
+            raise ValueError("key: chýba")
+        return web.json_response(await asyncio.to_thread(manager.add, data["key"], data.get("station")), status=201)
+
+    async def retune_station(request):
+        data = await body(request)
+        return web.json_response(await asyncio.to_thread(manager.retune, request.match_info["key"], data))
+
+    async def pause_station(request):
+        return web.json_response(await asyncio.to_thread(manager.pause, request.match_info["key"]))
+
+    async def resume_station(request):
+        return web.json_response(await asyncio.to_thread(manager.resume, request.match_info["key"]))
+
+    async def remove_station(request):
+        await asyncio.to_thread(manager.remove, request.match_info["key"])
+        return web.json_response({"status": "ok"})
+
+    app = web.Application(middlewares=[errors])
+    app.router.add_get("/stations", list_stations)
+    app.router.add_post("/stations", add_station)
+    app.router.add_patch("/stations/{key}", retune_station)
+    app.router.add_post("/stations/{key}/pause", pause_station)
+    app.router.add_post("/stations/{key}/resume", resume_station)
+    app.router.add_delete("/stations/{key}", remove_station)
+    return app
+
+
+def start_admin(manager, host=ADMIN_HOST, port=ADMIN_PORT, token=ADMIN_TOKEN):
+    """Admin API vo vlastnom vlákne s vlastným event loopom."""
+    if not port:
+        return None
+
+    async def serve():
+        runner = web.AppRunner(make_admin_app(manager, token), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve())
+        loop.run_forever()
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
@@ -1,124 +1,591 @@
 import threading
+import asyncio
 import time
 import os
-import json
-from writer import upload_json_to_r2
-from adapters.radio_rock import RadioRockWorker
-from adapters.radio_funradio import RadioFunradioWorker
-from adapters.radio_jazz import start_worker as start_jazz_worker
-from adapters.radio_beta import RadioBetaWorker
-from adapters.radio_expres import start_worker as start_expres_worker
-from adapters.radio_melody import RadioMelodyWorker
+import signal
+import socket
+import subprocess
+import sys
+import zlib
+from writer import write_entries, check_format, file_checksum, OUTPUT_FORMATS
+from uploader import Uploader
+from spool import Spool, SpoolWriter
+from buffer import BatchBuffer
+from compact import compact_entries
+from manifest import manifest_info, partition, check_layout, PARTITION_LAYOUT
+from housekeeping import Housekeeper
+from rollup import ListenerRollup, SongSessionSummary, LISTENERS_ROLLUP_WINDOWS
+from runtime import run_stations
+import logger
+import metrics
+from logger import log
+from adapters.engine import StationWorker, load_stations, save_stations, check_station, check_intervals
+from adapters.webhook import start_webhooks
+from shard import LeaseStore, ShardMember, SHARD_DB
+from admin import start_admin, NotFound, Conflict
 
 SONG_INTERVAL = 30
 LISTENERS_INTERVAL = 30
-UPLOAD_INTERVAL = 7200  # 2h
+UPLOAD_INTERVAL = 7200  # 2h - maximálny vek dávky pred flushom
+# Flush nastane pri prvej splnenej podmienke: počet záznamov, bajty alebo vek najstaršieho záznamu
+FLUSH_MAX_RECORDS = 20000
+FLUSH_MAX_BYTES = 16 * 1024 * 1024
+FLUSH_CHECK_INTERVAL = 10
+# Hranice adaptívneho pollovania skladieb (min, max) v sekundách, None = fixne každých SONG_INTERVAL;
+# SONG_INTERVAL platí aj s hranicami, kým stanica neukáže prvú zmenu skladby
+SONG_BOUNDS = (5, 120)
+# WebSocket listeners: "coalesce" číta všetky rámce a zlučuje ich do vzorky za interval
+LISTENERS_MODE = "coalesce"
+
+# "threads" = vlákna pre každú stanicu, "async" = všetky stanice na jednom event loope
+RUNTIME = os.getenv("COLLECTOR_RUNTIME", "threads")
 
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
-RADIO_WORKERS = {
-    "rock": {
-        "worker_class": RadioRockWorker,
-        "intervals": (SONG_INTERVAL, LISTENERS_INTERVAL),
-        "upload_interval": UPLOAD_INTERVAL,
-        "song_cache": [],
-        "listeners_cache": [],
-        "radio_name": "ROCK",
-        "starter": None,
-    },
-    "funradio": {
-        "worker_class": RadioFunradioWorker,
-        "intervals": (SONG_INTERVAL, LISTENERS_INTERVAL),
-        "upload_interval": UPLOAD_INTERVAL,
-        "song_cache": [],
-        "listeners_cache": [],
-        "radio_name": "FUNRADIO",
-        "starter": None,
-    },
-    "jazz": {
-        "worker_class": None,
-        "intervals": (SONG_INTERVAL, LISTENERS_INTERVAL),
-        "upload_interval": UPLOAD_INTERVAL,
-        "song_cache": [],
-        "listeners_cache": [],
-        "radio_name": "JAZZ",
-        "starter": start_jazz_worker
-    },
-    "beta": {
-        "worker_class": RadioBetaWorker,
-        "intervals": (SONG_INTERVAL, LISTENERS_INTERVAL),
-        "upload_interval": UPLOAD_INTERVAL,
-        "song_cache": [],
-        "listeners_cache": [],
-        "radio_name": "BETA",
-        "starter": None,
-    },
-    "expres": {
-        "worker_class": None,
-        "intervals": (SONG_INTERVAL, LISTENERS_INTERVAL),
-        "upload_interval": UPLOAD_INTERVAL,
-        "song_cache": [],
-        "listeners_cache": [],
-        "radio_name": "EXPRES",
-        "starter": start_expres_worker,
-    },
-    "melody": {
-        "worker_class": RadioMelodyWorker,
-        "intervals": (SONG_INTERVAL, LISTENERS_INTERVAL),
-        "upload_interval": UPLOAD_INTERVAL,
-        "song_cache": [],
-        "listeners_cache": [],
-        "radio_name": "MELODY",
-        "starter": None
+# "json" (pôvodné pole), "ndjson", "ndjson.gz" alebo "ndjson.zst"
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "json")
+check_format(OUTPUT_FORMAT)
+# Dátum v kľúči: "dmy" (04-11-2025) alebo triediteľné "ymd" (2025/11/04), platí aj pre manifesty
+check_layout(PARTITION_LAYOUT)
+# Denný manifest objektov stanice (bronze/<RADIO>/_manifest/<deň>.json), aktualizuje sa po každom uploade
+MANIFESTS = os.getenv("MANIFESTS", "1") == "1"
+
+# Sharding: SHARD_PROCESSES > 0 spustí supervízora s toľkými procesmi, každý
+# dostane SHARD_SLOT; na ďalšom stroji stačí spustiť člena priamo so SHARD_SLOT
+# a spoločnou SHARD_DB. Členovia bežia vždy v režime "threads".
+SHARD_PROCESSES = int(os.getenv("SHARD_PROCESSES", "0"))
+SHARD_SLOT = os.getenv("SHARD_SLOT")
+SHARD_RESTART_DELAY = 5
+# Koľko sekúnd ukončovaný člen čaká na dokončenie uploadov po odovzdaní staníc
+SHARD_SHUTDOWN_TIMEOUT = 30
+# Webhook stanice počúvajú na pevných portoch, preto ich drží jediný proces
+WEBHOOK_LEASE = "__webhook__"
+
+# Spoločný pool upload vlákien s perzistentnou frontou opakovaní
+UPLOAD_WORKERS = 4
+# Fronta patrí slotu, reštartovaný člen dokončí uploady svojho predchodcu
+UPLOAD_QUEUE_DIR = f"{DATA_DIR}/.upload_queue" + (f"-{SHARD_SLOT}" if SHARD_SLOT else "")
+UPLOADER = Uploader(UPLOAD_QUEUE_DIR, workers=UPLOAD_WORKERS)
+
+# Údržba data/: zmazanie nahratých súborov alebo denné archívy (LOCAL_RETENTION), kvóta DATA_QUOTA_MB.
+# Súbory po uploade spracúva každý proces, periodický prechod beží len v jednom (slot 0 pri shardingu).
+HOUSEKEEPING = os.getenv("HOUSEKEEPING", "1") == "1"
+# Spool segmenty (CACHE_BACKEND "spool" aj spill BatchBuffer), ráta ich aj kvóta housekeepingu
+SPOOL_DIR = "spool"
+HOUSEKEEPER = Housekeeper(DATA_DIR, UPLOADER, manifests=MANIFESTS, spool_dir=SPOOL_DIR)
+if HOUSEKEEPING:
+    UPLOADER.on_done = HOUSEKEEPER.uploaded
+
+# Zlúčenie po sebe idúcich rovnakých záznamov pred zápisom (first_seen, last_seen, repeat_count)
+COMPACT_REPEATS = os.getenv("COMPACT_REPEATS", "0") == "1"
+
+# Súhrn poslucháčov za každú skladbu (bronze/<RADIO>/song_session/), odošle sa po zmene skladby
+SONG_SESSION_SUMMARIES = os.getenv("SONG_SESSION_SUMMARIES", "1") == "1"
+
+# "spool" = záznamy sa priebežne zapisujú na disk (prežijú pád), "memory" = BatchBuffer v RAM
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "spool")
+# Rozpočet BatchBuffer na stanicu a typ dát; pri prekročení "spill" na disk alebo "drop_oldest"
+MEMORY_MAX_RECORDS = 50000
+MEMORY_MAX_BYTES = 32 * 1024 * 1024
+MEMORY_OVERFLOW = "spill"
+
+# V režime async zapisuje do spoolov vlákno, write a fsync nezdržia event loop
+SPOOL_WRITER = SpoolWriter() if RUNTIME == "async" else None
+
+def make_cache(radio_name, typ):
+    if CACHE_BACKEND == "spool":
+        return Spool(f"{SPOOL_DIR}/{radio_name}/{typ}", writer=SPOOL_WRITER)
+    spill = Spool(f"{SPOOL_DIR}/{radio_name}/{typ}-spill", writer=SPOOL_WRITER) if MEMORY_OVERFLOW == "spill" else None
+    return BatchBuffer(MEMORY_MAX_RECORDS, MEMORY_MAX_BYTES, MEMORY_OVERFLOW, spill)
+
+# Stanice sú popísané deklaratívne; nová stanica = nový záznam v stations.json
+STATIONS_FILE = os.getenv("STATIONS_FILE", "stations.json")
+STATIONS = load_stations(STATIONS_FILE)
+
+def make_radio_intervals(station):
+    # Voliteľné prepísanie intervalov a hraníc priamo v konfigurácii stanice
+    intervals = {
+        "intervals": (station.get("song_interval", SONG_INTERVAL), station.get("listeners_interval", LISTENERS_INTERVAL)),
+        "upload_interval": station.get("upload_interval", UPLOAD_INTERVAL),
     }
-}
+    # "song_bounds": null v stanici vypne adaptívne pollovanie, polluje sa fixne každých song_interval
+    bounds = station.get("song_bounds", SONG_BOUNDS)
+    if station["song"]["transport"] == "poll" and bounds:
+        intervals["song_bounds"] = tuple(bounds)
+    return intervals
+
+def make_radio_dict(station):
+    radio_dict = {
+        **make_radio_intervals(station),
+        "song_cache": make_cache(station["radio_name"], "song"),
+        "listeners_cache": make_cache(station["radio_name"], "listeners"),
+        "radio_name": station["radio_name"],
+        "station": station,
+        # flush_radio volá upload vlákno aj admin API / shard pri zastavení, nesmú sa prekryť
+        "flush_lock": threading.Lock(),
+    }
+    if station["listeners"]["transport"] == "ws":
+        radio_dict["listeners_mode"] = station.get("listeners_mode", LISTENERS_MODE)
+    if LISTENERS_ROLLUP_WINDOWS:
+        # Uzavreté okná idú do vlastnej cache a vedľa surových dát do bronze/<RADIO>/listeners_rollup/
+        radio_dict["listeners_rollup_cache"] = make_cache(station["radio_name"], "listeners_rollup")
+        radio_dict["listeners_rollup"] = ListenerRollup(radio_dict["listeners_rollup_cache"])
+    if SONG_SESSION_SUMMARIES:
+        radio_dict["song_session_cache"] = make_cache(station["radio_name"], "song_session")
+        radio_dict["song_sessions"] = SongSessionSummary(radio_dict["song_session_cache"])
+    return radio_dict
+
+def cache_types(radio_dict):
+    # Agregácie majú vlastné cache len ak sú zapnuté
+    return ("song", "listeners") + tuple(typ for typ in ("listeners_rollup", "song_session") if f"{typ}_cache" in radio_dict)
 
-def save_entries(entries, typ, radio):
-    dt = time.strftime("%d-%m-%Y")
-    tm = time.strftime("%H-%M-%S")
+# Cache staníc vznikajú až pri štarte, v shardingu len pre stanice s leasom
+RADIO_WORKERS = {}
+WORKERS = {}
+WEBHOOKS = None
+
+def save_entries(entries, typ, radio, now=None):
+    now = time.time() if now is None else now
+    dt = partition(now)
+    tm = time.strftime("%H-%M-%S", time.localtime(now))
     folder = f"{DATA_DIR}/{radio}/{typ}/{dt}"
     os.makedirs(folder, exist_ok=True)
-    local_file_path = f"{folder}/{tm}.json"
-    with open(local_file_path, "w", encoding="utf-8") as f:
-        json.dump(entries, f, ensure_ascii=False, indent=2)
+    suffix = OUTPUT_FORMATS[OUTPUT_FORMAT][0]
+    tmp = f"{folder}/{tm}{suffix}.tmp"
+    write_entries(entries, tmp, OUTPUT_FORMAT)
+    # Dva flushe v tej istej sekunde (vynútený hneď po periodickom) nesmú prepísať súbor ani
+    # upload úlohu toho prvého; rovnaký obsah dá rovnaký kľúč, opakovanie ostane idempotentné
+    local_file_path = f"{folder}/{tm}-{file_checksum(tmp)[:8]}{suffix}"
+    os.replace(tmp, local_file_path)
     return local_file_path, dt, tm
 
-def upload_worker(radio_key, radio_dict):
-    time.sleep(radio_dict["upload_interval"])
-    while True:
-        songs_to_upload = radio_dict["song_cache"].copy()
-        listeners_to_upload = radio_dict["listeners_cache"].copy()
-        radio_dict["song_cache"].clear()
-        radio_dict["listeners_cache"].clear()
-        radio_name = radio_dict["radio_name"]
-        if songs_to_upload:
-            local_file, dt, tm = save_entries(songs_to_upload, "song", radio_name)
-            r2_key = f"bronze/{radio_name}/song/{dt}/{tm}.json"
-            upload_json_to_r2(local_file, r2_key)
-        if listeners_to_upload:
-            local_file, dt, tm = save_entries(listeners_to_upload, "listeners", radio_name)
-            r2_key = f"bronze/{radio_name}/listeners/{dt}/{tm}.json"
-            upload_json_to_r2(local_file, r2_key)
-        print(f"[{time.strftime('%d.%m.%Y %H:%M:%S')}] [{radio_name} ---] Dáta boli odoslané do Cloudflare R2.")
-        time.sleep(radio_dict["upload_interval"])
-
-def start_radio_worker(radio_key, radio_dict):
-    if radio_dict["starter"]:
-        radio_dict["starter"](radio_dict["intervals"][1], radio_dict["listeners_cache"], radio_dict["song_cache"])
-    else:
-        worker = radio_dict["worker_class"](
-            radio_dict["intervals"][0],
-            radio_dict["intervals"][1],
-            radio_dict["song_cache"],
-            radio_dict["listeners_cache"]
-        )
-        worker.start()
-    threading.Thread(target=upload_worker, args=(radio_key, radio_dict), daemon=True).start()
+def flush_cache(cache, typ, radio_name):
+    batch = cache.take_batch()
+    try:
+        entries = batch.entries
+        if entries and COMPACT_REPEATS:
+            entries = compact_entries(entries)
+            metrics.RECORDS_COMPACTED.inc(len(batch.entries) - len(entries), station=radio_name, type=typ)
+        if entries:
+            now = time.time()
+            local_file, dt, tm = save_entries(entries, typ, radio_name, now)
+            r2_key = f"bronze/{radio_name}/{typ}/{dt}/{os.path.basename(local_file)}"
+            manifest = manifest_info(entries, radio_name, typ, now) if MANIFESTS else None
+            UPLOADER.submit(local_file, r2_key, OUTPUT_FORMAT, manifest)
+    except Exception:
+        # Dávku sa nepodarilo uložiť, záznamy ostanú v cache do ďalšieho flushu
+        batch.rollback()
+        raise
+    # Od tejto chvíle je dávka trvalo v upload fronte, cache ju už nepotrebuje
+    batch.commit()
+
+def has_backlog(cache):
+    spool = cache.spill if isinstance(cache, BatchBuffer) else cache
+    return spool is not None and bool(spool.sealed_segments())
+
+def flush_due(cache, max_age, now):
+    depth = cache.depth()
+    if not depth["records"]:
+        return False
+    return (
+        depth["records"] >= FLUSH_MAX_RECORDS or
+        depth["bytes"] >= FLUSH_MAX_BYTES or
+        now - depth["oldest"] >= max_age
+    )
+
+def flush_radio(radio_dict, force=False):
+    with radio_dict["flush_lock"]:
+        _flush_radio(radio_dict, force)
+
+def _flush_radio(radio_dict, force):
+    radio_name = radio_dict["radio_name"]
+    now = time.time()
+    flushed = []
+    if "listeners_rollup" in radio_dict:
+        radio_dict["listeners_rollup"].close_due(now)
+    for typ in cache_types(radio_dict):
+        cache = radio_dict[f"{typ}_cache"]
+        if not force and not flush_due(cache, radio_dict["flush_age"][typ], now):
+            continue
+        try:
+            flush_cache(cache, typ, radio_name)
+            flushed.append(typ)
+            metrics.FLUSHES.inc(station=radio_name, type=typ, result="ok")
+        except Exception as e:
+            metrics.FLUSHES.inc(station=radio_name, type=typ, result="error")
+            log(radio_name, "---", f"Chyba pri ukladaní {typ}: {e}", "flush", "error")
+        # Po prvom (posunutom) flushi platí plný vek dávky
+        if not force:
+            radio_dict["flush_age"][typ] = radio_dict["upload_interval"]
+    if flushed:
+        log(radio_name, "---", f"Dáta ({', '.join(flushed)}) boli zaradené na upload do Cloudflare R2.", "flush")
+
+def stagger_flushes(radio_dicts):
+    # Prvý flush podľa veku rozložíme rovnomerne, aby stanice neflushovali naraz
+    count = len(radio_dicts)
+    for index, radio_dict in enumerate(radio_dicts):
+        first_age = radio_dict["upload_interval"] * (index + 1) / count
+        radio_dict["flush_age"] = dict.fromkeys(cache_types(radio_dict), first_age)
+
+def first_flush_age(radio_key, upload_interval):
+    # Stanice štartované po jednej (shard, admin API) nepoznajú ostatné, vek rozložíme podľa hashu kľúča
+    return upload_interval * (1 + zlib.crc32(radio_key.encode("utf-8")) % 1000) / 1000
+
+def resume_radio(radio_dict):
+    # Zapečatené segmenty z predchádzajúceho behu odošleme hneď po štarte
+    if any(has_backlog(radio_dict[f"{typ}_cache"]) for typ in cache_types(radio_dict)):
+        flush_radio(radio_dict, force=True)
+
+def upload_worker(radio_key, radio_dict, worker):
+    resume_radio(radio_dict)
+    while worker.running:
+        time.sleep(FLUSH_CHECK_INTERVAL)
+        if worker.running:
+            flush_radio(radio_dict)
+
+def worker_kwargs(radio_dict):
+    return {key: radio_dict[key] for key in ("song_bounds", "listeners_mode", "listeners_rollup", "song_sessions") if radio_dict.get(key)}
+
+def create_radio_worker(radio_key, radio_dict):
+    return StationWorker(
+        radio_key,
+        radio_dict["station"],
+        radio_dict["intervals"][0],
+        radio_dict["intervals"][1],
+        radio_dict["song_cache"],
+        radio_dict["listeners_cache"],
+        **worker_kwargs(radio_dict)
+    )
+
+def start_radio_worker(radio_key, radio_dict, previous=None):
+    worker = create_radio_worker(radio_key, radio_dict)
+    if previous is not None:
+        worker.take_state(previous)
+    worker.start()
+    threading.Thread(target=upload_worker, args=(radio_key, radio_dict, worker), daemon=True).start()
+    return worker
+
+def cache_depths():
+    for radio_dict in list(RADIO_WORKERS.values()):
+        for typ in cache_types(radio_dict):
+            yield {"station": radio_dict["radio_name"], "type": typ}, radio_dict[f"{typ}_cache"].depth()
+
+def start_metrics():
+    # Hodnoty gauge sa počítajú až pri scrape
+    metrics.CACHE_RECORDS.set_collector(lambda: [(labels, depth["records"]) for labels, depth in cache_depths()])
+    metrics.CACHE_BYTES.set_collector(lambda: [(labels, depth["bytes"]) for labels, depth in cache_depths()])
+    metrics.CACHE_OLDEST_AGE.set_collector(
+        lambda: [(labels, time.time() - depth["oldest"] if depth["oldest"] else 0) for labels, depth in cache_depths()]
+    )
+    metrics.SONG_AGE.set_collector(
+        lambda: [({"station": w.radio_name}, time.time() - w.last_change_at) for w in list(WORKERS.values()) if w.last_change_at]
+    )
+    metrics.UPLOAD_PENDING.set_collector(lambda: [({}, UPLOADER.pending())])
+    metrics.LOG_DROPPED.set_collector(lambda: [({}, logger.LOGGER.dropped)])
+    metrics.DISK_FREE_BYTES.set_collector(lambda: [({}, HOUSEKEEPER.free_bytes())])
+    metrics.start_metrics_server()
+
+def start_housekeeping():
+    if HOUSEKEEPING:
+        metrics.DATA_BYTES.set_collector(HOUSEKEEPER.usage_samples)
+        HOUSEKEEPER.start()
+
+def main_async():
+    WORKERS.update({radio_key: create_radio_worker(radio_key, radio_dict) for radio_key, radio_dict in RADIO_WORKERS.items()})
+    workers = list(WORKERS.values())
+    start_webhooks(workers)
+    start_metrics()
+    asyncio.run(run_stations(workers, list(RADIO_WORKERS.values()), flush_radio, resume_radio, FLUSH_CHECK_INTERVAL))
+
+def is_webhook_station(station):
+    return "webhook" in (station["song"]["transport"], station["listeners"]["transport"])
+
+def start_station(radio_key, previous=None):
+    radio_dict = RADIO_WORKERS.get(radio_key)
+    if radio_dict is None:
+        radio_dict = make_radio_dict(STATIONS[radio_key])
+        first_age = first_flush_age(radio_key, radio_dict["upload_interval"])
+        radio_dict["flush_age"] = dict.fromkeys(cache_types(radio_dict), first_age)
+        RADIO_WORKERS[radio_key] = radio_dict
+    WORKERS[radio_key] = start_radio_worker(radio_key, radio_dict, previous)
+    return WORKERS[radio_key]
+
+def close_rollups(radio_dict):
+    # Nedokončené okná a rozohraná skladba sa odošlú ako partial, nový worker začne nové
+    now = time.time()
+    if "listeners_rollup" in radio_dict:
+        radio_dict["listeners_rollup"].close_all(now)
+    if "song_sessions" in radio_dict:
+        radio_dict["song_sessions"].close(now)
+
+def stop_station(radio_key, worker, handoff):
+    worker.stop()
+    radio_dict = RADIO_WORKERS.pop(radio_key)
+    WORKERS.pop(radio_key, None)
+    # Pri odovzdaní pošleme všetko, čo stanica nazbierala, ešte pred uvoľnením leasu
+    if handoff:
+        close_rollups(radio_dict)
+        flush_radio(radio_dict, force=True)
+
+def start_shard_key(key):
+    if key != WEBHOOK_LEASE:
+        return start_station(key)
+    workers = [
+        start_station(radio_key) for radio_key, station in STATIONS.items()
+        if is_webhook_station(station) and not station.get("paused")
+    ]
+    try:
+        server = start_webhooks(workers)
+    except Exception:
+        # Porty drží iný proces; lease sa uvoľní a prevzatie sa zopakuje
+        for worker in workers:
+            stop_station(worker.key, worker, True)
+        raise
+    return workers, server
+
+def stop_shard_key(key, handle, handoff):
+    if key != WEBHOOK_LEASE:
+        stop_station(key, handle, handoff)
+        return
+    workers, server = handle
+    # Porty uvoľníme hneď, lease môže prevziať člen na tom istom stroji
+    if server is not None:
+        server.close()
+    for worker in workers:
+        stop_station(worker.key, worker, handoff)
+
+def exit_on_sigterm():
+    # SystemExit spustí finally bloky: člen odovzdá stanice, supervízor ukončí procesy
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+def run_shard_member():
+    node = f"{socket.gethostname()}-{SHARD_SLOT}-{os.getpid()}"
+    exit_on_sigterm()
+    UPLOADER.start()
+    if SHARD_SLOT == "0":
+        start_housekeeping()
+    webhook_keys = [key for key, station in STATIONS.items() if is_webhook_station(station)]
+    member = ShardMember(
+        LeaseStore(SHARD_DB),
+        node,
+        [key for key, station in STATIONS.items() if key not in webhook_keys and not station.get("paused")],
+        start_shard_key,
+        stop_shard_key,
+        sticky=[WEBHOOK_LEASE] if webhook_keys else [],
+        log=lambda msg, level="info": log(None, None, f"[{node}] {msg}", "shard", level),
+    )
+    start_metrics()
+    try:
+        member.run()
+    finally:
+        member.shutdown()
+        UPLOADER.wait_idle(timeout=SHARD_SHUTDOWN_TIMEOUT)
+
+def spawn_shard(slot):
+    env = dict(os.environ, SHARD_SLOT=str(slot))
+    if metrics.METRICS_PORT:
+        env["METRICS_PORT"] = str(metrics.METRICS_PORT + slot + 1)
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+
+def run_supervisor():
+    exit_on_sigterm()
+    children = {slot: spawn_shard(slot) for slot in range(SHARD_PROCESSES)}
+    log(None, None, f"Supervízor spustil {SHARD_PROCESSES} shard procesov", "shard")
+    try:
+        while True:
+            time.sleep(SHARD_RESTART_DELAY)
+            for slot, child in children.items():
+                if child.poll() is not None:
+                    log(None, None, f"Shard {slot} skončil (kód {child.returncode}), spúšťam znova", "shard", "error")
+                    children[slot] = spawn_shard(slot)
+    finally:
+        for child in children.values():
+            child.terminate()
+        for child in children.values():
+            child.wait()
+
+# Polia, ktoré admin API mení za behu (PATCH /stations/<key>)
+RETUNE_FIELDS = ("song_interval", "listeners_interval", "upload_interval", "song_bounds")
+
+class StationManager:
+    """
+    Operácie admin API nad bežiacimi stanicami (režim threads, bez shardingu).
+
+    Zmeny konfigurácie sa ukladajú do STATIONS_FILE. Pauza zastaví workera
+    a odošle jeho cache; pri obnovení nový worker prevezme stav skladby
+    (current_song_id, posledný song), takže session pokračuje.
+    """
+
+    def __init__(self, path=STATIONS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _save(self):
+        save_stations(self.path, STATIONS)
+
+    def _station(self, key):
+        if key not in STATIONS:
+            raise NotFound(key)
+        return STATIONS[key]
+
+    def describe(self, key):
+        station = self._station(key)
+        radio_dict = RADIO_WORKERS.get(key)
+        worker = WORKERS.get(key)
+        return {
+            "key": key,
+            "radio_name": station["radio_name"],
+            "state": "running" if worker is not None and worker.running else "paused",
+            "song_interval": station.get("song_interval", SONG_INTERVAL),
+            "listeners_interval": station.get("listeners_interval", LISTENERS_INTERVAL),
+            "upload_interval": station.get("upload_interval", UPLOAD_INTERVAL),
+            "song_bounds": list(radio_dict["song_bounds"]) if radio_dict and radio_dict.get("song_bounds") else None,
+            "current_song_id": worker.current_song_id if worker is not None else None,
+            "cache": {
+                typ: {name: value for name, value in radio_dict[f"{typ}_cache"].depth().items() if name in ("records", "bytes")}
+                for typ in cache_types(radio_dict)
+            } if radio_dict else None,
+        }
+
+    def list(self):
+        return [self.describe(key) for key in list(STATIONS)]
+
+    def _attach_webhooks(self, worker):
+        """Zaradí webhook stanicu na server a otvorí jej port a cesty zo stations.json."""
+        global WEBHOOKS
+        if not worker.webhooks():
+            return
+        if WEBHOOKS is None:
+            try:
+                WEBHOOKS = start_webhooks([worker], always=True)
+            except OSError as e:
+                raise ValueError(f"webhook port sa nedá otvoriť: {e}") from e
+        else:
+            WEBHOOKS.attach(worker)
+
+    def add(self, key, station):
+        with self.lock:
+            if key in STATIONS:
+                raise Conflict(f"stanica {key} už existuje")
+            check_station(station)
+            if any(other["radio_name"] == station["radio_name"] for other in STATIONS.values()):
+                raise Conflict(f"radio_name {station['radio_name']} už používa iná stanica")
+            station.pop("paused", None)
+            STATIONS[key] = station
+            try:
+                worker = start_station(key)
+            except Exception:
+                del STATIONS[key]
+                RADIO_WORKERS.pop(key, None)
+                raise
+            try:
+                self._attach_webhooks(worker)
+            except Exception:
+                # Obsadený port alebo cesta: stanica sa neuloží a nič nezbiera
+                stop_station(key, worker, False)
+                del STATIONS[key]
+                raise
+            self._save()
+            log(station["radio_name"], "---", "Stanica pridaná cez admin API", "admin")
+            return self.describe(key)
+
+    def pause(self, key):
+        with self.lock:
+            station = self._station(key)
+            worker = WORKERS.get(key)
+            if worker is None or not worker.running:
+                raise Conflict(f"stanica {key} je už pozastavená")
+            worker.stop()
+            close_rollups(RADIO_WORKERS[key])
+            flush_radio(RADIO_WORKERS[key], force=True)
+            station["paused"] = True
+            self._save()
+            log(station["radio_name"], worker.current_song_id, "Stanica pozastavená cez admin API", "admin")
+            return self.describe(key)
+
+    def resume(self, key):
+        with self.lock:
+            station = self._station(key)
+            previous = WORKERS.get(key)
+            if previous is not None and previous.running:
+                raise Conflict(f"stanica {key} už beží")
+            worker = start_station(key, previous)
+            station.pop("paused", None)
+            self._save()
+            self._attach_webhooks(worker)
+            log(station["radio_name"], worker.current_song_id, "Stanica obnovená cez admin API", "admin")
+            return self.describe(key)
+
+    def retune(self, key, changes):
+        with self.lock:
+            station = self._station(key)
+            unknown = set(changes) - set(RETUNE_FIELDS)
+            if unknown:
+                raise ValueError(f"{', '.join(sorted(unknown))}: nedá sa meniť (len {', '.join(RETUNE_FIELDS)})")
+            bounded = station["song"]["transport"] == "poll" and station.get("song_bounds", SONG_BOUNDS)
+            if "song_interval" in changes and "song_bounds" not in changes and bounded:
+                # Adaptívny poll beží v rozsahu song_bounds, samotný song_interval by nemal účinok
+                raise ValueError("song_interval: stanica polluje adaptívne, zmeň song_bounds (null = fixne každých song_interval)")
+            check_intervals(changes)
+            station.update(changes)
+            self._save()
+            radio_dict = RADIO_WORKERS.get(key)
+            if radio_dict is not None:
+                radio_dict.pop("song_bounds", None)
+                radio_dict.update(make_radio_intervals(station))
+                radio_dict["flush_age"] = {typ: min(age, radio_dict["upload_interval"]) for typ, age in radio_dict["flush_age"].items()}
+            worker = WORKERS.get(key)
+            if worker is not None:
+                song_interval = radio_dict["intervals"][0]
+                worker.retune(*radio_dict["intervals"], radio_dict.get("song_bounds", (song_interval, song_interval)))
+            log(station["radio_name"], "---", f"Nové nastavenie: {changes}", "admin")
+            return self.describe(key)
+
+    def remove(self, key):
+        with self.lock:
+            station = self._station(key)
+            worker = WORKERS.get(key)
+            if worker is not None:
+                stop_station(key, worker, True)
+            elif key in RADIO_WORKERS:
+                RADIO_WORKERS.pop(key)
+            if WEBHOOKS is not None:
+                WEBHOOKS.detach(key)
+            del STATIONS[key]
+            self._save()
+            log(station["radio_name"], "---", "Stanica odobraná cez admin API", "admin")
+
+def check_stations():
+    """Overí celý stations.json pred štartom; chybná stanica ukončí proces s názvom poľa."""
+    for key, station in STATIONS.items():
+        try:
+            check_station(station)
+        except ValueError as e:
+            sys.exit(f"{STATIONS_FILE}: stanica {key}: {e}")
 
 def main():
-    for radio_key, radio_dict in RADIO_WORKERS.items():
-        start_radio_worker(radio_key, radio_dict)
+    global WEBHOOKS
+    check_stations()
+    if SHARD_SLOT is not None:
+        run_shard_member()
+        return
+    if SHARD_PROCESSES:
+        run_supervisor()
+        return
+    UPLOADER.start()
+    start_housekeeping()
+    # Pozastavené stanice (admin API) sa pri štarte nespúšťajú
+    RADIO_WORKERS.update({key: make_radio_dict(station) for key, station in STATIONS.items() if not station.get("paused")})
+    stagger_flushes(list(RADIO_WORKERS.values()))
+    if RUNTIME == "async":
+        main_async()
+        return
+    WORKERS.update({radio_key: start_radio_worker(radio_key, radio_dict) for radio_key, radio_dict in RADIO_WORKERS.items()})
+    WEBHOOKS = start_webhooks(list(WORKERS.values()))
+    start_metrics()
+    # Pridávanie a pauza staníc za behu len v režime threads
+    start_admin(StationManager())
     while True:
         time.sleep(60)
 
@@ -0,0 +1,326 @@
+"""
+Dorovnanie lokálneho data/ adresára s R2.
+
+Prejde data/<RADIO>/<typ>/<deň>/<súbor>, pre každý súbor urobí HEAD na
+bronze/<RADIO>/<typ>/<deň>/<súbor> a porovná sha256 z metadát (staršie
+objekty bez metadát podľa ETag/veľkosti). Chýbajúce alebo odlišné objekty
+nahrá znova; nahraté aj prítomné objekty, ktoré chýbajú v dennom manifeste,
+do neho doplní. Beží paralelne s limitom
+požiadaviek za sekundu; hotové súbory sa zapisujú do stavového súboru,
+takže prerušený beh pokračuje tam, kde skončil.
+
+    python backfill.py --workers 16 --rate 50
+    python backfill.py --station ROCK --dry-run
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import logger
+import writer
+from logger import log
+from manifest import ManifestWriter, manifest_entry, manifest_info, manifest_key, parse_partition, partition
+from uploader import BASE_DELAY, MAX_DELAY
+
+DATA_DIR = "data"
+STATE_FILE = f"{DATA_DIR}/.backfill_state.ndjson"
+BACKFILL_WORKERS = 8
+# Požiadavky (HEAD aj PUT) za sekundu, 0 = bez limitu
+BACKFILL_RATE = 20.0
+# Mladšie súbory môže práve zapisovať alebo nahrávať bežiaci collector
+BACKFILL_MIN_AGE = 60
+BACKFILL_RETRIES = 3
+# Ako často sa vypíše priebeh (počet súborov)
+PROGRESS_EVERY = 500
+# Koľko objektov jedného manifestu sa zapíše naraz; súbory sa označia za hotové až po zápise
+MANIFEST_BATCH = 200
+
+
+class RateLimiter:
+    """Token bucket zdieľaný vláknami; acquire čaká, kým je požiadavka povolená."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class BackfillState:
+    """Append-only zoznam hotových súborov (cesta, veľkosť, mtime)."""
+
+    def __init__(self, path, reset=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if reset and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Neúplný posledný riadok po páde
+                        continue
+                    self.done[entry["path"]] = (entry["size"], entry["mtime"])
+        self.file = open(path, "a", encoding="utf-8")
+
+    def is_done(self, path, stat):
+        return self.done.get(path) == (stat.st_size, stat.st_mtime)
+
+    def mark(self, path, stat, result):
+        line = json.dumps({"path": path, "size": stat.st_size, "mtime": stat.st_mtime, "result": result})
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def scan(data_dir, stations=None):
+    """Dvojice (lokálna cesta, R2 kľúč) pre všetky dávky v data_dir."""
+    for radio in sorted(os.listdir(data_dir)):
+        radio_dir = os.path.join(data_dir, radio)
+        if radio.startswith(".") or not os.path.isdir(radio_dir) or (stations and radio not in stations):
+            continue
+        for root, dirs, files in os.walk(radio_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if writer.format_of(name) is None:
+                    continue
+                path = os.path.join(root, name)
+                yield path, "bronze/" + os.path.relpath(path, data_dir).replace(os.sep, "/")
+
+
+def same_object(head, path, checksum):
+    expected = head.get("Metadata", {}).get("sha256")
+    if expected:
+        return expected == checksum
+    # Objekty zo starého uploadu nemajú sha256, jednodielny upload má v ETag md5
+    etag = head.get("ETag", "").strip('"')
+    if etag and "-" not in etag:
+        with open(path, "rb") as f:
+            return etag == hashlib.md5(f.read()).hexdigest()
+    return head.get("ContentLength") == os.path.getsize(path)
+
+
+def manifest_target(r2_key):
+    """(stanica, typ, rozloženie, epoch dňa) z bronze/<RADIO>/<typ>/<deň>/<súbor>, deň môže mať viac úrovní (ymd)."""
+    parts = r2_key.split("/")
+    partition = parse_partition("/".join(parts[3:-1]))
+    if partition is None:
+        return None
+    return (parts[1], parts[2]) + partition
+
+
+class Backfill:
+    def __init__(self, state, limiter, manifests=True, dry_run=False, retries=BACKFILL_RETRIES):
+        self.state = state
+        self.limiter = limiter
+        # Dry-run nič nezapisuje, ani manifesty a stav
+        self.manifests = ManifestWriter() if manifests and not dry_run else None
+        # Kľúče už zapísané v manifestoch, každý manifest sa číta raz
+        self.listed = {}
+        # Položky manifestov čakajúce na spoločný zápis
+        self.batches = {}
+        self.dry_run = dry_run
+        self.retries = retries
+        self.lock = threading.Lock()
+        # missing/mismatched len pri dry-run, inak sa také súbory rátajú ako uploaded
+        self.counts = {"present": 0, "uploaded": 0, "missing": 0, "mismatched": 0, "failed": 0, "bytes": 0, "manifested": 0,
+                       "skipped": 0}
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counts[name] += value
+
+    def _retry(self, func, *args):
+        for attempt in range(self.retries + 1):
+            try:
+                return func(*args)
+            except FileNotFoundError:
+                raise
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt)))
+
+    def reconcile(self, path, r2_key, checksum):
+        self.limiter.acquire()
+        head = writer.remote_head(r2_key)
+        if head is not None and same_object(head, path, checksum):
+            return "present"
+        if self.dry_run:
+            log(None, None, f"Backfill: {'chýba' if head is None else 'líši sa'} {r2_key}", "backfill")
+            return "missing" if head is None else "mismatched"
+        self.limiter.acquire()
+        writer.upload_file(path, r2_key, writer.format_of(path), checksum)
+        return "uploaded"
+
+    def _listed(self, key):
+        with self.lock:
+            if key in self.listed:
+                return self.listed[key]
+        self.limiter.acquire()
+        data = writer.download_bytes(key)
+        keys = {obj["key"] for obj in json.loads(data)["objects"]} if data else set()
+        with self.lock:
+            return self.listed.setdefault(key, keys)
+
+    def manifest_update(self, path, r2_key, checksum, size, uploaded):
+        """(info, položka) pre manifest, None ak objekt v manifeste už je."""
+        target = manifest_target(r2_key)
+        if target is None:
+            return None
+        radio, typ, layout, timestamp = target
+        # Prítomný objekt môže v manifeste chýbať (pád medzi uploadom a manifestom, dáta spred manifestov)
+        if not uploaded and r2_key in self._listed(manifest_key(radio, partition(timestamp, layout))):
+            return None
+        info = manifest_info(writer.read_entries(path, writer.format_of(path)), radio, typ, timestamp, layout)
+        return info, manifest_entry(r2_key, checksum, info, size)
+
+    def defer(self, info, entry, done):
+        with self.lock:
+            batch = self.batches.setdefault(info["key"], {"info": info, "entries": [], "done": []})
+            batch["entries"].append(entry)
+            batch["done"].append(done)
+            if len(batch["entries"]) < MANIFEST_BATCH:
+                return
+            del self.batches[info["key"]]
+        self.write_batch(batch)
+
+    def write_batch(self, batch):
+        def write():
+            # GET a PUT manifestu
+            self.limiter.acquire()
+            self.limiter.acquire()
+            self.manifests.add_batch(batch["info"], batch["entries"])
+        try:
+            self._retry(write)
+        except Exception as e:
+            self.count("failed", len(batch["done"]))
+            log(None, None, f"Backfill ERROR: manifest {batch['info']['key']} :: {e}", "backfill", "error")
+            return
+        with self.lock:
+            self.listed.setdefault(batch["info"]["key"], set()).update(entry["key"] for entry in batch["entries"])
+        self.count("manifested", len(batch["entries"]))
+        for path, stat, result in batch["done"]:
+            self.finish(path, stat, result)
+
+    def flush(self):
+        with self.lock:
+            batches = list(self.batches.values())
+            self.batches.clear()
+        for batch in batches:
+            self.write_batch(batch)
+
+    def finish(self, path, stat, result):
+        self.count(result)
+        if result == "uploaded":
+            self.count("bytes", stat.st_size)
+        if not self.dry_run:
+            self.state.mark(path, stat, result)
+
+    def process(self, path, r2_key, stat):
+        try:
+            checksum = writer.file_checksum(path)
+            result = self._retry(self.reconcile, path, r2_key, checksum)
+            update = None
+            if result in ("present", "uploaded") and self.manifests is not None:
+                update = self._retry(self.manifest_update, path, r2_key, checksum, stat.st_size, result == "uploaded")
+        except FileNotFoundError:
+            # Bežiaci zberač súbor medzitým nahral a zmazal (alebo vyradil pri kvóte)
+            self.count("skipped")
+            return
+        except Exception as e:
+            self.count("failed")
+            log(None, None, f"Backfill ERROR: {path} -> {r2_key} :: {e}", "backfill", "error", key=r2_key)
+            return
+        if result not in ("present", "uploaded"):
+            self.count(result)
+        elif update is not None:
+            # Objekt už je nahraný, za hotový sa považuje až po zápise manifestu
+            self.defer(*update, (path, stat, result))
+        else:
+            self.finish(path, stat, result)
+
+
+def run(data_dir=DATA_DIR, stations=None, workers=BACKFILL_WORKERS, rate=BACKFILL_RATE, min_age=BACKFILL_MIN_AGE,
+        state_file=STATE_FILE, reset=False, manifests=True, dry_run=False):
+    state = BackfillState(state_file, reset)
+    backfill = Backfill(state, RateLimiter(rate), manifests, dry_run)
+    started = time.monotonic()
+    submitted = 0
+    cutoff = time.time() - min_age
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for path, r2_key in scan(data_dir, stations):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    # Zmazaný zberačom od výpisu adresára
+                    backfill.count("skipped")
+                    continue
+                if state.is_done(path, stat) or stat.st_mtime > cutoff:
+                    backfill.count("skipped")
+                    continue
+                # Obmedzená fronta - pri státisícoch súborov nedržíme všetky futures naraz
+                if len(pending) >= workers * 4:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                pending.add(pool.submit(backfill.process, path, r2_key, stat))
+                submitted += 1
+                if submitted % PROGRESS_EVERY == 0:
+                    log(None, None, f"Backfill: {submitted} súborov zaradených, {backfill.counts}", "backfill")
+        backfill.flush()
+    finally:
+        state.close()
+    counts = dict(backfill.counts, seconds=round(time.monotonic() - started, 1))
+    log(None, None, f"Backfill hotový: {counts}", "backfill")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nahrá do R2 lokálne dávky, ktoré tam chýbajú alebo sa líšia.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--station", action="append", help="len táto stanica (radio_name), dá sa opakovať")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--rate", type=float, default=BACKFILL_RATE, help="požiadavky za sekundu, 0 = bez limitu")
+    parser.add_argument("--min-age", type=float, default=BACKFILL_MIN_AGE, help="preskoč súbory mladšie ako (s)")
+    parser.add_argument("--state-file", default=STATE_FILE)
+    parser.add_argument("--reset", action="store_true", help="zahoď uložený priebeh a skontroluj všetko znova")
+    parser.add_argument("--no-manifest", action="store_true", help="nedopĺňaj denné manifesty")
+    parser.add_argument("--dry-run", action="store_true", help="len vypíš chýbajúce a odlišné objekty")
+    args = parser.parse_args()
+    counts = run(args.data_dir, args.station, args.workers, args.rate, args.min_age, args.state_file,
+                 args.reset, not args.no_manifest, args.dry_run)
+    # Logger zapisuje z vlákna na pozadí, výsledok vypíšeme aj priamo až po jeho vyprázdnení
+    logger.LOGGER.flush()
+    print(json.dumps(counts, ensure_ascii=False))
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
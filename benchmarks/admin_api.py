@@ -0,0 +1,290 @@
+"""
+Scenáre admin API (admin.py, app.StationManager) v jednom procese.
+
+Spustí stanice zo stations.json s URL presmerovanými na nedostupný
+lokálny port (workery len logujú chyby spojenia), admin API na voľnom
+porte a overí cez HTTP:
+  - pauza a druhá pauza (409),
+  - pauza WebSocket stanice (coalesce) odošle aj rámce od posledného tiku samplera,
+  - pridaná webhook stanica prijíma na svojom porte a ceste zo stations.json,
+    tá istá cesta pre inú stanicu (400), po odobratí cesta vráti 404,
+  - pridanie stanice s neplatným intervalom, song_bounds, radio_name, webhook
+    portom alebo song.display (400),
+  - pauza -> odobratie pre každú WebSocket stanicu (worker.stop() dvakrát),
+  - odobratie bežiacej stanice,
+  - PATCH song_interval na adaptívne pollovanej stanici (400), prechod na
+    fixný interval cez song_bounds: null a späť na [min, max],
+  - flush_radio z dvoch vlákien naraz (upload vlákno a pauza): dávka sa
+    zaradí na upload raz, dva take_batch zo spoolu nevrátia tie isté segmenty,
+  - dva flushe v tej istej sekunde zapíšu dva rôzne súbory a R2 kľúče.
+
+    python benchmarks/admin_api.py
+"""
+import asyncio
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEAD_URL = "http://127.0.0.1:9/"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def call(port, method, path, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        try:
+            return e.code, json.loads(body)
+        except ValueError:
+            # 500 z aiohttp je text
+            return e.code, body.decode("utf-8", "replace")
+
+
+def prepare(workdir):
+    with open(os.path.join(ROOT, "stations.json"), encoding="utf-8") as f:
+        stations = json.load(f)
+    for station in stations.values():
+        for typ in ("song", "listeners"):
+            if "url" in station[typ]:
+                station[typ]["url"] = DEAD_URL.replace("http", "ws") if station[typ]["transport"] == "ws" else DEAD_URL
+    with open(os.path.join(workdir, "stations.json"), "w", encoding="utf-8") as f:
+        json.dump(stations, f)
+    os.chdir(workdir)
+    admin_port = free_port()
+    os.environ.update({
+        "STATIONS_FILE": "stations.json", "R2_ENDPOINT": DEAD_URL, "R2_KEY_ID": "test", "R2_SECRET": "test",
+        "R2_BUCKET": "test", "METRICS_PORT": "0", "WEBHOOK_PORT": str(free_port()), "ADMIN_PORT": str(admin_port),
+        "HOUSEKEEPING": "0",
+    })
+    return stations, admin_port
+
+
+def retune(app, port, stations, check):
+    key = next(key for key, station in stations.items() if station["song"]["transport"] == "poll")
+    scheduler = app.WORKERS[key].scheduler
+    status, body = call(port, "PATCH", f"/stations/{key}", {"song_interval": 7})
+    check("song_interval na adaptívnej stanici -> 400", status == 400, f"{status} {body}")
+    status, body = call(port, "PATCH", f"/stations/{key}", {"song_interval": 7, "song_bounds": None})
+    check("song_bounds: null -> fixne song_interval",
+          status == 200 and (scheduler.min_interval, scheduler.max_interval, scheduler.next_delay(time.time())) == (7, 7, 7)
+          and "song_bounds" not in app.RADIO_WORKERS[key], f"{status} {body}")
+    status, body = call(port, "PATCH", f"/stations/{key}", {"song_interval": 9})
+    check("song_interval na fixnej stanici", status == 200 and scheduler.next_delay(time.time()) == 9, f"{status} {body}")
+    status, body = call(port, "PATCH", f"/stations/{key}", {"song_bounds": [3, 30]})
+    check("späť na song_bounds [3, 30]",
+          status == 200 and (scheduler.min_interval, scheduler.max_interval) == (3, 30), f"{status} {body}")
+
+
+def invalid_add(app, port, stations, check):
+    template = next(iter(stations.values()))
+    for name, changes in (("song_interval \"abc\"", {"song_interval": "abc"}),
+                          ("song_bounds [5]", {"song_bounds": [5]}),
+                          ("radio_name ../../escape", {"radio_name": "../../escape"}),
+                          ("webhook bez portu", {"song": {**template["song"], "transport": "webhook", "port": None,
+                                                          "paths": ["/new"]}}),
+                          ("song.display null", {"song": {**template["song"], "display": None}})):
+        station = {**template, "radio_name": "NEW", **changes}
+        status, body = call(port, "POST", "/stations", {"key": "new", "station": station})
+        check(f"pridanie s {name} -> 400", status == 400 and "new" not in app.STATIONS
+              and not os.path.exists(os.path.join("spool", "..", "..", "escape")), f"{status} {body}")
+
+
+def live_ws_server(port, interval=0.02):
+    import websockets
+    from websockets.asyncio.server import serve
+
+    async def handler(ws):
+        n = 0
+        try:
+            while True:
+                await ws.send(json.dumps({"listeners": 1000 + n}))
+                n += 1
+                await asyncio.sleep(interval)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def run():
+        async with serve(handler, "127.0.0.1", port):
+            await asyncio.Future()
+    threading.Thread(target=asyncio.run, args=(run(),), daemon=True).start()
+
+
+def pause_drains_coalescer(app, port, stations, check):
+    import writer
+    ws_port = free_port()
+    live_ws_server(ws_port)
+    template = next(station for station in stations.values() if station["listeners"]["transport"] == "ws")
+    station = json.loads(json.dumps(template))
+    station.update(radio_name="LIVE", listeners_interval=60)
+    station["listeners"]["url"] = f"ws://127.0.0.1:{ws_port}/"
+    call(port, "POST", "/stations", {"key": "live", "station": station})
+    time.sleep(1.5)
+    submitted = []
+    submit = app.UPLOADER.submit
+    app.UPLOADER.submit = lambda local_file, r2_key, *args: submitted.append(local_file) or submit(local_file, r2_key, *args)
+    try:
+        status, _ = call(port, "POST", "/stations/live/pause")
+    finally:
+        app.UPLOADER.submit = submit
+    frames = [entry.get("frames_coalesced", 1) for local_file in submitted if "/listeners/" in local_file
+              for entry in writer.read_entries(local_file, writer.format_of(local_file))]
+    check("pauza WebSocket stanice -> posledná zlúčená vzorka", status == 200 and sum(frames) > 0,
+          f"{status}, vzorky {frames}")
+    call(port, "DELETE", "/stations/live")
+
+
+def webhook_declared_path(app, port, stations, check):
+    hook_port = free_port()
+    template = next(station for station in stations.values() if station["listeners"]["transport"] == "ws")
+    station = json.loads(json.dumps(template))
+    station["radio_name"] = "HOOK"
+    station["listeners"] = {"transport": "webhook", "port": hook_port, "paths": ["/hook-listeners"],
+                            "schema": {"keys": ["listeners"], "types": {"listeners": "int"}}}
+    status, body = call(port, "POST", "/stations", {"key": "hook", "station": station})
+    check("pridanie webhook stanice s vlastným portom", status == 201, f"{status} {body}")
+    status, body = call(hook_port, "POST", "/hook-listeners", {"listeners": 7})
+    deadline = time.monotonic() + 5
+    while app.WORKERS["hook"].last_listeners is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    check("POST na deklarovanú cestu -> záznam stanice",
+          status == 200 and (app.WORKERS["hook"].last_listeners or (None,))[0] == {"listeners": 7}, f"{status} {body}")
+    status, body = call(port, "POST", "/stations", {"key": "hook2", "station": {**station, "radio_name": "HOOK2"}})
+    check("tá istá cesta pre inú stanicu -> 400", status == 400 and "hook2" not in app.STATIONS, f"{status} {body}")
+    call(port, "DELETE", "/stations/hook")
+    time.sleep(0.2)
+    status, body = call(hook_port, "POST", "/hook-listeners", {"listeners": 8})
+    check("po odobratí deklarovaná cesta -> 404", status == 404, f"{status} {body}")
+
+
+def concurrent_flush(app, check):
+    from record import Record
+    from spool import Spool
+    key = next(iter(app.RADIO_WORKERS))
+    radio_dict = app.RADIO_WORKERS[key]
+    for i in range(10):
+        radio_dict["song_cache"].append(Record({"title": f"T{i}"}, "s", time.time(), True, "s"))
+    submitted = []
+    submit = app.UPLOADER.submit
+
+    def slow_submit(local_file, r2_key, *args):
+        # Prvý flush ostane v kritickej časti, kým druhý začne
+        submitted.append(r2_key)
+        time.sleep(0.2)
+        return submit(local_file, r2_key, *args)
+    app.UPLOADER.submit = slow_submit
+    try:
+        threads = [threading.Thread(target=app.flush_radio, args=(radio_dict, True)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+    finally:
+        app.UPLOADER.submit = submit
+    songs = [r2_key for r2_key in submitted if "/song/" in r2_key]
+    check("súbežný flush_radio -> jedna dávka", len(songs) == 1, songs)
+
+    # Vynútený flush hneď po periodickom, v tej istej sekunde
+    submitted.clear()
+    app.UPLOADER.submit = lambda local_file, r2_key, *args: submitted.append((local_file, r2_key))
+    try:
+        for batch in range(2):
+            radio_dict["song_cache"].append(Record({"title": f"B{batch}"}, "s", time.time(), True, "s"))
+            app.flush_cache(radio_dict["song_cache"], "song", radio_dict["radio_name"])
+    finally:
+        app.UPLOADER.submit = submit
+    files, keys = {local_file for local_file, _ in submitted}, {r2_key for _, r2_key in submitted}
+    check("dva flushe v jednej sekunde -> dva súbory a kľúče",
+          len(files) == len(keys) == 2 and all(os.path.exists(local_file) for local_file in files), submitted)
+
+    spool = Spool(os.path.join("spool", "_check"))
+    for i in range(10):
+        spool.append({"n": i})
+    first, second = spool.take_batch(), spool.take_batch()
+    try:
+        first.commit()
+        second.commit()
+        committed = True
+    except FileNotFoundError:
+        committed = False
+    check("dva take_batch -> rôzne segmenty", (len(first.entries), len(second.entries)) == (10, 0) and committed,
+          f"{len(first.entries)} a {len(second.entries)} záznamov, commit {'OK' if committed else 'FileNotFoundError'}")
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="admin-")
+    failures = []
+
+    def check(name, ok, detail=""):
+        print(f"  {'OK  ' if ok else 'FAIL'} {name}{f' ({detail})' if detail and not ok else ''}")
+        if not ok:
+            failures.append(name)
+
+    try:
+        stations, port = prepare(workdir)
+        import app
+        import logger
+        from admin import start_admin
+        # Logy chýb spojenia by prekryli výsledky
+        logger.LOGGER.stream = open(os.devnull, "w")
+        for key in stations:
+            app.start_station(key)
+        app.WEBHOOKS = app.start_webhooks(list(app.WORKERS.values()))
+        start_admin(app.StationManager(), port=port)
+        time.sleep(0.5)
+
+        ws_keys = [key for key, station in stations.items() if station["listeners"]["transport"] == "ws"]
+        print(f"stanice {list(stations)}, WebSocket {ws_keys}")
+        retune(app, port, stations, check)
+        invalid_add(app, port, stations, check)
+        pause_drains_coalescer(app, port, stations, check)
+        webhook_declared_path(app, port, stations, check)
+        status, _ = call(port, "POST", f"/stations/{ws_keys[0]}/pause")
+        check("pauza", status == 200, status)
+        status, _ = call(port, "POST", f"/stations/{ws_keys[0]}/pause")
+        check("druhá pauza -> 409", status == 409, status)
+        for key in ws_keys:
+            if key != ws_keys[0]:
+                call(port, "POST", f"/stations/{key}/pause")
+            # run_ws medzitým zatvorí event loop
+            time.sleep(0.5)
+            status, body = call(port, "DELETE", f"/stations/{key}")
+            check(f"pauza -> odobratie {key}", status == 200 and key not in app.RADIO_WORKERS and key not in app.STATIONS,
+                  f"{status} {body}")
+        running = next(key for key in stations if key not in ws_keys)
+        status, _ = call(port, "DELETE", f"/stations/{running}")
+        check(f"odobratie bežiacej {running}", status == 200 and running not in app.WORKERS, status)
+        status, body = call(port, "GET", "/stations")
+        listed = {item["key"] for item in body} if status == 200 else body
+        check("zoznam bez odobratých", listed == set(stations) - set(ws_keys) - {running}, listed)
+
+        concurrent_flush(app, check)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("výsledok:", "všetko OK" if not failures else f"zlyhalo {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+"""
+backfill.py proti lokálnemu fake S3 s oneskorením a chybami.
+
+Vytvorí data/ strom s --files dávkami (ndjson, 4 stanice, 2 typy, 6 dní)
+a bucket, v ktorom je časť objektov správne (so sha256), časť zo starého
+uploadu bez metadát, časť s iným obsahom a zvyšok chýba. Potom:
+  1. spustí backfill v podprocese a po --kill-after s ho zabije,
+  2. spustí ho znova nad tým istým stavovým súborom (pokračovanie),
+  3. overí, že každý lokálny súbor je v buckete s rovnakým obsahom
+     a nahraté objekty sú v denných manifestoch.
+Pre porovnanie zmeria aj beh s jedným workerom na vzorke súborov.
+Nakoniec beh --reset, počas ktorého "zberač" maže každý druhý súbor (upload
+a housekeeping): zmazané súbory sa rátajú ako skipped, nie failed.
+
+    python benchmarks/backfill_resume.py --files 3000 --workers 16 --latency 0.02
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_s3 import FakeS3
+from upload_pool import configure, BUCKET
+
+STATIONS = ("ROCK", "BETA", "MELODY", "FUNRADIO")
+TYPES = ("song", "listeners")
+DAYS = ("01-11-2025", "02-11-2025", "03-11-2025", "04-11-2025", "05-11-2025", "06-11-2025")
+
+
+def make_tree(data_dir, count):
+    files = []
+    for i in range(count):
+        radio, typ, day = STATIONS[i % 4], TYPES[i // 4 % 2], DAYS[i // 8 % len(DAYS)]
+        folder = os.path.join(data_dir, radio, typ, day)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{i // 48:02d}-{i % 60:02d}-{i % 7:02d}.ndjson")
+        with open(path, "w", encoding="utf-8") as f:
+            for n in range(20):
+                f.write(json.dumps({"listeners": random.randint(900, 1300), "recorded_at": f"2025-11-0{DAYS.index(day) + 1}T{n:02d}:00:00+01:00",
+                                    "raw_valid": True, "song_session_id": "s"}) + "\n")
+        files.append(path)
+    # Staré súbory, aby ich --min-age nepreskočil
+    old = time.time() - 3600
+    for path in files:
+        os.utime(path, (old, old))
+    return files
+
+
+def seed_bucket(s3, data_dir, files):
+    kinds = {"present": 0, "legacy": 0, "mismatched": 0, "missing": 0}
+    for path in files:
+        key = "bronze/" + os.path.relpath(path, data_dir).replace(os.sep, "/")
+        with open(path, "rb") as f:
+            body = f.read()
+        roll = random.random()
+        kind = "present" if roll < 0.5 else "legacy" if roll < 0.6 else "mismatched" if roll < 0.65 else "missing"
+        kinds[kind] += 1
+        if kind == "missing":
+            continue
+        if kind == "mismatched":
+            body = body[: len(body) // 2]
+        meta = {"sha256": hashlib.sha256(body).hexdigest()} if kind != "legacy" else {}
+        s3.objects[(BUCKET, key)] = {
+            "body": body, "etag": '"' + hashlib.md5(body).hexdigest() + '"', "content_type": "application/x-ndjson",
+            "content_encoding": "", "meta": meta, "last_modified": time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime()),
+            "put_at": time.time(),
+        }
+    return kinds
+
+
+def verify(s3, data_dir, files):
+    wrong = 0
+    for path in files:
+        key = "bronze/" + os.path.relpath(path, data_dir).replace(os.sep, "/")
+        with open(path, "rb") as f:
+            body = f.read()
+        obj = s3.objects.get((BUCKET, key))
+        if obj is None or obj["body"] != body:
+            wrong += 1
+    return wrong
+
+
+def manifest_entries(s3):
+    return sum(
+        len(json.loads(obj["body"])["objects"]) for (bucket, key), obj in s3.objects.items() if "/_manifest/" in key
+    )
+
+
+def run_backfill(workdir, workers, rate, timeout=None, extra=()):
+    started = time.monotonic()
+    child = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "backfill.py"), "--workers", str(workers), "--rate", str(rate), *extra],
+        cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        out, _ = child.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        child.kill()
+        child.wait()
+        return None, time.monotonic() - started
+    # Výsledok je jediný riadok v JSON, ostatné sú logy; bez neho beh spadol
+    result = [line for line in out.splitlines() if line.startswith("{")]
+    return (json.loads(result[-1]) if result else {"exit": child.returncode}), time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=0, help="limit požiadaviek za sekundu, 0 = bez limitu")
+    parser.add_argument("--latency", type=float, default=0.02, help="oneskorenie fake S3 na požiadavku (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.02)
+    parser.add_argument("--kill-after", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    s3 = FakeS3(latency=args.latency, fail_rate=args.fail_rate).start()
+    configure(s3.endpoint)
+    workdir = tempfile.mkdtemp(prefix="backfill-")
+    try:
+        data_dir = os.path.join(workdir, "data")
+        files = make_tree(data_dir, args.files)
+        kinds = seed_bucket(s3, data_dir, files)
+        print(f"{args.files} súborov: " + ", ".join(f"{k} {v}" for k, v in kinds.items()))
+
+        first, first_s = run_backfill(workdir, args.workers, args.rate, timeout=args.kill_after)
+        with open(os.path.join(data_dir, ".backfill_state.ndjson"), encoding="utf-8") as f:
+            done = sum(1 for _ in f)
+        print(f"1. beh zabitý po {first_s:.1f} s, v stave {done} hotových súborov" if first is None else f"1. beh dobehol: {first}")
+        second, second_s = run_backfill(workdir, args.workers, args.rate)
+        print(f"2. beh {second_s:.1f} s: {second}")
+        third, third_s = run_backfill(workdir, args.workers, args.rate)
+        print(f"3. beh {third_s:.1f} s (všetko v stave): {third}")
+        print(f"nesprávne/chýbajúce objekty po backfille: {verify(s3, data_dir, files)}, "
+              f"položky v manifestoch: {manifest_entries(s3)}")
+
+        sample = min(300, args.files)
+        for workers in (1, args.workers):
+            s3.fail_rate = 0
+            for path in files[:sample]:
+                s3.objects.pop((BUCKET, "bronze/" + os.path.relpath(path, data_dir).replace(os.sep, "/")), None)
+            counts, elapsed = run_backfill(workdir, workers, 0, extra=("--reset",))
+            print(f"--workers {workers:>2} --reset: {elapsed:6.1f} s, {args.files / elapsed:7.1f} súborov/s, "
+                  f"nahraté {counts['uploaded']}, prítomné {counts['present']}")
+
+        doomed = files[1::2]
+
+        def collector():
+            # Zberač maže nahraté súbory, kým backfill ešte prechádza stromom
+            time.sleep(0.5)
+            for path in doomed:
+                os.remove(path)
+                time.sleep(1.0 / len(doomed))
+        deleter = threading.Thread(target=collector)
+        deleter.start()
+        counts, elapsed = run_backfill(workdir, args.workers, 0, extra=("--reset",))
+        deleter.join()
+        print(f"--reset pri mazaní {len(doomed)} súborov: {elapsed:.1f} s, {counts}")
+    finally:
+        s3.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Záťažový test BatchBuffer: súbežní produceri a flush vlákno, ktoré priebežne
+vymieňa buffer. Overí, že žiadny záznam sa nestratí ani nezdvojí (pri
+drop_oldest sa chýbajúce záznamy musia presne zhodovať s počítadlom dropped).
+Nakoniec overí, že prekročenie rozpočtu o jeden záznam vyradí práve jeden.
+
+Pre porovnanie beží aj pôvodný vzor list.copy() + list.clear().
+
+    python benchmarks/buffer_stress.py --producers 8 --records 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from buffer import BatchBuffer, DROP_OLDEST, SPILL, record_size
+from spool import Spool
+
+
+def run(make_take, append, producers, records):
+    received = []
+    done = threading.Event()
+
+    def produce(p):
+        for i in range(records):
+            append({"producer": p, "seq": i, "listeners": i % 500})
+
+    def consume():
+        while not done.is_set():
+            received.extend(make_take())
+        received.extend(make_take())
+
+    consumer = threading.Thread(target=consume)
+    threads = [threading.Thread(target=produce, args=(p,)) for p in range(producers)]
+    start = time.perf_counter()
+    consumer.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    done.set()
+    consumer.join()
+    elapsed = time.perf_counter() - start
+    keys = [(r["producer"], r["seq"]) for r in received]
+    return len(keys), len(set(keys)), elapsed
+
+
+def take_from(buffer):
+    def take():
+        batch = buffer.take_batch()
+        batch.commit()
+        return batch.entries
+    return take
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--records", type=int, default=50000)
+    args = parser.parse_args()
+    produced = args.producers * args.records
+    failures = 0
+
+    legacy = []
+
+    def legacy_take():
+        items = legacy.copy()
+        legacy.clear()
+        return items
+
+    total, unique, elapsed = run(legacy_take, legacy.append, args.producers, args.records)
+    print(f"{'list copy+clear':<16} produced={produced} received={unique} lost={produced - unique} ({elapsed:.2f}s)")
+
+    scenarios = [("unbounded", None, None)]
+    scenarios.append(("drop_oldest", DROP_OLDEST, None))
+    with tempfile.TemporaryDirectory() as tmp:
+        scenarios.append(("spill", SPILL, Spool(tmp, fsync_records=1000)))
+        for name, overflow, spill in scenarios:
+            if overflow is None:
+                buffer = BatchBuffer()
+            else:
+                buffer = BatchBuffer(max_records=1000, overflow=overflow, spill=spill)
+            total, unique, elapsed = run(take_from(buffer), buffer.append, args.producers, args.records)
+            depth = buffer.depth()
+            lost = produced - unique - depth["dropped"]
+            ok = total == unique and lost == 0 and depth["records"] == 0
+            failures += not ok
+            print(f"{name:<16} produced={produced} received={unique} duplicates={total - unique} "
+                  f"dropped={depth['dropped']} spilled={depth['spilled']} lost={lost} ({elapsed:.2f}s) "
+                  f"{'OK' if ok else 'FAIL'}")
+
+    # Jeden záznam nad max_records aj nad max_bytes vyradí len najstarší záznam
+    for name, limits in (("max_records", {"max_records": 5000}), ("max_bytes", {"max_bytes": 5000 * record_size({"seq": 0, "listeners": 0})})):
+        buffer = BatchBuffer(**limits)
+        for i in range(5001):
+            buffer.append({"seq": i, "listeners": 10000 + i})
+        entries = buffer.take_batch().entries
+        ok = buffer.dropped == 1 and entries[0]["seq"] == 1 and len(entries) == 5000
+        failures += not ok
+        print(f"{'+1 nad ' + name:<16} dropped={buffer.dropped} ponechané={len(entries)} {'OK' if ok else 'FAIL'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Run-length kompakcia dávky (compact.py) na 2 hodinách typických dát.
+
+Scenáre jednej stanice so vzorkou každých 30 s (240 záznamov):
+  beta-invalid    neplatná odpoveď, nezmenené HTTP telo (zdieľaný payload)
+  melody-sample   WebSocket sample, nový dict pri každom rámci, počet sa mení s p=--change
+  rock-coalesce   zlúčené listeners vzorky (frames_coalesced ~30), počet sa mení s p=--change
+Každý scenár ide cez BatchBuffer (Record) aj cez Spool (dict zo segmentu).
+Vypíše počet záznamov, veľkosť ndjson a ndjson.gz a čas kompakcie + zápisu.
+Pre porovnanie meria aj kľúč cez blake2b hash serializovaného záznamu.
+
+    python benchmarks/compaction.py --change 0.1
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import codec
+from buffer import BatchBuffer
+from compact import compact_entries
+from record import Record, as_dict
+from spool import Spool
+from writer import write_entries
+
+SAMPLES = 240
+STEP = 30.0
+
+
+def beta_invalid(change):
+    payload = {"radio": "Beta", "is_playing": True, "message": "Momentálne nehráme", "timestamp": "2025-11-04T16:16:20"}
+    error = "payload: chýba title | is_playing: očakávaná hodnota False"
+    return [Record(payload, "beta", t * STEP, False, "", error) for t in range(SAMPLES)]
+
+
+def melody_sample(change):
+    count = 1200
+    records = []
+    for t in range(SAMPLES):
+        if random.random() < change:
+            count += random.randint(-20, 20)
+        payload = {"last_update": "2025-11-04T16:16:20", "listeners": count}
+        records.append(Record(payload, "melody", t * STEP, True, "5f0c7a3e-4c9d-4b7a-9a51-2f0d6a1b9e11"))
+    return records
+
+
+def rock_coalesce(change):
+    count = 5400
+    records = []
+    for t in range(SAMPLES):
+        if random.random() < change:
+            count += random.randint(-50, 50)
+        extra = {"listeners_min": count, "listeners_max": count, "frames_coalesced": random.randint(28, 32)}
+        records.append(Record({"listeners": count}, "rock", t * STEP, True, "5f0c7a3e-4c9d-4b7a-9a51-2f0d6a1b9e11", None, extra))
+    return records
+
+
+def hash_keys(entries):
+    # Alternatíva: odtlačok každého záznamu bez recorded_at
+    keys = []
+    for entry in entries:
+        data = dict(as_dict(entry))
+        data.pop("recorded_at", None)
+        data.pop("frames_coalesced", None)
+        keys.append(hashlib.blake2b(codec.dumps(data), digest_size=16).digest())
+    return keys
+
+
+def write_size(entries, directory, fmt):
+    path = os.path.join(directory, "out." + fmt)
+    start = time.perf_counter()
+    write_entries(entries, path, fmt)
+    return os.path.getsize(path), time.perf_counter() - start
+
+
+def measure(name, records, directory):
+    for cache_name in ("memory", "spool"):
+        if cache_name == "memory":
+            cache = BatchBuffer()
+        else:
+            cache = Spool(os.path.join(directory, f"{name}-spool"))
+        for record in records:
+            cache.append(record)
+        entries = cache.take_batch().entries
+
+        start = time.perf_counter()
+        for _ in range(20):
+            compacted = compact_entries(entries)
+        compact_us = (time.perf_counter() - start) / 20 * 1e6
+        start = time.perf_counter()
+        for _ in range(20):
+            hash_keys(entries)
+        hash_us = (time.perf_counter() - start) / 20 * 1e6
+
+        raw_bytes, raw_write = write_size(entries, directory, "ndjson")
+        raw_gz, _ = write_size(entries, directory, "ndjson.gz")
+        out_bytes, out_write = write_size(compacted, directory, "ndjson")
+        out_gz, _ = write_size(compacted, directory, "ndjson.gz")
+        print(f"{name:>14} {cache_name:>7} {len(entries):>5} -> {len(compacted):<4} "
+              f"{raw_bytes / 1024:8.1f} -> {out_bytes / 1024:6.1f} KiB  gz {raw_gz / 1024:5.1f} -> {out_gz / 1024:4.1f} KiB  "
+              f"zápis {raw_write * 1000:5.2f} -> {(out_write * 1e6 + compact_us) / 1000:5.2f} ms  "
+              f"kompakcia {compact_us:7.0f} us (hash {hash_us:7.0f} us)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--change", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    print(f"{'scenár':>14} {'cache':>7} {'záznamy':>12} {'ndjson':>22}  {'ndjson.gz':>20}  "
+          f"{'zápis (vrátane kompakcie)':>25}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, make in (("beta-invalid", beta_invalid), ("melody-sample", melody_sample), ("rock-coalesce", rock_coalesce)):
+            measure(name, make(args.change), directory)
+
+
+if __name__ == "__main__":
+    main()
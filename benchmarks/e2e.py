@@ -0,0 +1,474 @@
+"""
+End-to-end benchmark celej pipeline app.py proti lokálnym simulátorom.
+
+Simulátor (proces benchmarku) hrá N staníc podľa vzorov zo stations.json:
+HTTP now-playing v tvare rock/funradio/beta/melody/jazz, HTTP listeners
+expres, WebSocket listeners rock/funradio/beta/melody a webhooky expres
+(song) a jazz (listeners), ktoré posiela na webhook server aplikácie.
+Fake S3 (fake_s3.py) zastupuje R2. Aplikácia beží ako samostatný proces
+(app.main v dočasnom adresári), takže CPU a pamäť sa merajú len pre ňu.
+
+Každá správa nesie poradové číslo - počet poslucháčov, resp. číslo v názve
+skladby ("Title 17"). Zo záznamov, ktoré dorazili do fake S3, sa počíta:
+  sent/s     správy odoslané simulátorom (zmeny skladby, rámce, webhooky)
+  ingest/s   prijaté správy (pri WebSocket súčet frames_coalesced)
+  lost       odoslané a neprijaté; pri polle sú to zmeny, ktoré poll nezachytil
+  ingest     odoslanie -> recorded_at záznamu (príjem a spracovanie)
+  delivery   odoslanie -> PUT objektu do S3 (vrátane čakania na flush)
+  dup        záznamy s už videným poradovým číslom - stanica zbieraná dvakrát
+             alebo nový vlastník po prevzatí; pri polle listeners aj opakovaná
+             nezmenená odpoveď
+CPU je podiel jadra procesu aplikácie počas merania, peak RSS je VmHWM.
+S --shards N beží aplikácia ako supervízor s N procesmi; CPU, pamäť a vlákna
+sú súčtom celého stromu procesov. --kill-shard S po S sekundách merania
+zabije (SIGKILL) jeden shard proces, stanice prevezmú ostatné po vypršaní
+leasu (SHARD_LEASE_TTL).
+
+    python benchmarks/e2e.py --stations 6 60 --duration 30 --push-rate 2
+    python benchmarks/e2e.py --stations 60 --runtime async --format ndjson.zst
+    SHARD_LEASE_TTL=10 python benchmarks/e2e.py --stations 300 --shards 4 --warmup 15 --kill-shard 10
+"""
+import argparse
+import asyncio
+import copy
+import datetime
+import gzip
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from zoneinfo import ZoneInfo
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_s3 import FakeS3
+
+ZONE = ZoneInfo("Europe/Bratislava")
+TEMPLATES = ("rock", "funradio", "jazz", "beta", "expres", "melody")
+# Kde v zázname je názov skladby s poradovým číslom
+TITLE_PATHS = {
+    "rock": "song.musicTitle",
+    "funradio": "song.musicTitle",
+    "jazz": "song.title",
+    "beta": "title",
+    "expres": "song",
+    "melody": "title",
+}
+BUCKET = "bronze-e2e"
+
+
+def song_payload(template, n, now):
+    stamp = datetime.datetime.fromtimestamp(now, ZONE)
+    title = f"Title {n}"
+    if template in ("rock", "funradio"):
+        return {
+            "song": {
+                "musicAuthor": "Author",
+                "musicTitle": title,
+                "musicCover": "",
+                "radio": template,
+                "startTime": stamp.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "last_update": stamp.isoformat(),
+        }
+    if template == "jazz":
+        return {"song": {
+            "play_date": stamp.strftime("%Y-%m-%d"),
+            "play_time": stamp.strftime("%H:%M:%S"),
+            "artist": ["Artist"],
+            "title": title,
+        }}
+    if template == "beta":
+        return {"radio": "Beta", "interpreters": "Artist", "title": title,
+                "start_time": stamp.isoformat(), "timestamp": stamp.isoformat()}
+    if template == "expres":
+        return {"song": title, "artists": ["Artist"], "isrc": "SK0000000001",
+                "start_time": stamp.strftime("%H:%M:%S"), "radio": "expres"}
+    return {"station": "Rádio Melody", "title": title, "artist": "Artist", "date": stamp.strftime("%d.%m.%Y"),
+            "time": stamp.strftime("%H:%M:%S"), "last_update": stamp.isoformat()}
+
+
+def listeners_payload(template, n, now):
+    stamp = datetime.datetime.fromtimestamp(now, ZONE).isoformat()
+    if template in ("jazz", "expres"):
+        return {"timestamp": stamp, "listeners": n, "radio": template}
+    if template == "beta":
+        return {"listeners": n, "timestamp": stamp}
+    if template == "melody":
+        return {"last_update": stamp, "listeners": n}
+    return {"listeners": n}
+
+
+def make_stations(count, sim_port, args):
+    from adapters.engine import load_stations
+    base = load_stations(os.path.join(ROOT, "stations.json"))
+    stations = {}
+    for i in range(count):
+        template = TEMPLATES[i % len(TEMPLATES)]
+        key = f"{template}{i}"
+        station = copy.deepcopy(base[template])
+        station["radio_name"] = key.upper()
+        station["template"] = template
+        for typ in ("song", "listeners"):
+            config = station[typ]
+            if config["transport"] == "poll":
+                config["url"] = f"http://127.0.0.1:{sim_port}/{key}/{typ}"
+            elif config["transport"] == "ws":
+                config["url"] = f"ws://127.0.0.1:{sim_port}/{key}/{typ}"
+                config["reconnect_delay"] = 0
+            else:
+                config["paths"] = []
+        station["song_interval"] = args.poll_interval
+        station["song_bounds"] = [args.poll_interval, args.poll_interval]
+        station["listeners_interval"] = args.listeners_interval
+        station["upload_interval"] = args.upload_interval
+        stations[key] = station
+    return stations
+
+
+class Simulator:
+    def __init__(self, stations, args):
+        self.stations = stations
+        self.args = args
+        self.current = {}
+        self.sent = {}
+        self.transports = {}
+        self.webhook_statuses = {}
+        self.active = asyncio.Event()
+        self.stopped = asyncio.Event()
+        for key, station in stations.items():
+            for typ in ("song", "listeners"):
+                self.sent[(station["radio_name"], typ)] = {}
+                self.transports[(station["radio_name"], typ)] = f"{typ}:{station[typ]['transport']}"
+
+    def emit(self, key, typ, n):
+        station = self.stations[key]
+        now = time.time()
+        make = song_payload if typ == "song" else listeners_payload
+        payload = make(station["template"], n, now)
+        self.current[(key, typ)] = payload
+        self.sent[(station["radio_name"], typ)][n] = now
+        return payload
+
+    async def http_handler(self, request):
+        from aiohttp import web
+        payload = self.current.get((request.match_info["key"], request.match_info["typ"]))
+        if payload is None:
+            return web.Response(status=503)
+        return web.json_response(payload)
+
+    async def ws_handler(self, request):
+        from aiohttp import web
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        key, typ = request.match_info["key"], request.match_info["typ"]
+        interval = 1 / self.args.push_rate
+        # Čítanie spracuje close rámec klienta, inak by klient čakal na close_timeout
+        reader = asyncio.create_task(ws.receive())
+        await self.active.wait()
+        n = self.listeners_start(key)
+        try:
+            while not ws.closed and not self.stopped.is_set():
+                n += 1
+                await ws.send_str(json.dumps(self.emit(key, typ, n)))
+                await asyncio.sleep(interval)
+        except ConnectionError:
+            pass
+        reader.cancel()
+        return ws
+
+    def listeners_start(self, key):
+        # Po reconnecte pokračujeme v číslovaní, aby sa poradové čísla neopakovali
+        sent = self.sent[(self.stations[key]["radio_name"], "listeners")]
+        return max(sent, default=0)
+
+    async def ticker(self, key, typ, interval, session, webhook_url=None):
+        await self.active.wait()
+        await asyncio.sleep(random.uniform(0, interval))
+        n = 0
+        while not self.stopped.is_set():
+            n += 1
+            payload = self.emit(key, typ, n)
+            if webhook_url:
+                try:
+                    async with session.post(webhook_url, json=payload) as resp:
+                        status = resp.status
+                except Exception:
+                    status = "error"
+                self.webhook_statuses[status] = self.webhook_statuses.get(status, 0) + 1
+            await asyncio.sleep(interval)
+
+    async def start(self, port, webhook_port):
+        import aiohttp
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/{key}/{typ}", self.ws_or_http)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=256))
+        tasks = []
+        for key, station in self.stations.items():
+            for typ, interval in (("song", self.args.song_change), ("listeners", 1 / self.args.push_rate)):
+                transport = station[typ]["transport"]
+                if transport == "ws":
+                    continue
+                url = f"http://127.0.0.1:{webhook_port}/webhook/{key}/{typ}" if transport == "webhook" else None
+                tasks.append(asyncio.create_task(self.ticker(key, typ, interval, session, url)))
+        return runner, session, tasks
+
+    async def ws_or_http(self, request):
+        if request.headers.get("Upgrade", "").lower() == "websocket":
+            return await self.ws_handler(request)
+        return await self.http_handler(request)
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except OSError:
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def tree_stats(pid):
+    total = {"cpu": 0.0, "rss_mb": 0.0, "peak_mb": 0.0, "threads": 0, "processes": 0}
+    for process in [pid] + child_pids(pid):
+        try:
+            stats = proc_stats(process)
+        except OSError:
+            continue
+        for key, value in stats.items():
+            total[key] += value
+        total["processes"] += 1
+    return total
+
+
+def proc_stats(pid):
+    status = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            status[key] = value.strip()
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return {
+        "cpu": (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK"),
+        "rss_mb": int(status["VmRSS"].split()[0]) / 1024,
+        "peak_mb": int(status["VmHWM"].split()[0]) / 1024,
+        "threads": int(status["Threads"]),
+    }
+
+
+def decode_object(key, body):
+    if key.endswith(".gz"):
+        body = gzip.decompress(body)
+    elif key.endswith(".zst"):
+        import zstandard
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    if key.endswith(".json"):
+        return json.loads(body)
+    return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))] if values else float("nan")
+
+
+def analyze(s3, simulator):
+    from adapters.schema import get_path
+    templates = {station["radio_name"]: station["template"] for station in simulator.stations.values()}
+    first = {}
+    frames = {}
+    records = {}
+    rollups = {"windows": 0, "samples": 0, "sessions": 0, "session_samples": 0, "manifests": 0}
+    for (bucket, key), obj in list(s3.objects.items()):
+        _, radio, typ = key.split("/")[:3]
+        if typ == "_manifest":
+            rollups["manifests"] += 1
+            continue
+        if typ == "listeners_rollup":
+            for window in decode_object(key, obj["body"]):
+                rollups["windows"] += 1
+                rollups["samples"] += window["samples"] if window["window_seconds"] == 60 else 0
+            continue
+        if typ == "song_session":
+            for session in decode_object(key, obj["body"]):
+                rollups["sessions"] += 1
+                rollups["session_samples"] += session["samples"]
+            continue
+        for record in decode_object(key, obj["body"]):
+            if not record.get("raw_valid"):
+                continue
+            if typ == "song":
+                n = int(get_path(record, TITLE_PATHS[templates[radio]]).split()[-1])
+            else:
+                n = record["listeners"]
+            recorded_at = datetime.datetime.fromisoformat(record["recorded_at"]).timestamp()
+            stream = (radio, typ)
+            frames[stream] = frames.get(stream, 0) + record.get("frames_coalesced", 1)
+            records[stream] = records.get(stream, 0) + 1
+            seen = first.setdefault(stream, {})
+            if n not in seen or recorded_at < seen[n][0]:
+                seen[n] = (recorded_at, obj["put_at"])
+
+    results = {}
+    for stream, sent in simulator.sent.items():
+        transport = simulator.transports[stream]
+        result = results.setdefault(
+            transport, {"sent": 0, "ingested": 0, "records": 0, "dups": 0, "ingest": [], "delivery": []}
+        )
+        result["dups"] += records.get(stream, 0) - len(first.get(stream, {}))
+        seen = first.get(stream, {})
+        result["sent"] += len(sent)
+        # WebSocket rámce sa zlučujú, prijaté rámce udáva frames_coalesced
+        result["ingested"] += frames.get(stream, 0) if transport.endswith(":ws") else len(seen.keys() & sent.keys())
+        result["records"] += len(seen)
+        for n, (recorded_at, put_at) in seen.items():
+            if n in sent:
+                result["ingest"].append(recorded_at - sent[n])
+                result["delivery"].append(put_at - sent[n])
+    return results, rollups
+
+
+def run_child(workdir, flush_check):
+    os.chdir(workdir)
+    sys.stdout = open(os.devnull, "w")
+    import app
+    app.FLUSH_CHECK_INTERVAL = flush_check
+    app.main()
+
+
+async def run_case(stations_count, args):
+    workdir = tempfile.mkdtemp(prefix="e2e-")
+    s3 = FakeS3().start()
+    stations = make_stations(stations_count, args.port, args)
+    with open(os.path.join(workdir, "stations.json"), "w", encoding="utf-8") as f:
+        json.dump(stations, f, ensure_ascii=False)
+    simulator = Simulator(stations, args)
+    runner, session, tasks = await simulator.start(args.port, args.webhook_port)
+
+    env = dict(
+        os.environ,
+        STATIONS_FILE="stations.json",
+        R2_ENDPOINT=s3.endpoint,
+        R2_KEY_ID="test",
+        R2_SECRET="test",
+        R2_BUCKET=BUCKET,
+        OUTPUT_FORMAT=args.format,
+        COLLECTOR_RUNTIME=args.runtime,
+        CACHE_BACKEND=args.cache,
+        WEBHOOK_PORT=str(args.webhook_port),
+        METRICS_PORT="0",
+        PYTHONPATH=ROOT,
+        SHARD_PROCESSES=str(args.shards),
+    )
+    # Shard procesy spúšťajú app.py priamo, s pôvodným FLUSH_CHECK_INTERVAL
+    flush_check = 10 if args.shards else args.flush_check
+    child = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--child", workdir, "--flush-check", str(args.flush_check)],
+        env=env, cwd=workdir, stdout=subprocess.DEVNULL,
+    )
+    try:
+        await asyncio.sleep(args.warmup)
+        if child.poll() is not None:
+            raise RuntimeError("aplikácia nenaštartovala")
+        before = tree_stats(child.pid)
+        started = time.monotonic()
+        simulator.active.set()
+        if args.kill_shard is not None and args.shards:
+            await asyncio.sleep(args.kill_shard)
+            victim = child_pids(child.pid)[0]
+            os.kill(victim, signal.SIGKILL)
+            print(f"  zabitý shard proces {victim} po {args.kill_shard:g} s")
+            await asyncio.sleep(max(0.0, args.duration - args.kill_shard))
+        else:
+            await asyncio.sleep(args.duration)
+        simulator.stopped.set()
+        after = tree_stats(child.pid)
+        elapsed = time.monotonic() - started
+        # Posledné dávky: interval zlučovania + vek flushu + upload
+        await asyncio.sleep(args.listeners_interval + args.upload_interval + flush_check + args.drain)
+        final = tree_stats(child.pid)
+        # Po potvrdenom uploade housekeeping lokálne dávky zmaže
+        local_files = sum(len(names) for root, _, names in os.walk(os.path.join(workdir, "data"))
+                          if not os.path.basename(root).startswith(".upload_queue"))
+    finally:
+        # Supervízor pri SIGTERM ukončí aj shard procesy
+        child.terminate() if args.shards else child.kill()
+        child.wait()
+        for task in tasks:
+            task.cancel()
+        await session.close()
+        await runner.cleanup()
+        s3.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results, rollups = analyze(s3, simulator)
+    cpu = (after["cpu"] - before["cpu"]) / elapsed * 100
+    mode = f"shards={args.shards}" if args.shards else f"runtime={args.runtime}"
+    print(f"\n{stations_count} staníc, {mode}, cache={args.cache}, formát={args.format}: "
+          f"CPU {cpu:.1f} %, RSS {after['rss_mb']:.1f} MB, peak {final['peak_mb']:.1f} MB, "
+          f"procesy {after['processes']}, vlákna {after['threads']}, objekty v S3 {len(s3.objects)}")
+    if simulator.webhook_statuses:
+        print("  webhook odpovede: " + " ".join(f"{k}={v}" for k, v in sorted(simulator.webhook_statuses.items(), key=str)))
+    print(f"  {'transport':<18} {'sent/s':>8} {'ingest/s':>9} {'lost':>6} {'dup':>5} {'records':>8} "
+          f"{'ingest p50/p99 ms':>18} {'delivery p50/p99 s':>19}")
+    for transport, r in sorted(results.items()):
+        ingest = sorted(r["ingest"])
+        delivery = sorted(r["delivery"])
+        print(f"  {transport:<18} {r['sent'] / elapsed:8.1f} {r['ingested'] / elapsed:9.1f} "
+              f"{max(0, r['sent'] - r['ingested']):6d} {r['dups']:5d} {r['records']:8d} "
+              f"{percentile(ingest, 0.5) * 1000:8.1f} /{percentile(ingest, 0.99) * 1000:8.1f} "
+              f"{percentile(delivery, 0.5):9.2f} /{percentile(delivery, 0.99):8.2f}")
+    # Otvorené okná sa pri ukončení procesu neodošlú, vzoriek je preto menej ako prijatých správ
+    print(f"  listeners rollup: {rollups['windows']} okien, {rollups['samples']} vzoriek v minútových oknách; "
+          f"súhrny skladieb: {rollups['sessions']}, {rollups['session_samples']} vzoriek; "
+          f"manifesty: {rollups['manifests']}; lokálne súbory v data/: {local_files}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, nargs="+", default=[6, 60])
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--drain", type=float, default=5)
+    parser.add_argument("--push-rate", type=float, default=2.0, help="listeners správ za sekundu a stanicu")
+    parser.add_argument("--song-change", type=float, default=10.0, help="sekundy medzi zmenami skladby")
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--listeners-interval", type=float, default=5.0)
+    parser.add_argument("--upload-interval", type=float, default=10.0)
+    parser.add_argument("--flush-check", type=float, default=1.0)
+    parser.add_argument("--runtime", choices=["threads", "async"], default="threads")
+    parser.add_argument("--cache", choices=["spool", "memory"], default="spool")
+    parser.add_argument("--format", default="ndjson")
+    parser.add_argument("--shards", type=int, default=0)
+    parser.add_argument("--kill-shard", type=float, metavar="SECONDS")
+    parser.add_argument("--port", type=int, default=18400)
+    parser.add_argument("--webhook-port", type=int, default=18401)
+    parser.add_argument("--child", metavar="WORKDIR")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.flush_check)
+        return
+    for stations_count in args.stations:
+        asyncio.run(run_case(stations_count, args))
+
+
+if __name__ == "__main__":
+    main()
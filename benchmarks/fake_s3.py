@@ -0,0 +1,233 @@
+"""
+Minimálny S3-kompatibilný server pre benchmarky a lokálne skúšky writer.py.
+
+Podporuje PutObject, HeadObject, GetObject a ListObjectsV2 (path-style
+adresovanie), metadáta x-amz-meta-*, aws-chunked telá a náhodné chyby 500
+(fail_rate) či umelé oneskorenie (latency).
+
+    python benchmarks/fake_s3.py --port 19000
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+from xml.sax.saxutils import escape
+
+
+def decode_aws_chunked(body):
+    out = bytearray()
+    pos = 0
+    while True:
+        end = body.index(b"\r\n", pos)
+        size = int(body[pos:end].split(b";")[0], 16)
+        pos = end + 2
+        if size == 0:
+            return bytes(out)
+        out += body[pos:pos + size]
+        pos += size + 2
+
+
+class FakeS3:
+    def __init__(self, host="127.0.0.1", port=0, fail_rate=0.0, latency=0.0):
+        self.objects = {}
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.requests = {"PUT": 0, "HEAD": 0, "GET": 0, "failed": 0, "precondition_failed": 0}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        # Klient zabitý uprostred požiadavky (benchmark pádu) nie je chyba servera
+        self.server.handle_error = lambda request, client_address: None
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        s3 = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Hlavičky a telo idú zvlášť, s Nagle by každá odpoveď čakala na oneskorený ACK (~40 ms)
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _target(self):
+                parts = urlsplit(self.path)
+                bucket, _, key = parts.path.lstrip("/").partition("/")
+                return bucket, unquote(key), parse_qs(parts.query)
+
+            def _reply(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    try:
+                        self.wfile.write(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+
+            def _fail(self):
+                if s3.latency:
+                    time.sleep(s3.latency)
+                if s3.fail_rate and random.random() < s3.fail_rate:
+                    with s3.lock:
+                        s3.requests["failed"] += 1
+                    self._reply(500, b"<Error><Code>InternalError</Code><Message>injected</Message></Error>")
+                    return True
+                return False
+
+            def _read_body(self):
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    body = bytearray()
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0], 16)
+                        if size == 0:
+                            while self.rfile.readline() not in (b"\r\n", b""):
+                                pass
+                            break
+                        body += self.rfile.read(size)
+                        self.rfile.readline()
+                    body = bytes(body)
+                else:
+                    body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if "aws-chunked" in self.headers.get("Content-Encoding", "") or self.headers.get("x-amz-decoded-content-length"):
+                    body = decode_aws_chunked(body)
+                return body
+
+            def do_PUT(self):
+                bucket, key, _ = self._target()
+                body = self._read_body()
+                with s3.lock:
+                    s3.requests["PUT"] += 1
+                if self._fail():
+                    return
+                encoding = ",".join(
+                    e for e in self.headers.get("Content-Encoding", "").split(",") if e.strip() and e.strip() != "aws-chunked"
+                )
+                meta = {
+                    name[len("x-amz-meta-"):]: value
+                    for name, value in self.headers.items()
+                    if name.lower().startswith("x-amz-meta-")
+                }
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if_match, if_none_match = self.headers.get("If-Match"), self.headers.get("If-None-Match")
+                with s3.lock:
+                    # Podmienka a zápis pod jedným zámkom, ako atomický podmienený PUT v R2
+                    current = s3.objects.get((bucket, key))
+                    if (if_match is not None and (current is None or current["etag"] != if_match)) or (
+                            if_none_match == "*" and current is not None):
+                        s3.requests["precondition_failed"] += 1
+                        conflict = True
+                    else:
+                        conflict = False
+                        s3.objects[(bucket, key)] = {
+                            "body": body,
+                            "etag": etag,
+                            "content_type": self.headers.get("Content-Type", "binary/octet-stream"),
+                            "content_encoding": encoding,
+                            "meta": meta,
+                            "last_modified": time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime()),
+                            "put_at": time.time(),
+                        }
+                if conflict:
+                    self._reply(412, b"<Error><Code>PreconditionFailed</Code><Message>etag</Message></Error>")
+                    return
+                self._reply(200, headers={"ETag": etag})
+
+            def _object_headers(self, obj):
+                headers = {
+                    "ETag": obj["etag"],
+                    "Content-Type": obj["content_type"],
+                    "Last-Modified": obj["last_modified"],
+                }
+                if obj["content_encoding"]:
+                    headers["Content-Encoding"] = obj["content_encoding"]
+                for name, value in obj["meta"].items():
+                    headers[f"x-amz-meta-{name}"] = value
+                return headers
+
+            def do_HEAD(self):
+                bucket, key, _ = self._target()
+                with s3.lock:
+                    s3.requests["HEAD"] += 1
+                    obj = s3.objects.get((bucket, key))
+                if self._fail():
+                    return
+                if obj is None:
+                    self._reply(404)
+                    return
+                self.send_response(200)
+                for name, value in self._object_headers(obj).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(obj["body"])))
+                self.end_headers()
+
+            def do_GET(self):
+                bucket, key, query = self._target()
+                with s3.lock:
+                    s3.requests["GET"] += 1
+                if self._fail():
+                    return
+                if not key:
+                    self._list(bucket, query)
+                    return
+                with s3.lock:
+                    obj = s3.objects.get((bucket, key))
+                if obj is None:
+                    self._reply(404, b"<Error><Code>NoSuchKey</Code><Message>missing</Message></Error>")
+                    return
+                self._reply(200, obj["body"], self._object_headers(obj))
+
+            def _list(self, bucket, query):
+                prefix = query.get("prefix", [""])[0]
+                with s3.lock:
+                    keys = sorted(
+                        (key, obj) for (b, key), obj in s3.objects.items() if b == bucket and key.startswith(prefix)
+                    )
+                contents = "".join(
+                    f"<Contents><Key>{escape(key)}</Key><ETag>{escape(obj['etag'])}</ETag>"
+                    f"<Size>{len(obj['body'])}</Size></Contents>"
+                    for key, obj in keys
+                )
+                body = (
+                    '<?xml version="1.0" encoding="UTF-8"?>'
+                    f"<ListBucketResult><Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"
+                    f"<KeyCount>{len(keys)}</KeyCount><IsTruncated>false</IsTruncated>{contents}</ListBucketResult>"
+                ).encode("utf-8")
+                self._reply(200, body, {"Content-Type": "application/xml"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=19000)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    s3 = FakeS3(port=args.port, fail_rate=args.fail_rate, latency=args.latency)
+    print(f"Fake S3 beží na {s3.endpoint}")
+    s3.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Porovnanie JSON kodekov (json / orjson / msgspec) na payloadoch staníc.
+
+1. Dekódovanie surových bajtov každého tvaru zo stations.json (ako prídu
+   z HTTP, WebSocketu či webhooku), ns na správu.
+2. Hromadný flush: write_entries pre --records záznamov (Record obálky)
+   vo formátoch json a ndjson, čas a záznamy/s.
+Výstup všetkých kodekov sa po dekódovaní overí voči štandardnému json.
+
+    python benchmarks/json_codecs.py --records 20000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import codec
+from record import Record
+from writer import write_entries
+from validation import CASES
+
+
+def use(name):
+    codec.NAME = name
+    codec.loads, codec.dumps = codec.CODECS[name]
+
+
+def decode_ns(raw, number):
+    timings = timeit.repeat("loads(raw)", globals={"loads": codec.loads, "raw": raw}, number=number, repeat=5)
+    return min(timings) / number * 1e9
+
+
+def flush_seconds(records, fmt, directory):
+    path = os.path.join(directory, f"flush.{fmt}")
+    start = time.perf_counter()
+    write_entries(records, path, fmt)
+    elapsed = time.perf_counter() - start
+    with open(path, "rb") as f:
+        body = f.read()
+    if fmt == "json":
+        decoded = json.loads(body)
+    else:
+        decoded = [json.loads(line) for line in body.splitlines()]
+    return elapsed, decoded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    names = list(codec.CODECS)
+    payloads = [(f"{radio} {typ}", json.dumps(payload, ensure_ascii=False).encode("utf-8")) for radio, typ, _, payload in CASES]
+    mismatches = 0
+
+    print(f"dekódovanie z bajtov (ns/správa), kodeky: {', '.join(names)}")
+    print(f"{'payload':>20} " + " ".join(f"{name:>9}" for name in names))
+    for label, raw in payloads:
+        row = []
+        for name in names:
+            use(name)
+            mismatches += codec.loads(raw) != json.loads(raw)
+            row.append(decode_ns(raw, args.number))
+        print(f"{label:>20} " + " ".join(f"{value:9.0f}" for value in row))
+
+    now = time.time()
+    records = [
+        Record(json.loads(payloads[i % len(payloads)][1]), "rock", now + i, True, "0f8fad5b-d9cb-469f-a165-70867728950e")
+        for i in range(args.records)
+    ]
+    expected = [record.to_dict() for record in records]
+    tmp = tempfile.mkdtemp()
+    try:
+        print(f"\nflush {args.records} záznamov")
+        for fmt in ("ndjson", "json"):
+            for name in names:
+                use(name)
+                elapsed = min(flush_seconds(records, fmt, tmp)[0] for _ in range(3))
+                _, decoded = flush_seconds(records, fmt, tmp)
+                mismatches += decoded != expected
+                print(f"{fmt:>8} {name:>8} {elapsed * 1000:8.1f} ms {args.records / elapsed:12.0f} záznamov/s")
+    finally:
+        shutil.rmtree(tmp)
+    print(f"nezhody voči json: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cena logovania na vlákne príjmu pri pomalom stdout (napr. plná rúra).
+
+Porovnáva pôvodný log (strftime + print priamo do streamu) s logger.Logger
+(fronta + vlákno na pozadí) a s limitom listeners=... . Stream pri každom
+write čaká --write-delay sekúnd. Vypíše p50/p99/max trvania jedného volania
+a koľko riadkov reálne prešlo na výstup.
+
+    python benchmarks/logging_stall.py --events 2000 --write-delay 0.002
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+from zoneinfo import ZoneInfo
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from logger import Logger
+
+ZONE = ZoneInfo("Europe/Bratislava")
+
+
+class SlowStream:
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text):
+        time.sleep(self.delay)
+        self.lines += text.count("\n")
+
+    def flush(self):
+        pass
+
+
+def legacy_log(stream, radio_name, song_session_id, msg):
+    now = datetime.datetime.now(ZONE).strftime('%d.%m.%Y %H:%M:%S')
+    print(f"[{now}] [{radio_name}{' ' * (8 - len(radio_name))} {song_session_id}] {msg}", file=stream)
+
+
+def summary(name, durations, stream, extra=""):
+    durations.sort()
+    us = [d * 1e6 for d in durations]
+    print(f"{name:>22} p50={us[len(us) // 2]:9.1f} us p99={us[int(len(us) * 0.99)]:9.1f} us "
+          f"max={us[-1]:9.1f} us  riadkov={stream.lines}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--write-delay", type=float, default=0.002)
+    parser.add_argument("--rate-limit", type=float, default=1.0)
+    args = parser.parse_args()
+    session = "0f8fad5b-d9cb-469f-a165-70867728950e"
+
+    stream = SlowStream(args.write_delay)
+    durations = []
+    for i in range(args.events):
+        start = time.perf_counter()
+        legacy_log(stream, "ROCK", session, f"Počet poslucháčov: {i}")
+        durations.append(time.perf_counter() - start)
+    summary("print (pôvodné)", durations, stream)
+
+    for fmt, limits in (("text", None), ("json", None), ("text", {"listeners": args.rate_limit})):
+        stream = SlowStream(args.write_delay)
+        logger = Logger(stream, fmt, limits).start()
+        durations = []
+        started = time.perf_counter()
+        for i in range(args.events):
+            start = time.perf_counter()
+            logger.log("ROCK", session, f"Počet poslucháčov: {i}", "listeners", listeners=i)
+            durations.append(time.perf_counter() - start)
+            # Tempo ~ jedna správa za 0.5 ms, ako rýchly WebSocket
+            time.sleep(0.0005)
+        elapsed = time.perf_counter() - started
+        logger.flush(timeout=30)
+        label = f"Logger {fmt}" + (f" limit {args.rate_limit:g}s" if limits else "")
+        summary(label, durations, stream, f" dropped={logger.dropped} (za {elapsed:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
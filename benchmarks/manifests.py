@@ -0,0 +1,178 @@
+"""
+Denné manifesty (manifest.py) proti lokálnemu fake S3.
+
+Nahrá deň dát --stations staníc (12 flushov po 2 h, typy song, listeners,
+listeners_rollup, song_session) cez Uploader s manifestmi a --fail-rate
+chybami R2. Overí, že manifest každej stanice obsahuje všetky objekty
+so správnym sha256, a porovná plán čítania "listeners 10:00-11:00":
+  - LIST prefixu dňa + GET každého objektu (zistenie rozsahu recorded_at),
+  - jeden GET manifestu.
+Nakoniec --writers samostatných ManifestWriter (ako iné procesy: starý
+vlastník shardu, backfill) zapisuje naraz do jedného manifestu; overí sa,
+že podmienený PUT nestratí žiadnu položku.
+
+    python benchmarks/manifests.py --stations 10 --layout ymd
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_s3 import FakeS3
+from upload_pool import configure, BUCKET
+
+DAY_START = 1762210800.0  # 2025-11-04 00:00 Europe/Bratislava
+DAY = 86400
+FLUSH = 7200
+TYPES = ("song", "listeners", "listeners_rollup", "song_session")
+
+
+def make_batch(typ, start):
+    from record import Record
+    if typ == "song":
+        # Ako zo spoolu (dict); started_at z API stanice nie je ISO čas, manifest ho nesmie čítať
+        return [Record({"title": f"Title {i}", "started_at": "16:20"}, "r", start + i * 210, True, f"s{i}").to_dict()
+                for i in range(FLUSH // 210)]
+    if typ == "listeners":
+        return [Record({"listeners": random.randint(900, 1300)}, "r", start + i * 30, True, "s") for i in range(FLUSH // 30)]
+    from record import iso_time
+    if typ == "listeners_rollup":
+        return [{"window_start": iso_time(start + i * 60), "window_seconds": 60, "samples": 60} for i in range(FLUSH // 60)]
+    return [{"song_session_id": f"s{i}", "started_at": iso_time(start + i * 210), "ended_at": iso_time(start + (i + 1) * 210)}
+            for i in range(FLUSH // 210)]
+
+
+def plan_by_listing(client, prefix, low, high):
+    # Bez manifestu: LIST a otvoriť každý objekt, aby sme zistili jeho časový rozsah
+    requests = 1
+    keys = [obj["Key"] for obj in client.list_objects_v2(Bucket=BUCKET, Prefix=prefix).get("Contents", [])]
+    selected = []
+    for key in keys:
+        body = client.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+        requests += 1
+        times = [json.loads(line)["recorded_at"] for line in body.splitlines() if line.strip()]
+        if min(times) < high and max(times) >= low:
+            selected.append(key)
+    return selected, requests
+
+
+def plan_by_manifest(client, key, typ, low, high):
+    manifest = json.loads(client.get_object(Bucket=BUCKET, Key=key)["Body"].read())
+    selected = [obj["key"] for obj in manifest["objects"]
+                if obj["type"] == typ and obj["min_recorded_at"] < high and obj["max_recorded_at"] >= low]
+    return selected, 1
+
+
+def concurrent_writers(s3, writers, objects):
+    from manifest import ManifestWriter, manifest_entry, manifest_info
+    info = manifest_info([], "CONCURRENT", "song", DAY_START)
+    errors = []
+
+    def write(writer_id):
+        manifests = ManifestWriter()
+        for i in range(objects):
+            entry = manifest_entry(f"bronze/CONCURRENT/song/w{writer_id}-{i}.ndjson", "0" * 64, info, 1)
+            # Chyba R2 (fail-rate) alebo vyčerpané pokusy: úloha uploadera by sa zopakovala
+            while True:
+                try:
+                    manifests.add_batch(info, [entry])
+                    break
+                except Exception as e:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(writer_id,)) for writer_id in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    body = s3.objects[(BUCKET, info["key"])]["body"]
+    return writers * objects - len(json.loads(body)["objects"]), len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    parser.add_argument("--layout", choices=["dmy", "ymd"], default="dmy")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--writers", type=int, default=4)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    # DAY_START a partície sú v miestnom čase stanice
+    os.environ["TZ"] = "Europe/Bratislava"
+    time.tzset()
+
+    s3 = FakeS3(fail_rate=args.fail_rate).start()
+    configure(s3.endpoint)
+    os.environ["PARTITION_LAYOUT"] = args.layout
+    import logger
+    import writer
+    # Logy uploadov by prekryli výsledky
+    logger.LOGGER.stream = open(os.devnull, "w")
+    from manifest import manifest_info, partition, manifest_key
+    from uploader import Uploader
+
+    with tempfile.TemporaryDirectory() as directory:
+        uploader = Uploader(os.path.join(directory, "queue"), base_delay=0.05, max_delay=0.5)
+        uploader.start()
+        checksums = {}
+        started = time.perf_counter()
+        for flush in range(DAY // FLUSH):
+            now = DAY_START + (flush + 1) * FLUSH - 1
+            for station in range(args.stations):
+                radio = f"RADIO{station}"
+                for typ in TYPES:
+                    entries = make_batch(typ, now - FLUSH + 1)
+                    day = partition(now, args.layout)
+                    path = os.path.join(directory, f"{radio}-{typ}-{flush}.ndjson")
+                    writer.write_entries(entries, path, "ndjson")
+                    r2_key = f"bronze/{radio}/{typ}/{day}/{time.strftime('%H-%M-%S', time.localtime(now))}.ndjson"
+                    with open(path, "rb") as f:
+                        checksums[r2_key] = hashlib.sha256(f.read()).hexdigest()
+                    uploader.submit(path, r2_key, "ndjson", manifest_info(entries, radio, typ, now, args.layout))
+        uploader.wait_idle()
+        elapsed = time.perf_counter() - started
+
+        day = partition(DAY_START, args.layout)
+        missing = 0
+        for station in range(args.stations):
+            body = s3.objects[(BUCKET, manifest_key(f"RADIO{station}", day))]["body"]
+            listed = {obj["key"]: obj["sha256"] for obj in json.loads(body)["objects"]}
+            missing += sum(1 for key, digest in checksums.items()
+                           if key.startswith(f"bronze/RADIO{station}/") and listed.get(key) != digest)
+        manifest_puts = s3.requests["PUT"] - len(checksums)
+
+        low = datetime.datetime.fromtimestamp(DAY_START + 10 * 3600).astimezone().isoformat()
+        high = datetime.datetime.fromtimestamp(DAY_START + 11 * 3600).astimezone().isoformat()
+        start = time.perf_counter()
+        listed, list_requests = plan_by_listing(writer.client, f"bronze/RADIO0/listeners/{day}/", low, high)
+        list_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        planned, manifest_requests = plan_by_manifest(writer.client, manifest_key("RADIO0", day), "listeners", low, high)
+        manifest_ms = (time.perf_counter() - start) * 1000
+        conflicts = s3.requests["precondition_failed"]
+        lost, errors = concurrent_writers(s3, args.writers, 25)
+        conflicts = s3.requests["precondition_failed"] - conflicts
+    s3.stop()
+
+    print(f"{len(checksums)} objektov, {args.stations} manifestov, rozloženie {args.layout} ({day}), "
+          f"upload {elapsed:.1f} s pri fail-rate {args.fail_rate}")
+    print(f"manifest PUT (vrátane neúspešných) {manifest_puts}, chýbajúce/nesprávne položky {missing}")
+    print(f"plán čítania LIST+GET: {list_requests} požiadaviek, {list_ms:.1f} ms -> {listed}")
+    print(f"plán čítania manifest: {manifest_requests} požiadavka, {manifest_ms:.1f} ms -> {planned}")
+    print(f"{args.writers} súbežní zapisovatelia x 25 položiek: stratené {lost}, "
+          f"412 a nový pokus {conflicts}, opakované úlohy {errors}")
+
+
+if __name__ == "__main__":
+    main()
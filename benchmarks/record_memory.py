@@ -0,0 +1,102 @@
+"""
+Pamäť a CPU na záznam: pôvodný deepcopy + doplnenie metadát do dictu
+oproti obálke record.Record s referenciou na payload.
+
+Každý záznam vzniká z čerstvo dekódovanej JSON správy (ako pri pollingu
+a WebSockete), scenár "unchanged" zodpovedá opakovanému zápisu nezmenenej
+odpovede (304 / rovnaké telo), kde Record zdieľa ten istý payload.
+Overí aj, že serializovaný výstup je zhodný.
+
+    python benchmarks/record_memory.py --records 100000
+"""
+import argparse
+import copy
+import datetime
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from record import Record, as_dict, ZONE
+
+PAYLOADS = {
+    "rock_song": json.dumps({
+        "song": {"musicAuthor": "Metallica", "musicTitle": "One", "musicCover": "https://cdn.example/cover/123.jpg",
+                 "radio": "rock", "startTime": "2026-10-18T10:00:00"},
+        "last_update": "2026-10-18T10:00:05",
+    }),
+    "beta_song": json.dumps({"radio": "Beta", "interpreters": "Queen", "title": "Bohemian Rhapsody",
+                             "start_time": "10:00:00", "timestamp": "2026-10-18T10:00:00"}),
+    "rock_listeners": json.dumps({"listeners": 1234}),
+    "expres_listeners": json.dumps({"timestamp": "2026-10-18T10:00:00", "listeners": 4000, "radio": "expres"}),
+}
+
+
+def legacy_entry(data, now):
+    entry = copy.deepcopy(data)
+    entry["recorded_at"] = datetime.datetime.fromtimestamp(now, ZONE).isoformat()
+    entry["raw_valid"] = True
+    entry["song_session_id"] = "0f8fad5b-d9cb-469f-a165-70867728950e"
+    return entry
+
+
+def record_entry(data, now):
+    return Record(data, "rock", now, True, "0f8fad5b-d9cb-469f-a165-70867728950e")
+
+
+def build(make, raw, count, unchanged):
+    shared = json.loads(raw)
+    now = time.time()
+    return [make(shared if unchanged else json.loads(raw), now) for _ in range(count)]
+
+
+def measure(make, raw, count, unchanged):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    entries = build(make, raw, count, unchanged)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    return current / count, elapsed / count * 1e9
+
+
+def timed(make, raw, count, unchanged):
+    # Čas bez tracemalloc, ktorý alokácie výrazne spomaľuje
+    gc.collect()
+    start = time.perf_counter()
+    build(make, raw, count, unchanged)
+    return (time.perf_counter() - start) / count * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    mismatches = 0
+    print(f"{'payload':>17} {'scenár':>9} {'legacy B':>9} {'record B':>9} {'pomer':>6} {'legacy ns':>10} {'record ns':>10}")
+    for name, raw in PAYLOADS.items():
+        now = time.time()
+        data = json.loads(raw)
+        if json.dumps(legacy_entry(data, now)) != json.dumps(as_dict(record_entry(data, now))):
+            mismatches += 1
+        for unchanged in (False, True):
+            legacy_bytes, _ = measure(legacy_entry, raw, args.records, unchanged)
+            record_bytes, _ = measure(record_entry, raw, args.records, unchanged)
+            legacy_ns = timed(legacy_entry, raw, args.records, unchanged)
+            record_ns = timed(record_entry, raw, args.records, unchanged)
+            print(f"{name:>17} {'unchanged' if unchanged else 'fresh':>9} {legacy_bytes:9.0f} {record_bytes:9.0f} "
+                  f"{record_bytes / legacy_bytes:6.2f} {legacy_ns:10.0f} {record_ns:10.0f}")
+    print(f"nezhody serializovaného výstupu: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Housekeeping data/ adresára (housekeeping.py) proti lokálnemu fake S3.
+
+Vytvorí data/ so --days dňami pôvodných pretty-printed JSON dávok
+(--stations staníc, song a listeners, 12 súborov na deň). Väčšina je v
+buckete, časť chýba (pád pred zaradením) a posledné dávky majú upload
+úlohu. Pre každý režim na kópii stromu spraví jeden prechod a potom
+spustí uploader s on_done:
+  - delete:  nahraté súbory sa zmažú, chýbajúce sa znova nahrajú,
+  - archive: súbory uplynulých dní sa zbalia do <deň>.tar.gz,
+  - keep + kvóta: data/ sa zmenší pod --quota-ratio pôvodnej veľkosti,
+  - keep + kvóta so spool/: segmenty v spool/ (--spool-ratio) sa rátajú do
+    kvóty, ostanú nedotknuté a z data/ sa zmaže viac.
+Overí, že žiadna dávka sa nestratila (je v R2 alebo lokálne/v archíve)
+a že kvóta zmazala najstaršie súbory.
+
+    python benchmarks/retention.py --stations 10 --days 30
+"""
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_s3 import FakeS3
+from upload_pool import configure, BUCKET
+
+TYPES = ("song", "listeners")
+
+
+def make_tree(data_dir, stations, days, now):
+    import writer
+    from record import Record
+    files = []
+    for day in range(days, -1, -1):
+        for hour in range(0, 24, 2):
+            at = now - day * 86400 - (now % 86400) + hour * 3600 + 7199
+            if at > now - 60:
+                continue
+            for station in range(stations):
+                radio = f"RADIO{station}"
+                for typ in TYPES:
+                    folder = os.path.join(data_dir, radio, typ, time.strftime("%d-%m-%Y", time.localtime(at)))
+                    os.makedirs(folder, exist_ok=True)
+                    path = os.path.join(folder, time.strftime("%H-%M-%S", time.localtime(at)) + ".json")
+                    if typ == "song":
+                        entries = [Record({"title": f"Title {i}", "artist": "Artist"}, "r", at - 7200 + i * 210, True, f"s{i}")
+                                   for i in range(34)]
+                    else:
+                        entries = [Record({"listeners": random.randint(900, 1300)}, "r", at - 7200 + i * 30, True, "s")
+                                   for i in range(240)]
+                    writer.write_entries(entries, path, "json")
+                    os.utime(path, (at, at))
+                    files.append((path, "bronze/" + os.path.relpath(path, data_dir).replace(os.sep, "/"), at))
+    return files
+
+
+def seed_bucket(s3, files, pending):
+    kinds = {"present": 0, "missing": 0, "pending": 0}
+    for path, key, _ in files:
+        if key in pending:
+            kinds["pending"] += 1
+            continue
+        if random.random() < 0.1:
+            kinds["missing"] += 1
+            continue
+        with open(path, "rb") as f:
+            body = f.read()
+        s3.objects[(BUCKET, key)] = {
+            "body": body, "etag": '"' + hashlib.md5(body).hexdigest() + '"', "content_type": "application/json",
+            "content_encoding": "", "meta": {"sha256": hashlib.sha256(body).hexdigest()},
+            "last_modified": time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime()), "put_at": time.time(),
+        }
+        kinds["present"] += 1
+    return kinds
+
+
+def du(data_dir):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(data_dir) for name in names)
+
+
+def local_bodies(data_dir):
+    """Obsah dávok na disku vrátane archívov podľa R2 kľúča."""
+    bodies = {}
+    for root, _, names in os.walk(data_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            if name.endswith(".tar.gz"):
+                prefix = "bronze/" + os.path.relpath(path[: -len(".tar.gz")], data_dir).replace(os.sep, "/")
+                with tarfile.open(path, "r:gz") as tar:
+                    for member in tar.getmembers():
+                        bodies[f"{prefix}/{member.name}"] = tar.extractfile(member).read()
+            elif name.endswith(".json") and "/.upload_queue" not in path:
+                with open(path, "rb") as f:
+                    bodies["bronze/" + os.path.relpath(path, data_dir).replace(os.sep, "/")] = f.read()
+    return bodies
+
+
+def run_mode(s3, source, originals, pending, retention, quota_mb=0.0, spool_bytes=0):
+    from housekeeping import Housekeeper
+    from uploader import Uploader
+    workdir = tempfile.mkdtemp(prefix=f"housekeeping-{retention}-")
+    data_dir = os.path.join(workdir, "data")
+    shutil.copytree(source, data_dir)
+    spool_dir = None
+    if spool_bytes:
+        # Neodoslaný segment stanice, ako keby uploady stáli
+        spool_dir = os.path.join(workdir, "spool")
+        segment = os.path.join(spool_dir, "RADIO0", "song", "000001.seg")
+        os.makedirs(os.path.dirname(segment))
+        with open(segment, "wb") as f:
+            f.write(os.urandom(spool_bytes))
+    objects = dict(s3.objects)
+    try:
+        queue_dir = os.path.join(data_dir, ".upload_queue")
+        # Úlohy zaradené pred reštartom, nový uploader ich načíta pri štarte
+        previous = Uploader(queue_dir)
+        for key in sorted(pending):
+            previous.submit(os.path.join(data_dir, key[len("bronze/"):]), key, "json")
+        uploader = Uploader(queue_dir, base_delay=0.05, max_delay=0.5)
+        housekeeper = Housekeeper(data_dir, uploader, retention, quota_mb, rate=0, max_checks=10 ** 6,
+                                  spool_dir=spool_dir)
+        uploader.on_done = housekeeper.uploaded
+        # Ako v app.main: uploader beží skôr ako housekeeping
+        uploader.start()
+        before = du(data_dir)
+        heads = s3.requests["HEAD"]
+        started = time.perf_counter()
+        result = housekeeper.sweep()
+        elapsed = time.perf_counter() - started
+        heads = s3.requests["HEAD"] - heads
+        swept = du(data_dir)
+        uploader.wait_idle()
+        after = du(data_dir)
+
+        # Druhý prechod: zmaže prázdne adresáre dní, ktoré vyprázdnil uploader
+        housekeeper.sweep()
+        empty = sum(1 for root, dirs, names in os.walk(data_dir) if not dirs and not names and "/.upload_queue" not in root)
+        local = local_bodies(data_dir)
+        lost = sum(1 for key, body in originals.items()
+                   if local.get(key) != body and s3.objects.get((BUCKET, key), {}).get("body") != body)
+        print(f"{retention:>7}{f' kvóta {quota_mb:.1f} MB' if quota_mb else ''}: prechod {elapsed:.2f} s, {heads} HEAD, {result}, "
+              f"uploader {uploader.stats['uploaded']} nahratých / {uploader.stats['lost']} zrušených")
+        print(f"         data/ {before / 1024 / 1024:.1f} MB -> po prechode {swept / 1024 / 1024:.1f} MB -> "
+              f"po uploade {after / 1024 / 1024:.1f} MB, stratené dávky {lost}, prázdne adresáre {empty}")
+        if spool_bytes:
+            print(f"         spool/ {du(spool_dir) / 1024 / 1024:.1f} MB nedotknutý {du(spool_dir) == spool_bytes}, "
+                  f"data/ + spool/ pod kvótou {swept + du(spool_dir) <= quota_mb * 1024 * 1024}")
+        return housekeeper, local
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        s3.objects.clear()
+        s3.objects.update(objects)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--quota-ratio", type=float, default=0.5)
+    parser.add_argument("--spool-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    s3 = FakeS3().start()
+    configure(s3.endpoint)
+    import logger
+    # Logy uploadov by prekryli výsledky
+    logger.LOGGER.stream = open(os.devnull, "w")
+    workdir = tempfile.mkdtemp(prefix="housekeeping-")
+    try:
+        data_dir = os.path.join(workdir, "data")
+        now = time.time()
+        files = make_tree(data_dir, args.stations, args.days, now)
+        # Dávky posledných 4 hodín ešte čakajú v upload fronte
+        pending = {key for _, key, at in files if at > now - 4 * 3600}
+        kinds = seed_bucket(s3, files, pending)
+        originals = {}
+        for path, key, _ in files:
+            with open(path, "rb") as f:
+                originals[key] = f.read()
+        size = du(data_dir)
+        print(f"{len(files)} súborov, {size / 1024 / 1024:.1f} MB: " + ", ".join(f"{k} {v}" for k, v in kinds.items()))
+
+        run_mode(s3, data_dir, originals, pending, "delete")
+        _, local = run_mode(s3, data_dir, originals, pending, "archive")
+        archived = sum(1 for key in local if key in originals)
+        print(f"         v archívoch a lokálne {archived} z {len(files)} dávok")
+
+        housekeeper, local = run_mode(s3, data_dir, originals, pending, "keep", size * args.quota_ratio / 1024 / 1024)
+        at = {key: ts for _, key, ts in files}
+        kept = [at[key] for key in local if key in at]
+        evicted = [at[key] for key in originals if key not in local]
+        print(f"         zmazané najstaršie: {len(evicted)} súborov, najnovší zmazaný {time.ctime(max(evicted))}, "
+              f"najstarší ponechaný {time.ctime(min(kept))}, oldest-first {max(evicted) <= min(kept)}")
+
+        run_mode(s3, data_dir, originals, pending, "keep", size * args.quota_ratio / 1024 / 1024,
+                 spool_bytes=int(size * args.spool_ratio))
+    finally:
+        s3.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
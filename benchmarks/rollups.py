@@ -0,0 +1,275 @@
+"""
+Agregácie poslucháčov (rollup.py) oproti prepočtu zo surových bronze dát.
+
+Simuluje jeden deň jednej stanice s --rate rámcami za sekundu (WebSocket
+coalesce, vzorka každých 30 s) a porovná:
+  - réžiu ListenerRollup.add a SongSessionSummary.add na rámec,
+  - dashboard dotaz "minúty a hodiny za deň" nad surovými ndjson súbormi
+    (12 dávok po 2 h) a nad rollup objektmi,
+  - zhodu výsledkov s presným prepočtom zo všetkých rámcov,
+  - súhrny skladieb (skladba každých ~--song s) oproti offline joinu
+    song a listeners súborov podľa song_session_id.
+Nakoniec overí stanicu, ktorej schéma pomenúva počet inak (listeners.count_key).
+
+    python benchmarks/rollups.py --rate 1
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import codec
+from adapters.engine import StationWorker, check_station, load_stations
+from adapters.listeners import ListenerCoalescer
+from buffer import BatchBuffer
+from record import iso_time
+from record import Record
+from rollup import ListenerRollup, SongSessionSummary
+from writer import write_entries
+
+DAY_START = 1762210800.0  # 2025-11-04 00:00 Europe/Bratislava
+DAY = 86400
+SAMPLE = 30
+FLUSH = 7200
+WINDOWS = (60, 3600)
+
+
+def frames(rate):
+    count = 1200
+    step = 1.0 / rate
+    t = DAY_START
+    while t < DAY_START + DAY:
+        if random.random() < 0.2:
+            count = max(0, count + random.randint(-15, 15))
+        yield t, count
+        t += step
+
+
+def aggregate_raw(paths):
+    # To, čo dnes robí dashboard: načítať všetky surové vzorky a zoskupiť ich
+    windows = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            for line in f:
+                entry = codec.loads(line)
+                count = entry["listeners"]
+                at = entry["recorded_at"]
+                for size, key in ((60, at[:16]), (3600, at[:13])):
+                    window = windows.get((size, key))
+                    if window is None:
+                        windows[(size, key)] = [count, count, count, 1, count]
+                    else:
+                        window[0] = min(window[0], count)
+                        window[1] = max(window[1], count)
+                        window[2] += count
+                        window[3] += 1
+                        window[4] = count
+    return windows
+
+
+def read_rollups(paths):
+    windows = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            for line in f:
+                entry = codec.loads(line)
+                windows[(entry["window_seconds"], entry["window_start"])] = entry
+    return windows
+
+
+def join_sessions(song_paths, listener_paths):
+    # Offline join: skladby z jedného súboru, poslucháči z druhého
+    sessions = {}
+    for path in song_paths:
+        with open(path, "rb") as f:
+            for line in f:
+                entry = codec.loads(line)
+                sessions[entry["song_session_id"]] = {"song": entry["title"], "listeners": []}
+    for path in listener_paths:
+        with open(path, "rb") as f:
+            for line in f:
+                entry = codec.loads(line)
+                session = sessions.get(entry["song_session_id"])
+                if session is not None:
+                    session["listeners"].append(entry["listeners"])
+    return {
+        key: (min(s["listeners"]), max(s["listeners"]), sum(s["listeners"]) / len(s["listeners"]))
+        for key, s in sessions.items() if s["listeners"]
+    }
+
+
+def read_sessions(paths):
+    sessions = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            for line in f:
+                entry = codec.loads(line)
+                sessions[entry["song_session_id"]] = entry
+    return sessions
+
+
+def custom_count_key():
+    """Stanica s počtom v poli "count": agregácie, súhrn skladby aj zlúčená vzorka ho čítajú z count_key."""
+    station = load_stations(os.path.join(ROOT, "stations.json"))["expres"]
+    station["listeners"] = {"transport": "webhook", "port": 8001, "count_key": "count",
+                            "schema": {"keys": ["count"], "types": {"count": "int"}}}
+    check_station(station)
+    import logger
+    # Logy poslucháčov by prekryli výsledky
+    logger.LOGGER.stream = open(os.devnull, "w")
+    rollup_cache, session_cache = BatchBuffer(), BatchBuffer()
+    worker = StationWorker("custom", station, 60, 30, BatchBuffer(), BatchBuffer(),
+                           listeners_rollup=ListenerRollup(rollup_cache, WINDOWS),
+                           song_sessions=SongSessionSummary(session_cache))
+    worker.song_sessions.rotate("s0", {"title": "Title"}, DAY_START)
+    for i, count in enumerate((10, 30, 20)):
+        worker.handle_listeners({"count": count}, DAY_START + i)
+    worker.listeners_rollup.close_due(DAY_START + DAY)
+    worker.song_sessions.rotate(None, None, DAY_START + DAY)
+    minute = next(e for e in rollup_cache.take_batch().entries if e["window_seconds"] == 60)
+    session = session_cache.take_batch().entries[0]
+    coalescer = ListenerCoalescer(worker.count_key)
+    for count in (10, 30, 20):
+        coalescer.add({"count": count}, True, DAY_START, "s0")
+    sample = coalescer.drain("custom")
+    ok = ((minute["listeners_min"], minute["listeners_max"], minute["samples"]) == (10, 30, 3)
+          and (session["listeners_min"], session["listeners_max"]) == (10, 30)
+          and (sample.extra["listeners_min"], sample.extra["listeners_max"], sample.payload) == (10, 30, {"count": 20}))
+    print(f"count_key \"count\": rollup, súhrn skladby aj zlúčená vzorka {'OK' if ok else 'CHYBA'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=1.0, help="rámce za sekundu")
+    parser.add_argument("--song", type=float, default=210, help="priemerná dĺžka skladby v sekundách")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    raw_cache = BatchBuffer()
+    rollup_cache = BatchBuffer()
+    rollup = ListenerRollup(rollup_cache, WINDOWS)
+    coalescer = ListenerCoalescer()
+    song_cache = BatchBuffer()
+    session_cache = BatchBuffer()
+    summary = SongSessionSummary(session_cache)
+    session_id = None
+    next_song = DAY_START
+    exact_sessions = {}
+    song_paths, session_paths = [], []
+    exact = {}
+    add_seconds = 0.0
+    frame_count = 0
+    raw_paths, rollup_paths = [], []
+    next_sample = DAY_START + SAMPLE
+    next_flush = DAY_START + FLUSH
+
+    with tempfile.TemporaryDirectory() as directory:
+        def flush(cache, name, paths):
+            path = os.path.join(directory, f"{name}-{len(paths)}.ndjson")
+            write_entries(cache.take_batch().entries, path, "ndjson")
+            paths.append(path)
+
+        for now, count in frames(args.rate):
+            while now >= next_sample:
+                entry = coalescer.drain("rock")
+                if entry is not None:
+                    raw_cache.append(entry)
+                next_sample += SAMPLE
+            if now >= next_flush:
+                rollup.close_due(now)
+                flush(raw_cache, "raw", raw_paths)
+                flush(rollup_cache, "rollup", rollup_paths)
+                flush(song_cache, "song", song_paths)
+                flush(session_cache, "session", session_paths)
+                next_flush += FLUSH
+            if now >= next_song:
+                session_id = f"s{len(exact_sessions)}"
+                song = {"title": f"Title {len(exact_sessions)}"}
+                song_cache.append(Record(song, "rock", now, True, session_id))
+                summary.rotate(session_id, song, now)
+                exact_sessions[session_id] = []
+                next_song = now + random.expovariate(1 / args.song)
+            coalescer.add({"listeners": count}, True, now, session_id)
+            start = time.perf_counter()
+            rollup.add(count, now)
+            summary.add(count, now)
+            add_seconds += time.perf_counter() - start
+            exact_sessions[session_id].append(count)
+            frame_count += 1
+            for size in WINDOWS:
+                key = (size, now - now % size)
+                window = exact.setdefault(key, [count, count, 0, 0, count])
+                window[0] = min(window[0], count)
+                window[1] = max(window[1], count)
+                window[2] += count
+                window[3] += 1
+                window[4] = count
+        entry = coalescer.drain("rock")
+        if entry is not None:
+            raw_cache.append(entry)
+        rollup.close_due(DAY_START + DAY)
+        summary.rotate(None, None, DAY_START + DAY)
+        flush(raw_cache, "raw", raw_paths)
+        flush(rollup_cache, "rollup", rollup_paths)
+        flush(song_cache, "song", song_paths)
+        flush(session_cache, "session", session_paths)
+
+        raw_bytes = sum(os.path.getsize(p) for p in raw_paths)
+        rollup_bytes = sum(os.path.getsize(p) for p in rollup_paths)
+        start = time.perf_counter()
+        raw = aggregate_raw(raw_paths)
+        raw_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        rollups = read_rollups(rollup_paths)
+        rollup_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        joined = join_sessions(song_paths, raw_paths)
+        join_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        summaries = read_sessions(session_paths)
+        summaries_ms = (time.perf_counter() - start) * 1000
+        session_bytes = sum(os.path.getsize(p) for p in session_paths)
+
+    mismatched = 0
+    for (size, window_start), (low, high, total, samples, last) in exact.items():
+        entry = rollups.get((size, iso_time(window_start)))
+        if entry is None or (entry["listeners_min"], entry["listeners_max"], entry["samples"], entry["listeners_last"]) != (low, high, samples, last) \
+                or abs(entry["listeners_mean"] - total / samples) > 0.01:
+            mismatched += 1
+    # Surové zlúčené vzorky nepoznajú priebeh medzi vzorkami, min/max aj priemer sú len odhad
+    raw_off = sum(
+        1 for (size, window_start), (low, high, total, samples, last) in exact.items()
+        if size == 60 and (raw.get((60, iso_time(window_start)[:16])) or [None, None])[:2] != [low, high]
+    )
+
+    session_mismatched = sum(
+        1 for key, values in exact_sessions.items()
+        if key not in summaries or (summaries[key]["listeners_min"], summaries[key]["listeners_max"], summaries[key]["samples"],
+                                    summaries[key]["listeners_first"], summaries[key]["listeners_last"])
+        != (min(values), max(values), len(values), values[0], values[-1])
+    )
+    # Krátke skladby nemusia mať v surových dátach žiadnu zlúčenú vzorku
+    join_missing = len(exact_sessions) - len(joined)
+    join_off = sum(1 for key, (low, high, _) in joined.items() if (low, high) != (min(exact_sessions[key]), max(exact_sessions[key])))
+
+    print(f"rámce {frame_count}, okná {len(exact)} ({sum(1 for s, _ in exact if s == 60)} minút)")
+    print(f"ListenerRollup.add + SongSessionSummary.add {add_seconds / frame_count * 1e9:.0f} ns/rámec")
+    print(f"surové bronze   {len(raw_paths)} súborov {raw_bytes / 1024:8.1f} KiB  dotaz {raw_ms:7.2f} ms  "
+          f"minútové min/max mimo presnej hodnoty: {raw_off}")
+    print(f"rollup objekty  {len(rollup_paths)} súborov {rollup_bytes / 1024:8.1f} KiB  dotaz {rollup_ms:7.2f} ms  "
+          f"nezhody s presným prepočtom: {mismatched}")
+    print(f"skladby {len(exact_sessions)}: offline join {join_ms:7.2f} ms, bez vzorky {join_missing}, min/max mimo {join_off}; "
+          f"súhrny {len(session_paths)} súborov {session_bytes / 1024:.1f} KiB, {summaries_ms:.2f} ms, nezhody {session_mismatched}")
+    if not custom_count_key():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Porovnanie runtime režimov: vlákna na stanicu vs. jeden zdieľaný event loop.
+
+Spustí lokálnu falošnú stanicu (HTTP now-playing v tvare rock + WebSocket
+listeners) a proti nej N inštancií StationWorker s konfiguráciou stanice rock
+z stations.json v každom režime. Každá
+konfigurácia beží v samostatnom procese, po ustálení sa odmeria počet vlákien
+a RSS z /proc/self/status.
+
+    python benchmarks/runtime_scaling.py --stations 6 60 600
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def proc_status():
+    status = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            status[key] = value.strip()
+    return {
+        "threads": int(status["Threads"]),
+        "rss_mb": int(status["VmRSS"].split()[0]) / 1024,
+    }
+
+
+async def fake_station(port, push_interval):
+    from aiohttp import web
+
+    async def playing(request):
+        return web.json_response({
+            "song": {
+                "musicAuthor": "Author",
+                "musicTitle": "Title",
+                "musicCover": "",
+                "radio": "rock",
+                "startTime": "2025-11-04T16:16:20",
+            },
+            "last_update": "2025-11-04T16:16:20",
+        })
+
+    async def listenership(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        n = 0
+        with contextlib.suppress(ConnectionError):
+            while not ws.closed:
+                n += 1
+                await ws.send_str(json.dumps({"listeners": n}))
+                await asyncio.sleep(push_interval)
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/pull/playing", playing)
+    app.router.add_get("/ws/push/listenership", listenership)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    await asyncio.Event().wait()
+
+
+def run_child(mode, stations, port, settle):
+    from adapters.engine import StationWorker, load_stations
+    from runtime import run_stations
+
+    station = load_stations(os.path.join(ROOT, "stations.json"))["rock"]
+    station["song"]["url"] = f"http://127.0.0.1:{port}/pull/playing"
+    station["listeners"]["url"] = f"ws://127.0.0.1:{port}/ws/push/listenership"
+    workers = [StationWorker("rock", station, 30, 30, [], []) for _ in range(stations)]
+    baseline = proc_status()
+    result = {"mode": mode, "stations": stations, "baseline": baseline}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "threads":
+            for worker in workers:
+                worker.start()
+            time.sleep(settle)
+            result.update(proc_status())
+        else:
+            async def measure():
+                await asyncio.sleep(settle)
+                result.update(proc_status())
+                raise SystemExit
+
+            async def main():
+                asyncio.create_task(run_stations(workers, [], None))
+                await measure()
+
+            with contextlib.suppress(SystemExit):
+                asyncio.run(main())
+
+    result["listener_records"] = sum(len(w.listeners_cache) for w in workers)
+    print(json.dumps(result))
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, nargs="+", default=[6, 60, 600])
+    parser.add_argument("--modes", nargs="+", default=["threads", "async"])
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--settle", type=float, default=10.0)
+    parser.add_argument("--push-interval", type=float, default=1.0)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "STATIONS"))
+    parser.add_argument("--server", action="store_true")
+    args = parser.parse_args()
+
+    if args.server:
+        asyncio.run(fake_station(args.port, args.push_interval))
+        return
+    if args.child:
+        run_child(args.child[0], int(args.child[1]), args.port, args.settle)
+        return
+
+    server = subprocess.Popen([sys.executable, __file__, "--server", "--port", str(args.port),
+                               "--push-interval", str(args.push_interval)])
+    try:
+        time.sleep(1.5)
+        print(f"{'stations':>8} {'mode':>8} {'threads':>8} {'rss_mb':>8} {'base_mb':>8}")
+        for stations in args.stations:
+            for mode in args.modes:
+                out = subprocess.run(
+                    [sys.executable, __file__, "--child", mode, str(stations),
+                     "--port", str(args.port), "--settle", str(args.settle)],
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                r = json.loads(out.strip().splitlines()[-1])
+                print(f"{stations:>8} {mode:>8} {r['threads']:>8} {r['rss_mb']:>8.1f} {r['baseline']['rss_mb']:>8.1f}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Oneskorenie event loopu pri zápise do spoolov v režime async.
+
+--stations korutín na jednom event loope zapisuje každá --rate záznamov za
+sekundu do vlastného Spool (ako poll_*_async a sampler listeners), tep
+každú 1 ms meria, o koľko sa loop oneskoril. Porovná append priamo na
+loope (write + fsync po FSYNC_RECORDS / FSYNC_INTERVAL) so SpoolWriter
+a overí, že take_batch vráti všetky zapísané záznamy. --fsync-delay
+simuluje pomalý disk (každý fsync čaká navyše).
+
+    python benchmarks/spool_loop_lag.py --stations 50 --rate 20 --seconds 5 --fsync-delay 0.01
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from spool import Spool, SpoolWriter
+
+
+async def station(spool, rate, until):
+    n = 0
+    while time.monotonic() < until:
+        spool.append({"listeners": n, "recorded_at": "2025-11-04T10:00:00+01:00", "raw_valid": True})
+        n += 1
+        await asyncio.sleep(1 / rate)
+    return n
+
+
+async def heartbeat(until):
+    lags = []
+    while time.monotonic() < until:
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+    return lags
+
+
+async def measure(spools, rate, seconds):
+    until = time.monotonic() + seconds
+    lags, *counts = await asyncio.gather(heartbeat(until), *(station(spool, rate, until) for spool in spools))
+    return lags, sum(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=20)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--dir", default=None, help="adresár spoolov (predvolene dočasný)")
+    parser.add_argument("--fsync-delay", type=float, default=0.01)
+    args = parser.parse_args()
+    fsync = os.fsync
+
+    def slow_fsync(fd):
+        time.sleep(args.fsync_delay)
+        fsync(fd)
+    os.fsync = slow_fsync
+
+    for name, writer in (("append na loope", None), ("SpoolWriter", SpoolWriter())):
+        directory = tempfile.mkdtemp(prefix="spool-lag-", dir=args.dir)
+        try:
+            spools = [Spool(os.path.join(directory, f"S{i}"), writer=writer) for i in range(args.stations)]
+            lags, appended = asyncio.run(measure(spools, args.rate, args.seconds))
+            taken = sum(len(spool.take_batch().entries) for spool in spools)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        lags.sort()
+        ms = [lag * 1000 for lag in lags]
+        print(f"{name:>16}: oneskorenie loopu p50={ms[len(ms) // 2]:6.2f} ms p99={ms[int(len(ms) * 0.99)]:6.2f} ms "
+              f"max={ms[-1]:7.2f} ms, záznamy {appended} -> take_batch {taken}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Uploader proti lokálnemu fake S3 s náhodnými chybami.
+
+1. Pošle --files súborov pri --fail-rate a overí, že všetky objekty sú v
+   buckete s korektným sha256 (žiadna dávka sa nestratí), vypíše latenciu
+   a priepustnosť.
+2. Simuluje pád: podproces zaradí úlohy proti serveru, ktorý všetko
+   odmieta, a je zabitý. Nový Uploader nad tou istou frontou ich dokončí.
+
+    python benchmarks/upload_pool.py --files 200 --fail-rate 0.3
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BUCKET = "bronze-test"
+
+
+def configure(endpoint):
+    os.environ.update({
+        "R2_ENDPOINT": endpoint,
+        "R2_KEY_ID": "test",
+        "R2_SECRET": "test",
+        "R2_BUCKET": BUCKET,
+    })
+
+
+def make_files(directory, count, size):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"{i:05d}.ndjson")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size // 2).hex().encode())
+        paths.append(path)
+    return paths
+
+
+def verify(s3, paths):
+    missing = 0
+    for path in paths:
+        obj = s3.objects.get((BUCKET, f"bronze/TEST/{os.path.basename(path)}"))
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        if obj is None or obj["meta"].get("sha256") != digest:
+            missing += 1
+    return missing
+
+
+def crash_child(endpoint, queue_dir, files_dir, count):
+    configure(endpoint)
+    from uploader import Uploader
+    uploader = Uploader(queue_dir, workers=4, base_delay=0.05, max_delay=0.2)
+    uploader.start()
+    for path in make_files(files_dir, count, 4096):
+        uploader.submit(path, f"bronze/TEST/{os.path.basename(path)}", "ndjson")
+    print("submitted", flush=True)
+    time.sleep(60)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--fail-rate", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--crash-child", nargs=4)
+    args = parser.parse_args()
+
+    if args.crash_child:
+        endpoint, queue_dir, files_dir, count = args.crash_child
+        crash_child(endpoint, queue_dir, files_dir, int(count))
+        return
+
+    from fake_s3 import FakeS3
+    s3 = FakeS3(fail_rate=args.fail_rate, latency=args.latency).start()
+    configure(s3.endpoint)
+    from uploader import Uploader
+
+    tmp = tempfile.mkdtemp()
+    failures = 0
+    try:
+        files_dir = os.path.join(tmp, "files")
+        os.makedirs(files_dir)
+        paths = make_files(files_dir, args.files, args.size)
+        uploader = Uploader(os.path.join(tmp, "queue"), workers=args.workers, base_delay=0.05, max_delay=1.0)
+        uploader.start()
+        start = time.perf_counter()
+        for path in paths:
+            uploader.submit(path, f"bronze/TEST/{os.path.basename(path)}", "ndjson")
+        uploader.wait_idle()
+        wall = time.perf_counter() - start
+        stats = uploader.stats
+        missing = verify(s3, paths)
+        failures += missing != 0
+        print(f"fail_rate={args.fail_rate} workers={args.workers} files={args.files} size={args.size} B")
+        print(f"  uploaded={stats['uploaded']} skipped={stats['skipped']} failed_attempts={stats['failed_attempts']} missing={missing}")
+        print(f"  mean upload latency={stats['seconds'] / max(stats['uploaded'], 1) * 1000:.1f} ms, "
+              f"wall={wall:.2f} s, throughput={stats['bytes'] / wall / 1024 / 1024:.2f} MiB/s, "
+              f"{stats['uploaded'] / wall:.1f} objects/s")
+
+        # Pád počas výpadku R2 a pokračovanie po reštarte
+        s3.objects.clear()
+        s3.fail_rate = 1.0
+        crash_dir = os.path.join(tmp, "crash")
+        crash_files = os.path.join(tmp, "crash-files")
+        os.makedirs(crash_files)
+        child = subprocess.Popen(
+            [sys.executable, __file__, "--crash-child", s3.endpoint, crash_dir, crash_files, "50"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        while child.stdout.readline().strip() != "submitted":
+            pass
+        time.sleep(0.5)
+        child.kill()
+        child.wait()
+        pending = len(os.listdir(crash_dir))
+        s3.fail_rate = 0.0
+        resumed = Uploader(crash_dir, workers=args.workers, base_delay=0.05, max_delay=0.2)
+        resumed.start()
+        resumed.wait_idle()
+        crash_paths = sorted(os.path.join(crash_files, name) for name in os.listdir(crash_files))
+        missing = verify(s3, crash_paths)
+        failures += missing != 0 or pending != 50
+        print(f"restart: jobs left after crash={pending}, uploaded after restart={resumed.stats['uploaded']}, missing={missing}")
+    finally:
+        s3.stop()
+        shutil.rmtree(tmp)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
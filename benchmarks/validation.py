@@ -0,0 +1,185 @@
+"""
+Mikrobenchmark validácie payloadov všetkých šiestich staníc.
+
+Porovnáva pôvodné ručne písané validate_* funkcie (skopírované z
+odstránených adapterov) so schémami zo stations.json skompilovanými cez
+adapters.schema.compile_schema. Pre každý tvar overí, že obe cesty dávajú
+rovnaký výsledok, a vypíše ns na správu.
+
+    python benchmarks/validation.py --number 200000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from adapters.engine import load_stations
+from adapters.schema import compile_schema
+
+
+def legacy_rock_song(data):
+    required_keys = {"musicAuthor", "musicTitle", "musicCover", "radio", "startTime"}
+    return (
+        isinstance(data, dict) and
+        "song" in data and
+        isinstance(data["song"], dict) and
+        set(data["song"].keys()) == required_keys and
+        "last_update" in data
+    )
+
+
+def legacy_rock_listeners(data):
+    return isinstance(data, dict) and set(data.keys()) == {"listeners"} and isinstance(data["listeners"], int)
+
+
+def legacy_jazz_song(data):
+    if not isinstance(data, dict) or "song" not in data:
+        return False
+    song = data["song"]
+    return (
+        isinstance(song, dict) and
+        set(song.keys()) == {"play_date", "play_time", "artist", "title"} and
+        isinstance(song["artist"], list)
+    )
+
+
+def legacy_jazz_listeners(data):
+    return (
+        isinstance(data, dict)
+        and set(data.keys()) == {"timestamp", "listeners", "radio"}
+        and data["radio"] == "jazz"
+        and isinstance(data["listeners"], int)
+    )
+
+
+def legacy_beta_song(data):
+    song_fields = {"radio", "interpreters", "title", "start_time", "timestamp"}
+    silence_fields = {"radio", "is_playing", "message", "timestamp"}
+    if isinstance(data, dict) and set(data.keys()) >= song_fields:
+        return (
+            data.get("radio") == "Beta" and
+            isinstance(data.get("interpreters"), str) and
+            isinstance(data.get("title"), str) and
+            isinstance(data.get("start_time"), str) and
+            isinstance(data.get("timestamp"), str)
+        )
+    if isinstance(data, dict) and set(data.keys()) >= silence_fields:
+        return (
+            data.get("radio") == "Beta" and
+            data.get("is_playing") is False and
+            isinstance(data.get("message"), str) and
+            isinstance(data.get("timestamp"), str)
+        )
+    return False
+
+
+def legacy_beta_listeners(data):
+    if isinstance(data, dict) and set(data.keys()) >= {"listeners", "timestamp"}:
+        return isinstance(data.get("listeners"), int) and isinstance(data.get("timestamp"), str)
+    return False
+
+
+def legacy_expres_song(data):
+    return (
+        isinstance(data, dict)
+        and set(data.keys()) == {"song", "artists", "isrc", "start_time", "radio"}
+        and isinstance(data["artists"], list)
+        and data["radio"] == "expres"
+    )
+
+
+def legacy_expres_listeners(data):
+    return (
+        isinstance(data, dict)
+        and set(data.keys()) == {"timestamp", "listeners", "radio"}
+        and data["radio"] == "expres"
+        and isinstance(data["listeners"], int)
+    )
+
+
+def legacy_melody_song(data):
+    return (
+        isinstance(data, dict)
+        and set(data.keys()) == {"station", "title", "artist", "date", "time", "last_update"}
+        and all(isinstance(data[key], str) for key in ("station", "title", "artist", "date", "time", "last_update"))
+        and data["station"] == "Rádio Melody"
+    )
+
+
+def legacy_melody_listeners(data):
+    return (
+        isinstance(data, dict)
+        and set(data.keys()) == {"last_update", "listeners"}
+        and isinstance(data["listeners"], int)
+        and isinstance(data["last_update"], str)
+    )
+
+
+ROCK_SONG = {
+    "song": {"musicAuthor": "Metallica", "musicTitle": "One", "musicCover": "https://x/c.jpg",
+             "radio": "rock", "startTime": "2026-10-18T10:00:00"},
+    "last_update": "2026-10-18T10:00:05",
+}
+
+# (stanica, typ, legacy, payload)
+CASES = [
+    ("rock", "song", legacy_rock_song, ROCK_SONG),
+    ("rock", "song", legacy_rock_song, {"song": dict(ROCK_SONG["song"], extra=1), "last_update": "x"}),
+    ("rock", "listeners", legacy_rock_listeners, {"listeners": 1234}),
+    ("funradio", "song", legacy_rock_song, ROCK_SONG),
+    ("funradio", "listeners", legacy_rock_listeners, {"listeners": "1234"}),
+    ("jazz", "song", legacy_jazz_song,
+     {"song": {"play_date": "2026-10-18", "play_time": "10:00:00", "artist": ["Miles Davis"], "title": "So What"}}),
+    ("jazz", "listeners", legacy_jazz_listeners, {"timestamp": "2026-10-18T10:00:00", "listeners": 87, "radio": "jazz"}),
+    ("beta", "song", legacy_beta_song,
+     {"radio": "Beta", "interpreters": "Queen", "title": "Bohemian Rhapsody", "start_time": "10:00:00",
+      "timestamp": "2026-10-18T10:00:00"}),
+    ("beta", "song", legacy_beta_song,
+     {"radio": "Beta", "is_playing": False, "message": "Ticho", "timestamp": "2026-10-18T10:00:00"}),
+    ("beta", "listeners", legacy_beta_listeners, {"listeners": 512, "timestamp": "2026-10-18T10:00:00"}),
+    ("expres", "song", legacy_expres_song,
+     {"song": "Song", "artists": ["A", "B"], "isrc": "SK0001", "start_time": "10:00:00", "radio": "expres"}),
+    ("expres", "listeners", legacy_expres_listeners, {"timestamp": "2026-10-18T10:00:00", "listeners": 4000, "radio": "expres"}),
+    ("melody", "song", legacy_melody_song,
+     {"station": "Rádio Melody", "title": "T", "artist": "A", "date": "18.10.2026", "time": "10:00",
+      "last_update": "2026-10-18T10:00:00"}),
+    ("melody", "listeners", legacy_melody_listeners, {"last_update": "2026-10-18T10:00:00", "listeners": 300}),
+]
+
+
+def measure(func, payload, number):
+    timings = timeit.repeat("func(payload)", globals={"func": func, "payload": payload}, number=number, repeat=7)
+    return min(timings) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    stations = load_stations(os.path.join(ROOT, "stations.json"))
+    mismatches = 0
+    totals = {True: [0.0, 0.0], False: [0.0, 0.0]}
+    print(f"{'stanica':>9} {'typ':>10} {'legacy ns':>10} {'compiled ns':>12} {'zrýchlenie':>10}  výsledok")
+    for radio, typ, legacy, payload in CASES:
+        check = compile_schema(stations[radio][typ]["schema"])
+        error = check(payload)
+        if legacy(payload) != (error is None):
+            mismatches += 1
+        legacy_ns = measure(legacy, payload, args.number)
+        compiled_ns = measure(check, payload, args.number)
+        totals[error is None][0] += legacy_ns
+        totals[error is None][1] += compiled_ns
+        print(f"{radio:>9} {typ:>10} {legacy_ns:10.0f} {compiled_ns:12.0f} {legacy_ns / compiled_ns:9.2f}x  {error or 'ok'}")
+    for valid, label in ((True, "platné"), (False, "neplatné")):
+        legacy_ns, compiled_ns = totals[valid]
+        print(f"{'spolu ' + label:>20} {legacy_ns:10.0f} {compiled_ns:12.0f} {legacy_ns / compiled_ns:9.2f}x")
+    print(f"nezhody s pôvodnou validáciou: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Záťažový test webhookov: pôvodný Flask dev server vs. jednotný aiohttp server.
+
+Server beží v samostatnom procese so StationWorker stanice expres a
+BatchBuffer cache (bez disku), logy idú do /dev/null. Klient s --concurrency
+súbežnými spojeniami posiela --duration sekúnd POST požiadavky s jedným
+songom alebo s dávkou --batch songov (JSON pole, len aiohttp). Vypíše
+požiadavky/s, správy/s, p50/p99 latenciu a počty odpovedí podľa statusu.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/webhook_load.py --duration 10 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SONG = {"song": "Song", "artists": ["A", "B"], "isrc": "SK0001", "start_time": "10:00:00", "radio": "expres"}
+
+
+def make_worker():
+    from adapters.engine import StationWorker, load_stations
+    from buffer import BatchBuffer
+    station = load_stations(os.path.join(ROOT, "stations.json"))["expres"]
+    return StationWorker("expres", station, 30, 30, BatchBuffer(), BatchBuffer())
+
+
+def signal_ready(ready):
+    ready.write("ready\n")
+    ready.flush()
+
+
+def serve_flask(port, ready):
+    # Rovnaké nastavenie ako pôvodný radio_expres: Flask app.run, get_json a spracovanie v požiadavke
+    from flask import Flask, request
+    import logging
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    worker = make_worker()
+    app = Flask(__name__)
+
+    @app.route("/expres_webhook", methods=["POST"])
+    def webhook():
+        worker.handle_webhook("song", request.get_json(force=True))
+        return {"status": "ok"}
+
+    signal_ready(ready)
+    app.run(host="127.0.0.1", port=port)
+
+
+def serve_aiohttp(port, queue_size, ready):
+    from adapters import webhook
+    worker = make_worker()
+    worker.song_config["queue_size"] = queue_size
+    worker.song_config["port"] = port
+
+    async def main():
+        await webhook.serve_webhooks([worker], "127.0.0.1", port + 1)
+        signal_ready(ready)
+        await asyncio.Event().wait()
+    asyncio.run(main())
+
+
+async def load(url, duration, concurrency, batch):
+    import aiohttp
+    body = json.dumps([SONG] * batch if batch > 1 else SONG).encode("utf-8")
+    latencies = []
+    statuses = {}
+    deadline = time.perf_counter() + duration
+
+    async def client(session):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                async with session.post(url, data=body, headers={"Content-Type": "application/json"}) as resp:
+                    await resp.read()
+                    status = resp.status
+            except aiohttp.ClientError:
+                status = "error"
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies) / elapsed,
+        "messages": statuses.get(200, 0) * batch / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+        "statuses": statuses,
+    }
+
+
+def run_case(server, port, args, batch, queue_size):
+    command = [sys.executable, __file__, "--serve", server, str(port), str(queue_size)]
+    child = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        while child.stdout.readline().strip() != "ready":
+            if child.poll() is not None:
+                raise RuntimeError(f"server {server} nenaštartoval")
+        time.sleep(0.3)
+        result = asyncio.run(load(f"http://127.0.0.1:{port}/expres_webhook", args.duration, args.concurrency, batch))
+    finally:
+        child.kill()
+        child.wait()
+    statuses = " ".join(f"{status}={count}" for status, count in sorted(result["statuses"].items(), key=str))
+    print(f"{server:>8} {batch:>6} {queue_size:>7} {result['requests']:10.0f} {result['messages']:11.0f} "
+          f"{result['p50']:8.1f} {result['p99']:8.1f}  {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--port", type=int, default=18300)
+    parser.add_argument("--burst-queue", type=int, default=500)
+    parser.add_argument("--serve", nargs=3)
+    args = parser.parse_args()
+
+    if args.serve:
+        server, port, queue_size = args.serve
+        # Logy workera do /dev/null, pôvodný stdout len na signál "ready"
+        ready = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        if server == "flask":
+            serve_flask(int(port), ready)
+        else:
+            serve_aiohttp(int(port), int(queue_size), ready)
+        return
+
+    print(f"{'server':>8} {'dávka':>6} {'fronta':>7} {'req/s':>10} {'správy/s':>11} {'p50 ms':>8} {'p99 ms':>8}  statusy")
+    run_case("flask", args.port, args, 1, 0)
+    run_case("aiohttp", args.port, args, 1, 10000)
+    run_case("aiohttp", args.port, args, args.batch, 10000)
+    # Malá fronta pri dávkach: preťaženie sa prejaví ako 429, nie rastúcou latenciou
+    run_case("aiohttp", args.port, args, args.batch, args.burst_queue)
+    # Dávka väčšia ako celá fronta: 413, odosielateľ ju nemá opakovať
+    run_case("aiohttp", args.port, args, args.batch, args.batch - 1)
+
+
+if __name__ == "__main__":
+    main()
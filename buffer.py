@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import deque
+from spool import Batch
+from record import Record, META_SIZE
+
+DROP_OLDEST = "drop_oldest"
+SPILL = "spill"
+
+
+def record_size(value):
+    """Približná veľkosť záznamu v JSON bajtoch, bez serializácie."""
+    if isinstance(value, Record):
+        return record_size(value.payload) + META_SIZE + (record_size(value.extra) if value.extra else 0)
+    if isinstance(value, dict):
+        return 2 + sum(record_size(k) + record_size(v) + 2 for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return 2 + sum(record_size(v) + 1 for v in value)
+    if isinstance(value, str):
+        return len(value) + 2
+    return 8
+
+
+class BatchBuffer:
+    """
+    Dvojitý buffer záznamov jednej stanice a typu dát.
+
+    append pridáva do aktívnej fronty, take_batch ju pod krátkym zámkom vymení
+    za prázdnu - bez kópie pod zámkom a bez straty záznamov pridaných počas flushu.
+    Pri prekročení max_records/max_bytes sa vyradí práve toľko najstarších
+    záznamov, aby sa buffer vrátil do rozpočtu; zahodia sa (drop_oldest,
+    počítadlo dropped), alebo presunú do spill spoolu na disk.
+    """
+
+    def __init__(self, max_records=None, max_bytes=None, overflow=DROP_OLDEST, spill=None):
+        if overflow == SPILL and spill is None:
+            raise ValueError("overflow='spill' vyžaduje spill spool")
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.overflow = overflow
+        self.spill = spill
+        self.lock = threading.Lock()
+        # deque: vyradenie najstaršieho záznamu je O(1)
+        self.items = deque()
+        self.bytes = 0
+        # Čas (epoch) prvého záznamu v aktívnej fronte
+        self.first_at = None
+        self.dropped = 0
+        self.spilled = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def _over_budget(self):
+        return (
+            (self.max_records is not None and len(self.items) > self.max_records) or
+            (self.max_bytes is not None and self.bytes > self.max_bytes)
+        )
+
+    def _evict(self):
+        # Volá sa pod zámkom, vráti vyradené najstaršie záznamy
+        evicted = []
+        while self.items and self._over_budget():
+            item = self.items.popleft()
+            self.bytes -= record_size(item)
+            evicted.append(item)
+        return evicted
+
+    def append(self, record):
+        size = record_size(record)
+        evicted = None
+        with self.lock:
+            if not self.items:
+                self.first_at = time.time()
+            self.items.append(record)
+            self.bytes += size
+            if self._over_budget():
+                evicted = self._evict()
+                if self.overflow == SPILL:
+                    self.spilled += len(evicted)
+                else:
+                    self.dropped += len(evicted)
+        if evicted and self.overflow == SPILL:
+            for entry in evicted:
+                self.spill.append(entry)
+
+    def swap(self):
+        with self.lock:
+            items = self.items
+            first_at = self.first_at
+            self.items = deque()
+            self.bytes = 0
+            self.first_at = None
+        return items, first_at
+
+    def restore(self, items, first_at):
+        # Vráti neodoslanú dávku na začiatok buffra, rozpočet sa uplatní pri ďalšom append
+        size = sum(record_size(item) for item in items)
+        with self.lock:
+            self.items.extendleft(reversed(items))
+            self.bytes += size
+            if items:
+                self.first_at = first_at if self.first_at is None else min(self.first_at, first_at)
+
+    def take_batch(self):
+        spilled = self.spill.take_batch() if self.spill is not None else None
+        items, first_at = self.swap()
+        # Dávka je list (spája sa so spill záznamami), kópia už mimo zámku
+        items = list(items)
+
+        def rollback():
+            self.restore(items, first_at)
+            if spilled is not None:
+                spilled.rollback()
+        if spilled is None or not spilled.entries:
+            return Batch(items, on_commit=spilled.commit if spilled else None, on_rollback=rollback)
+        return Batch(spilled.entries + items, on_commit=spilled.commit, on_rollback=rollback)
+
+    def depth(self):
+        spill = self.spill.depth() if self.spill is not None else {"records": 0, "bytes": 0, "oldest": None}
+        with self.lock:
+            oldest = [t for t in (self.first_at, spill["oldest"]) if t is not None]
+            return {
+                "records": len(self.items) + spill["records"],
+                "bytes": self.bytes + spill["bytes"],
+                "oldest": min(oldest) if oldest else None,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+            }
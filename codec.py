@@ -0,0 +1,67 @@
+"""
+Spoločný JSON kodek pre dekódovanie správ a zápis záznamov.
+
+Podľa JSON_CODEC ("auto", "orjson", "msgspec", "json") sa použije rýchla
+knižnica, ak je nainštalovaná, inak štandardný modul json. loads prijíma
+bytes aj str (bytes sa dekódujú priamo, bez medzikroku cez str), dumps
+vracia UTF-8 bytes v kompaktnom tvare bez escapovania ne-ASCII znakov.
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+JSON_CODEC = os.getenv("JSON_CODEC", "auto")
+
+
+def _json_loads(data):
+    return json.loads(data)
+
+
+def _json_dumps(obj, indent=False):
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _orjson_dumps(obj, indent=False):
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    except (TypeError, orjson.JSONEncodeError):
+        # Napr. celé čísla mimo 64 bitov - zriedkavé, štandardný modul ich zvládne
+        return _json_dumps(obj, indent)
+
+
+def _msgspec_dumps(obj, indent=False):
+    try:
+        data = msgspec.json.encode(obj)
+    except (TypeError, OverflowError, msgspec.EncodeError):
+        return _json_dumps(obj, indent)
+    return msgspec.json.format(data, indent=2) if indent else data
+
+
+CODECS = {"json": (_json_loads, _json_dumps)}
+if orjson is not None:
+    CODECS["orjson"] = (orjson.loads, _orjson_dumps)
+if msgspec is not None:
+    CODECS["msgspec"] = (msgspec.json.decode, _msgspec_dumps)
+
+
+def select(name):
+    if name == "auto":
+        name = next(candidate for candidate in ("orjson", "msgspec", "json") if candidate in CODECS)
+    if name not in CODECS:
+        raise RuntimeError(f"JSON kodek {name} nie je dostupný (nainštalované: {', '.join(CODECS)})")
+    return name
+
+
+NAME = select(JSON_CODEC)
+loads, dumps = CODECS[NAME]
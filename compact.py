@@ -0,0 +1,98 @@
+"""
+Run-length kompakcia dávky pred zápisom: po sebe idúce záznamy s rovnakým
+obsahom sa zlúčia do prvého z nich s poliami first_seen, last_seen
+(ISO čas ako recorded_at) a repeat_count. Záznam bez opakovania ostane
+bez zmeny, chýbajúci repeat_count teda znamená 1.
+
+Rovnaký obsah = všetko okrem recorded_at; frames_coalesced sa pri zlúčení
+sčíta. Porovnáva sa len s prvým záznamom bežiaceho úseku: nezmenené HTTP
+odpovede zdieľajú ten istý dekódovaný payload, takže stačí test identity,
+inak porovnanie slovníkov v C - bez serializácie a hashovania.
+"""
+from record import Record, iso_time
+
+# Polia, ktoré sa pri zlúčení sčítajú namiesto porovnania
+SUMMED_FIELDS = ("frames_coalesced",)
+
+
+def _same_extra(a, b):
+    if a is b:
+        return True
+    a = {k: v for k, v in (a or {}).items() if k not in SUMMED_FIELDS}
+    b = {k: v for k, v in (b or {}).items() if k not in SUMMED_FIELDS}
+    return a == b
+
+
+def same_record(a, b):
+    return (
+        a.valid == b.valid
+        and a.song_session_id == b.song_session_id
+        and a.error == b.error
+        and (a.payload is b.payload or a.payload == b.payload)
+        and _same_extra(a.extra, b.extra)
+    )
+
+
+def same_dict(a, b):
+    if len(a) != len(b):
+        return False
+    for key, value in a.items():
+        if key == "recorded_at" or key in SUMMED_FIELDS:
+            continue
+        if key not in b or b[key] != value:
+            return False
+    return True
+
+
+def _close_record(head, last, count, summed):
+    if count == 1:
+        return head
+    extra = dict(head.extra or {})
+    extra.update(summed)
+    extra["first_seen"] = iso_time(head.recorded_at)
+    extra["last_seen"] = iso_time(last.recorded_at)
+    extra["repeat_count"] = count
+    return Record(head.payload, head.station, head.recorded_at, head.valid, head.song_session_id, head.error, extra)
+
+
+def _close_dict(head, last, count, summed):
+    if count == 1:
+        return head
+    entry = dict(head)
+    entry.update(summed)
+    entry["first_seen"] = head["recorded_at"]
+    entry["last_seen"] = last["recorded_at"]
+    entry["repeat_count"] = count
+    return entry
+
+
+def _summed(entry):
+    source = entry.extra if isinstance(entry, Record) else entry
+    return {field: source[field] for field in SUMMED_FIELDS if source and field in source}
+
+
+def compact_entries(entries):
+    """Zoznam záznamov (Record alebo dict zo spoolu) so zlúčenými opakovaniami."""
+    compacted = []
+    head = last = None
+    count = 0
+    summed = {}
+    for entry in entries:
+        if head is not None and type(entry) is type(head):
+            same = same_record(head, entry) if isinstance(entry, Record) else same_dict(head, entry)
+        else:
+            same = False
+        if same:
+            last = entry
+            count += 1
+            for field, value in _summed(entry).items():
+                summed[field] = summed.get(field, 0) + value
+            continue
+        if head is not None:
+            compacted.append((_close_record if isinstance(head, Record) else _close_dict)(head, last, count, summed))
+        head = last = entry
+        count = 1
+        summed = _summed(entry)
+    if head is not None:
+        compacted.append((_close_record if isinstance(head, Record) else _close_dict)(head, last, count, summed))
+    return compacted
@@ -0,0 +1,330 @@
+"""
+Údržba lokálneho data/ adresára, aby collector mohol bežať mesiace bez zásahu.
+
+LOCAL_RETENTION určuje, čo sa stane s dávkou po potvrdenom uploade:
+  "delete"  - lokálny súbor sa hneď zmaže (predvolené),
+  "archive" - súbory uplynulých dní sa zbalia do <deň>.tar.gz vedľa adresára dňa,
+  "keep"    - súbory ostanú (pôvodné správanie).
+Periodický prechod (HOUSEKEEPING_INTERVAL) rieši aj súbory bez upload úlohy
+(pád pred zaradením, dáta spred upload fronty): HEAD overí objekt v R2,
+prítomný sa spracuje podľa LOCAL_RETENTION, chýbajúci sa znova zaradí na upload.
+Ak data/ spolu so spool/ prekročí DATA_QUOTA_MB, mažú sa najstaršie archívy,
+potom najstaršie dávky bez upload úlohy a nakoniec aj neodoslané - plný disk
+by zastavil zápis nových dávok. Segmenty v spool/ sa do kvóty rátajú, ale
+nemažú: sú jedinou kópiou záznamov pred flushom, miesto sa uvoľní v data/.
+"""
+import hashlib
+import os
+import shutil
+import tarfile
+import threading
+import time
+import metrics
+import writer
+from backfill import RateLimiter, manifest_target, same_object
+from logger import log
+from manifest import manifest_info, parse_partition
+
+LOCAL_RETENTION = os.getenv("LOCAL_RETENTION", "delete")
+LOCAL_RETENTIONS = ("delete", "archive", "keep")
+HOUSEKEEPING_INTERVAL = int(os.getenv("HOUSEKEEPING_INTERVAL", "300"))
+# Mladší súbor bez úlohy môže collector práve zapisovať alebo zaraďovať na upload
+HOUSEKEEPING_MIN_AGE = 600
+# HEAD požiadavky na overenie súborov bez úlohy, za sekundu a najviac za jeden prechod
+HOUSEKEEPING_RATE = 5.0
+HOUSEKEEPING_MAX_CHECKS = 500
+# Horná hranica veľkosti data/ a spool/ spolu v MB, 0 = bez kvóty
+DATA_QUOTA_MB = float(os.getenv("DATA_QUOTA_MB", "0"))
+ARCHIVE_SUFFIX = ".tar.gz"
+
+
+def check_retention(retention):
+    if retention not in LOCAL_RETENTIONS:
+        raise ValueError(f"Neznáma lokálna retencia: {retention}")
+
+
+def job_name(r2_key):
+    # Názov súboru úlohy v upload fronte (Uploader._job_path)
+    return hashlib.sha1(r2_key.encode("utf-8")).hexdigest() + ".json"
+
+
+def day_of(r2_key):
+    """Deň (rok, mesiac, deň) dávky z jej kľúča, None ak kľúč nemá dátumovú časť."""
+    target = manifest_target(r2_key)
+    return time.localtime(target[3])[:3] if target is not None else None
+
+
+def archive_files(day_dir, paths):
+    """Pridá súbory do <day_dir>.tar.gz (existujúci archív sa prepíše celý) a zmaže ich."""
+    archive = day_dir + ARCHIVE_SUFFIX
+    tmp = archive + ".tmp"
+    names = {os.path.basename(path) for path in paths}
+    with tarfile.open(tmp, "w:gz") as tar:
+        if os.path.exists(archive):
+            with tarfile.open(archive, "r:gz") as old:
+                for member in old.getmembers():
+                    if member.name not in names:
+                        tar.addfile(member, old.extractfile(member))
+        for path in paths:
+            tar.add(path, arcname=os.path.basename(path))
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, archive)
+    for path in paths:
+        os.remove(path)
+
+
+class Housekeeper:
+    def __init__(self, data_dir, uploader, retention=LOCAL_RETENTION, quota_mb=DATA_QUOTA_MB, manifests=True,
+                 interval=HOUSEKEEPING_INTERVAL, min_age=HOUSEKEEPING_MIN_AGE, rate=HOUSEKEEPING_RATE,
+                 max_checks=HOUSEKEEPING_MAX_CHECKS, spool_dir=None):
+        check_retention(retention)
+        self.data_dir = data_dir
+        self.spool_dir = spool_dir
+        self.uploader = uploader
+        self.retention = retention
+        self.quota = int(quota_mb * 1024 * 1024)
+        self.manifests = manifests
+        self.interval = interval
+        self.min_age = min_age
+        self.limiter = RateLimiter(rate)
+        self.max_checks = max_checks
+        self.lock = threading.Lock()
+        # Súbory s potvrdeným uploadom (cesta -> (veľkosť, mtime)), pri "archive" a "keep"
+        self.verified = {}
+        self.usage = {"pending": 0, "local": 0, "archives": 0, "spool": 0}
+        self.counts = {"deleted": 0, "archived": 0, "evicted": 0, "reshipped": 0}
+
+    def count(self, action, value=1):
+        if not value:
+            return
+        with self.lock:
+            self.counts[action] += value
+        metrics.HOUSEKEEPING_FILES.inc(value, action=action)
+
+    def uploaded(self, job):
+        """Uploader.on_done: dávka je potvrdene v R2."""
+        path = job["local_file"]
+        if self.retention == "delete":
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                return
+            self.count("deleted")
+            return
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        with self.lock:
+            self.verified[path] = (stat.st_size, stat.st_mtime)
+
+    def is_verified(self, path, stat):
+        with self.lock:
+            return self.verified.get(path) == (stat.st_size, stat.st_mtime)
+
+    def forget(self, path):
+        with self.lock:
+            self.verified.pop(path, None)
+
+    def pending_jobs(self):
+        # Fronty všetkých slotov shardingu, súbor s úlohou patrí uploaderu
+        names = set()
+        for name in os.listdir(self.data_dir):
+            queue_dir = os.path.join(self.data_dir, name)
+            if name.startswith(".upload_queue") and os.path.isdir(queue_dir):
+                names.update(os.listdir(queue_dir))
+        return names
+
+    def scan(self):
+        """Dávky [(cesta, kľúč, stat, čaká na upload)] a archívy [(cesta, stat)] v data_dir."""
+        pending = self.pending_jobs()
+        files, archives = [], []
+        for radio in sorted(os.listdir(self.data_dir)):
+            radio_dir = os.path.join(self.data_dir, radio)
+            if radio.startswith(".") or not os.path.isdir(radio_dir):
+                continue
+            for root, dirs, names in os.walk(radio_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        if name.endswith(ARCHIVE_SUFFIX + ".tmp"):
+                            # Nedokončený archív po páde, súbory sú ešte na mieste
+                            os.remove(path)
+                        elif name.endswith(ARCHIVE_SUFFIX):
+                            archives.append((path, os.stat(path)))
+                        elif writer.format_of(name) is not None:
+                            r2_key = "bronze/" + os.path.relpath(path, self.data_dir).replace(os.sep, "/")
+                            files.append((path, r2_key, os.stat(path), job_name(r2_key) in pending))
+                    except FileNotFoundError:
+                        # Súbor medzitým zmazal uploader
+                        continue
+        return files, archives
+
+    def spool_size(self):
+        """Bajty segmentov v spool_dir; rastú, kým uploady stoja a flush nemá kam zapisovať."""
+        if self.spool_dir is None:
+            return 0
+        total = 0
+        for root, dirs, names in os.walk(self.spool_dir):
+            for name in names:
+                try:
+                    total += os.stat(os.path.join(root, name)).st_size
+                except FileNotFoundError:
+                    # Segment medzitým odoslal flush
+                    continue
+        return total
+
+    def check(self, path, r2_key):
+        """True ak je súbor v R2, inak ho znova zaradí na upload."""
+        self.limiter.acquire()
+        checksum = writer.file_checksum(path)
+        head = writer.remote_head(r2_key)
+        if head is not None and same_object(head, path, checksum):
+            return True
+        fmt = writer.format_of(path)
+        info = None
+        target = manifest_target(r2_key)
+        if self.manifests and target is not None:
+            radio, typ, layout, timestamp = target
+            info = manifest_info(writer.read_entries(path, fmt), radio, typ, timestamp, layout)
+        self.uploader.submit(path, r2_key, fmt, info)
+        log(None, None, f"Housekeeping: {r2_key} {'chýba' if head is None else 'sa líši'} v R2, znova zaradený na upload",
+            "housekeeping", "warning", key=r2_key)
+        self.count("reshipped")
+        return False
+
+    def sweep(self, now=None):
+        now = time.time() if now is None else now
+        files, archives = self.scan()
+        # Dni staršie ako dnešok (s rezervou pre flush tesne pred polnocou) sa už nezapisujú
+        today = time.localtime(now - self.min_age)[:3]
+        checks = 0
+        done = []
+        for path, r2_key, stat, pending in files:
+            if pending:
+                continue
+            if not self.is_verified(path, stat):
+                if stat.st_mtime > now - self.min_age or checks >= self.max_checks:
+                    continue
+                checks += 1
+                try:
+                    if not self.check(path, r2_key):
+                        continue
+                except Exception as e:
+                    # R2 je nedostupné, ďalšie súbory skúsime v ďalšom prechode
+                    log(None, None, f"Housekeeping ERROR: {path} -> {r2_key} :: {e}", "housekeeping", "error", key=r2_key)
+                    break
+                with self.lock:
+                    self.verified[path] = (stat.st_size, stat.st_mtime)
+            done.append((path, r2_key))
+
+        if self.retention == "delete":
+            for path, _ in done:
+                if self._remove(path):
+                    self.count("deleted")
+        elif self.retention == "archive":
+            groups = {}
+            for path, r2_key in done:
+                day = day_of(r2_key)
+                if day is not None and day < today:
+                    groups.setdefault(os.path.dirname(path), []).append(path)
+            for day_dir, paths in groups.items():
+                try:
+                    archive_files(day_dir, paths)
+                except OSError as e:
+                    log(None, None, f"Housekeeping ERROR: archív {day_dir}{ARCHIVE_SUFFIX} :: {e}", "housekeeping", "error")
+                    continue
+                for path in paths:
+                    self.forget(path)
+                self.count("archived", len(paths))
+        self.prune(today)
+
+        if done:
+            files, archives = self.scan()
+        spool = self.spool_size()
+        if self.quota:
+            files, archives = self.enforce_quota(files, archives, spool)
+        self.update_usage(files, archives, spool)
+        return dict(self.counts, checks=checks)
+
+    def prune(self, today):
+        """Zmaže prázdne adresáre uplynulých dní; dnešný môže práve vytvárať save_entries."""
+        for radio in os.listdir(self.data_dir):
+            radio_dir = os.path.join(self.data_dir, radio)
+            if radio.startswith(".") or not os.path.isdir(radio_dir):
+                continue
+            for root, dirs, names in os.walk(radio_dir, topdown=False):
+                # <RADIO>/<typ>/<deň>, deň môže mať viac úrovní (ymd)
+                parts = os.path.relpath(root, self.data_dir).split(os.sep)
+                parsed = parse_partition("/".join(parts[2:])) if len(parts) > 2 else None
+                if names or parsed is None or time.localtime(parsed[1])[:3] >= today:
+                    continue
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    # Neprázdny (podadresár) alebo práve zapisovaný
+                    pass
+
+    def _remove(self, path):
+        self.forget(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def enforce_quota(self, files, archives, spool=0):
+        # Spool sa ráta do celkového objemu, uvoľniť miesto ale možno len v data/
+        total = spool + sum(stat.st_size for _, stat in archives) + sum(stat.st_size for _, _, stat, _ in files)
+        if total <= self.quota:
+            return files, archives
+        # Najprv archívy (už sú v R2), potom dávky bez upload úlohy a až nakoniec neodoslané, vždy od najstaršej
+        oldest = lambda item: item[1].st_mtime
+        victims = sorted(archives, key=oldest)
+        for waiting in (False, True):
+            victims += sorted([(path, stat, pending) for path, _, stat, pending in files if pending == waiting], key=oldest)
+        evicted = set()
+        lost = 0
+        for victim in victims:
+            if total <= self.quota:
+                break
+            path, stat = victim[0], victim[1]
+            if not self._remove(path):
+                continue
+            total -= stat.st_size
+            evicted.add(path)
+            if len(victim) == 3 and victim[2]:
+                lost += 1
+        self.count("evicted", len(evicted))
+        log(None, None, f"Housekeeping: data/ a spool/ nad kvótou {self.quota / 1024 / 1024:.0f} MB, zmazaných {len(evicted)} "
+            f"najstarších súborov, z toho {lost} ešte nenahratých", "housekeeping", "error" if lost else "warning")
+        return [item for item in files if item[0] not in evicted], [item for item in archives if item[0] not in evicted]
+
+    def update_usage(self, files, archives, spool=0):
+        usage = {"pending": 0, "local": 0, "archives": sum(stat.st_size for _, stat in archives), "spool": spool}
+        for _, _, stat, pending in files:
+            usage["pending" if pending else "local"] += stat.st_size
+        with self.lock:
+            self.usage = usage
+
+    def usage_samples(self):
+        with self.lock:
+            return [({"kind": kind}, value) for kind, value in self.usage.items()]
+
+    def free_bytes(self):
+        return shutil.disk_usage(self.data_dir).free
+
+    def run(self):
+        while True:
+            try:
+                started = time.monotonic()
+                result = self.sweep()
+                log(None, None, f"Housekeeping hotový za {time.monotonic() - started:.1f} s: {result}, "
+                    f"data/ a spool/ {sum(self.usage.values()) / 1024 / 1024:.1f} MB", "housekeeping")
+            except Exception as e:
+                log(None, None, f"Housekeeping ERROR: {e}", "housekeeping", "error")
+            time.sleep(self.interval)
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
@@ -0,0 +1,138 @@
+"""
+Neblokujúci log: volajúci len vloží udalosť do fronty, formátovanie času
+a zápis na stdout robí vlákno na pozadí.
+
+LOG_FORMAT = "text" (pôvodný tvar riadkov) alebo "json" (jeden objekt na
+riadok s poľami ts, level, station, session, kind, msg a ďalšími).
+LOG_RATE_LIMITS obmedzí časté druhy udalostí na jednu za N sekúnd a
+stanicu, napr. "listeners=60"; potlačené riadky sa zrátajú do poľa
+suppressed ďalšieho vypísaného. Pri plnej fronte sa udalosti zahodia
+(počítadlo dropped), príjem dát sa nikdy nezdrží.
+"""
+import atexit
+import datetime
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+ZONE = ZoneInfo("Europe/Bratislava")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_QUEUE_SIZE = 10000
+LOG_FLUSH_TIMEOUT = 2.0
+
+
+def parse_rate_limits(value):
+    """"listeners=60,song=0" -> {"listeners": 60.0, "song": 0.0}"""
+    limits = {}
+    for part in filter(None, (item.strip() for item in value.split(","))):
+        kind, _, seconds = part.partition("=")
+        limits[kind.strip()] = float(seconds)
+    return limits
+
+
+LOG_RATE_LIMITS = parse_rate_limits(os.getenv("LOG_RATE_LIMITS", ""))
+
+
+class Logger:
+    def __init__(self, stream=None, fmt=LOG_FORMAT, rate_limits=None, queue_size=LOG_QUEUE_SIZE):
+        self.stream = stream
+        self.fmt = fmt
+        self.rate_limits = dict(rate_limits or {})
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.last_emitted = {}
+        self.suppressed = {}
+        self.dropped = 0
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        return self
+
+    def _allow(self, kind, station, now):
+        # Volá sa na vlákne volajúceho - len slovník a porovnanie času
+        interval = self.rate_limits.get(kind)
+        if not interval:
+            return True, 0
+        key = (kind, station)
+        with self.lock:
+            if now - self.last_emitted.get(key, float("-inf")) < interval:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return False, 0
+            self.last_emitted[key] = now
+            return True, self.suppressed.pop(key, 0)
+
+    def log(self, station, session_id, msg, kind="info", level="info", **fields):
+        now = time.time()
+        allowed, suppressed = self._allow(kind, station, now)
+        if not allowed:
+            return
+        if suppressed:
+            fields["suppressed"] = suppressed
+        if self.thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait((now, level, station, session_id, kind, msg, fields))
+        except queue.Full:
+            self.dropped += 1
+
+    def format(self, event):
+        now, level, station, session_id, kind, msg, fields = event
+        if self.fmt == "json":
+            record = {
+                "ts": datetime.datetime.fromtimestamp(now, ZONE).isoformat(),
+                "level": level,
+                "station": station,
+                "session": session_id or "",
+                "kind": kind,
+                "msg": msg,
+            }
+            record.update(fields)
+            return json.dumps(record, ensure_ascii=False, default=str)
+        stamp = datetime.datetime.fromtimestamp(now, ZONE).strftime('%d.%m.%Y %H:%M:%S')
+        suffix = f" (potlačených {fields['suppressed']})" if "suppressed" in fields else ""
+        if station is None:
+            return f"[{stamp}] {msg}{suffix}"
+        return f"[{stamp}] [{station}{' ' * (8 - len(station))} {session_id or ''}] {msg}{suffix}"
+
+    def _write(self, lines):
+        stream = self.stream or sys.stdout
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def _run(self):
+        while True:
+            lines = [self.format(self.queue.get())]
+            # Čo sa nazbieralo, zapíšeme naraz jedným write
+            while len(lines) < 1000:
+                try:
+                    lines.append(self.format(self.queue.get_nowait()))
+                except queue.Empty:
+                    break
+            self._write(lines)
+            for _ in lines:
+                self.queue.task_done()
+
+    def flush(self, timeout=LOG_FLUSH_TIMEOUT):
+        """Počká, kým vlákno vypíše frontu (najviac timeout sekúnd)."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+LOGGER = Logger(rate_limits=LOG_RATE_LIMITS)
+atexit.register(LOGGER.flush)
+
+
+def log(station, session_id, msg, kind="info", level="info", **fields):
+    LOGGER.log(station, session_id, msg, kind, level, **fields)
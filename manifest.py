@@ -0,0 +1,173 @@
+"""
+Denné manifesty objektov jednej stanice: bronze/<RADIO>/_manifest/<deň>.json.
+
+Po každom úspešnom uploade sa do manifestu stanice a dňa pridá záznam
+objektu - kľúč, typ, počet záznamov, bajty, sha256 a rozsah recorded_at.
+Čitateľ tak jedným GET zistí, ktoré objekty pokrývajú hľadaný čas, bez
+LIST celého prefixu a otvárania súborov.
+
+Zápis je GET + zlúčenie podľa kľúča + PUT, opakovaný upload toho istého
+objektu manifest nezdvojí. Súbežné uploady do jedného manifestu sa zlúčia
+do jedného zápisu (čakajúci zapíše aj záznamy ostatných). PUT je podmienený
+ETagom z GET, zápis iného procesu (starý vlastník shardu, backfill) medzi
+GET a PUT sa nestratí - manifest sa načíta a zlúči znova.
+"""
+import datetime
+import json
+import os
+import random
+import threading
+import time
+import metrics
+import writer
+from record import Record, iso_time
+
+# Rozloženie dátumovej časti kľúča: "dmy" = pôvodné 04-11-2025, "ymd" = triediteľné 2025/11/04
+PARTITION_LAYOUTS = {"dmy": "%d-%m-%Y", "ymd": "%Y/%m/%d"}
+PARTITION_LAYOUT = os.getenv("PARTITION_LAYOUT", "dmy")
+MANIFEST_DIR = "_manifest"
+# Zámky manifestov sa delia podľa hashu kľúča, počet nerastie s počtom dní
+MANIFEST_LOCKS = 16
+# Pokusy o podmienený zápis, kým manifest mení iný proces; potom sa zopakuje celá úloha
+MANIFEST_RETRIES = 10
+MANIFEST_RETRY_DELAY = 0.2
+# Časové polia agregácií podľa typu dávky; surové záznamy majú len metadáta zberača
+TIME_FIELDS = {"listeners_rollup": ("window_start",), "song_session": ("started_at", "ended_at")}
+
+
+def check_layout(layout):
+    if layout not in PARTITION_LAYOUTS:
+        raise ValueError(f"Neznáme rozloženie partícií: {layout}")
+
+
+def partition(timestamp, layout=PARTITION_LAYOUT):
+    return time.strftime(PARTITION_LAYOUTS[layout], time.localtime(timestamp))
+
+
+def parse_partition(day):
+    """(rozloženie, epoch poludnia dňa) z dátumovej časti kľúča, None ak nesedí žiadne rozloženie."""
+    for layout, fmt in PARTITION_LAYOUTS.items():
+        try:
+            parsed = time.strptime(day, fmt)
+        except ValueError:
+            continue
+        # Poludnie je v ten istý deň aj pri zmene letného času
+        return layout, time.mktime(parsed[:3] + (12, 0, 0, 0, 0, -1))
+    return None
+
+
+def manifest_key(radio_name, day):
+    return f"bronze/{radio_name}/{MANIFEST_DIR}/{day}.json"
+
+
+def _parse_time(value):
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _timestamps(entry, typ):
+    if isinstance(entry, Record):
+        yield entry.recorded_at
+        fields, source = ("last_seen",), entry.extra or {}
+    elif typ in TIME_FIELDS:
+        fields, source = TIME_FIELDS[typ], entry
+    else:
+        # recorded_at dopĺňa Record.to_dict, last_seen len kompakcia (s repeat_count); rovnaké
+        # polia v payloade stanice sa neberú
+        fields, source = ("recorded_at", "last_seen") if "repeat_count" in entry else ("recorded_at",), entry
+    for field in fields:
+        # Nečitateľný čas sa preskočí, inak by dávka nikdy neprešla flushom
+        value = _parse_time(source.get(field))
+        if value is not None:
+            yield value
+
+
+def time_range(entries, typ):
+    """Najskorší a najneskorší čas záznamov dávky ako ISO reťazce."""
+    low = high = None
+    for entry in entries:
+        for value in _timestamps(entry, typ):
+            if low is None or value < low:
+                low = value
+            if high is None or value > high:
+                high = value
+    return (iso_time(low), iso_time(high)) if low is not None else (None, None)
+
+
+def manifest_info(entries, radio_name, typ, timestamp, layout=PARTITION_LAYOUT):
+    """Údaje o dávke pre manifest; uloží sa s upload úlohou a zapíše po uploade."""
+    low, high = time_range(entries, typ)
+    return {
+        "key": manifest_key(radio_name, partition(timestamp, layout)),
+        "station": radio_name,
+        "date": time.strftime("%Y-%m-%d", time.localtime(timestamp)),
+        "type": typ,
+        "records": len(entries),
+        "min_recorded_at": low,
+        "max_recorded_at": high,
+    }
+
+
+def manifest_entry(r2_key, checksum, info, size):
+    return {
+        "key": r2_key,
+        "type": info["type"],
+        "records": info["records"],
+        "bytes": size,
+        "sha256": checksum,
+        "min_recorded_at": info["min_recorded_at"],
+        "max_recorded_at": info["max_recorded_at"],
+        "uploaded_at": iso_time(time.time()),
+    }
+
+
+class ManifestWriter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.key_locks = [threading.Lock() for _ in range(MANIFEST_LOCKS)]
+
+    def add(self, job, size):
+        """Pridá nahraný objekt do manifestu; pri chybe R2 výnimka prepadne (úloha sa zopakuje)."""
+        info = job["manifest"]
+        self.add_batch(info, [manifest_entry(job["r2_key"], job["checksum"], info, size)])
+
+    def add_batch(self, info, entries):
+        """Pridá viac objektov do manifestu info["key"] jedným zápisom."""
+        key = info["key"]
+        with self.lock:
+            pending = self.pending.setdefault(key, {})
+            for entry in entries:
+                pending[entry["key"]] = entry
+        with self.key_locks[hash(key) % MANIFEST_LOCKS]:
+            with self.lock:
+                batch = self.pending.pop(key, None)
+            # Záznam už zapísalo iné vlákno spolu so svojím
+            if not batch:
+                return
+            try:
+                self._write(key, info, batch)
+            except Exception:
+                with self.lock:
+                    for object_key, value in batch.items():
+                        self.pending.setdefault(key, {}).setdefault(object_key, value)
+                metrics.MANIFEST_WRITES.inc(station=info["station"], result="error")
+                raise
+        metrics.MANIFEST_WRITES.inc(station=info["station"], result="ok")
+
+    def _write(self, key, info, batch):
+        for _ in range(MANIFEST_RETRIES):
+            data, etag = writer.download_object(key)
+            manifest = json.loads(data) if data else {"station": info["station"], "date": info["date"], "objects": []}
+            objects = {obj["key"]: obj for obj in manifest["objects"]}
+            objects.update(batch)
+            manifest["objects"] = sorted(objects.values(), key=lambda obj: obj["key"])
+            manifest["updated_at"] = iso_time(time.time())
+            if writer.upload_bytes(json.dumps(manifest, ensure_ascii=False).encode("utf-8"), key, etag=etag, create=etag is None):
+                return
+            metrics.MANIFEST_WRITES.inc(station=info["station"], result="conflict")
+            # Náhodný odstup, aby sa súbežní zapisovatelia neprebíjali znova v tom istom takte
+            time.sleep(random.uniform(0, MANIFEST_RETRY_DELAY))
+        raise RuntimeError(f"Manifest {key}: {MANIFEST_RETRIES} zápisov prebil súbežný zápis")
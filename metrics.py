@@ -0,0 +1,206 @@
+"""
+Metriky v textovom formáte Prometheus na lokálnom porte (GET /metrics).
+
+Counter a Histogram sa menia priamo v kóde príjmu a uploadu (len zámok a
+slovník), Gauge môže mať collector - funkciu, ktorá hodnoty vráti až pri
+scrape (hĺbka cache, vek poslednej skladby), takže hot path nič nestojí.
+
+    METRICS_PORT=9108 python app.py
+    curl localhost:9108/metrics
+"""
+import bisect
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from logger import log
+
+# Len lokálne ako admin API; pre scrape z iného stroja METRICS_HOST=0.0.0.0
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# 0 = endpoint vypnutý
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPLOAD_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+REGISTRY = []
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or ())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, (), value) for key, value in self.values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{format_labels(self.labels, key, extra)} {format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), collector=None):
+        super().__init__(name, help, labels)
+        self.collector = collector
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+    def set_collector(self, collector):
+        """collector() vracia [(labels dict, hodnota), ...] v čase scrape."""
+        self.collector = collector
+
+    def samples(self):
+        if self.collector is None:
+            return super().samples()
+        return [(self.name, self.key(labels), (), value) for labels, value in self.collector()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self.values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key, (("le", format_value(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", key, (), total))
+            samples.append((f"{self.name}_count", key, (), count))
+        return samples
+
+
+def render():
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        # Obsadený port nesmie zastaviť zber dát, collector beží ďalej bez metrík
+        log(None, None, f"Metrics ERROR: endpoint {host}:{port} sa nepodarilo otvoriť :: {e}", "metrics", "error")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Príjem dát
+POLL_SECONDS = Histogram("radio_poll_seconds", "Trvanie HTTP pollu stanice", ("station", "type"))
+HANDLE_SECONDS = Histogram(
+    "radio_handle_seconds", "Spracovanie prijatej správy až po zápis do cache", ("station", "type"),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+HTTP_RESPONSES = Counter("radio_http_responses_total", "HTTP odpovede pollu podľa statusu", ("station", "type", "status"))
+POLL_ERRORS = Counter("radio_poll_errors_total", "Výnimky pri polle a príjme", ("station", "type", "exception"))
+WS_RECONNECTS = Counter("radio_ws_reconnects_total", "Ukončené WebSocket spojenia (reconnect)", ("station",))
+RECORDS = Counter("radio_records_total", "Záznamy zapísané do cache", ("station", "type", "valid"))
+SONG_CHANGES = Counter("radio_song_changes_total", "Zaznamenané nové skladby", ("station",))
+SONG_AGE = Gauge("radio_seconds_since_song_change", "Sekundy od poslednej novej skladby", ("station",))
+WEBHOOK_MESSAGES = Counter("radio_webhook_messages_total", "Webhook správy podľa výsledku", ("station", "type", "result"))
+
+# Cache a flush
+CACHE_RECORDS = Gauge("radio_cache_records", "Záznamy čakajúce na flush", ("station", "type"))
+CACHE_BYTES = Gauge("radio_cache_bytes", "Bajty čakajúce na flush", ("station", "type"))
+CACHE_OLDEST_AGE = Gauge("radio_cache_oldest_age_seconds", "Vek najstaršieho záznamu v cache", ("station", "type"))
+RECORDS_COMPACTED = Counter("radio_records_compacted_total", "Záznamy zlúčené do opakovaní pred zápisom", ("station", "type"))
+FLUSHES = Counter("radio_flushes_total", "Flushe cache podľa výsledku", ("station", "type", "result"))
+
+# Upload do R2
+UPLOAD_SECONDS = Histogram("radio_upload_seconds", "Trvanie uploadu súboru do R2", ("station",), buckets=UPLOAD_BUCKETS)
+UPLOAD_BYTES = Counter("radio_upload_bytes_total", "Nahrané bajty", ("station",))
+UPLOADS = Counter("radio_uploads_total", "Uploady podľa výsledku (ok, skipped, failed, lost)", ("station", "result"))
+UPLOAD_PENDING = Gauge("radio_upload_pending", "Úlohy v upload fronte vrátane opakovaní")
+MANIFEST_WRITES = Counter("radio_manifest_writes_total", "Zápisy denných manifestov podľa výsledku", ("station", "result"))
+LOG_DROPPED = Gauge("radio_log_dropped", "Logové udalosti zahodené pri plnej fronte")
+
+# Lokálny data/ adresár (housekeeping)
+DATA_BYTES = Gauge("radio_data_bytes", "Bajty v DATA_DIR a spool/ podľa druhu (pending, local, archives, spool)", ("kind",))
+DISK_FREE_BYTES = Gauge("radio_disk_free_bytes", "Voľné miesto na disku s DATA_DIR")
+HOUSEKEEPING_FILES = Counter(
+    "radio_housekeeping_files_total", "Súbory spracované housekeepingom (deleted, archived, evicted, reshipped)", ("action",)
+)
+
+
+def station_from_key(r2_key):
+    """bronze/ROCK/song/... -> ROCK"""
+    parts = r2_key.split("/")
+    return parts[1] if len(parts) > 2 else ""
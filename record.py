@@ -0,0 +1,48 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+ZONE = ZoneInfo("Europe/Bratislava")
+# Približná veľkosť metadát záznamu v JSON bajtoch (recorded_at, raw_valid, song_session_id)
+META_SIZE = 110
+
+
+def iso_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, ZONE).isoformat()
+
+
+class Record:
+    """
+    Obálka jedného prijatého záznamu.
+
+    Drží referenciu na dekódovaný payload (bez kópie) a metadáta zvlášť;
+    do jedného JSON objektu sa spoja až pri zápise (to_dict). Payload sa po
+    prijatí nesmie meniť - ten istý objekt môže zdieľať viac záznamov.
+    """
+
+    __slots__ = ("payload", "station", "recorded_at", "valid", "song_session_id", "error", "extra")
+
+    def __init__(self, payload, station, recorded_at, valid, song_session_id="", error=None, extra=None):
+        self.payload = payload
+        self.station = station
+        # Epoch sekundy, na ISO čas sa prevádza až pri serializácii
+        self.recorded_at = recorded_at
+        self.valid = valid
+        self.song_session_id = song_session_id
+        self.error = error
+        self.extra = extra
+
+    def to_dict(self):
+        entry = dict(self.payload) if isinstance(self.payload, dict) else {"payload": self.payload}
+        entry["recorded_at"] = iso_time(self.recorded_at)
+        entry["raw_valid"] = self.valid
+        entry["song_session_id"] = self.song_session_id
+        if self.error is not None:
+            entry["raw_error"] = self.error
+        if self.extra:
+            entry.update(self.extra)
+        return entry
+
+
+def as_dict(entry):
+    """Záznam pripravený na JSON: Record sa spojí, dict (napr. zo spoolu) ostáva."""
+    return entry.to_dict() if isinstance(entry, Record) else entry
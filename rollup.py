@@ -0,0 +1,163 @@
+"""
+Priebežné agregácie počtu poslucháčov po časových oknách (minúta, hodina)
+a po skladbách (song session).
+
+Každé platné pozorovanie (poll odpoveď, webhook správa, WebSocket rámec)
+sa hneď započíta do otvoreného okna - na okno sa drží len min, max, súčet,
+počet a posledná hodnota, pamäť je teda konštantná. Okno sa uzavrie, keď
+príde vzorka z ďalšieho okna alebo pri kontrole flushu po jeho konci;
+uzavreté okno ide ako jeden záznam do vlastnej cache (listeners_rollup).
+
+Okno uzavreté predčasne (pauza, odovzdanie stanice inému procesu) má
+"partial": true. Ten istý interval potom môže prísť dvakrát a zlúči sa
+podľa (window_start, window_seconds): min z min, max z max, priemer vážený
+počtom vzoriek a last zo záznamu s neskorším last_at. Súhrny skladieb sa
+zlučujú rovnako podľa song_session_id.
+"""
+import os
+import threading
+from record import iso_time
+
+# Dĺžky okien v sekundách, prázdna hodnota agregácie vypne
+LISTENERS_ROLLUP_WINDOWS = tuple(int(size) for size in os.getenv("LISTENERS_ROLLUP_WINDOWS", "60,3600").split(",") if size.strip())
+
+
+class RollupWindow:
+    __slots__ = ("start", "min", "max", "sum", "count", "first", "last", "last_at")
+
+    def __init__(self, start, value, now):
+        self.start = start
+        self.min = self.max = self.sum = self.first = self.last = value
+        self.count = 1
+        self.last_at = now
+
+    def add(self, value, now):
+        if value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+        self.sum += value
+        self.count += 1
+        self.last = value
+        self.last_at = now
+
+
+class ListenerRollup:
+    """
+    Otvorené okná jednej stanice pre všetky dĺžky z windows.
+
+    Okná sú zarovnané na násobky svojej dĺžky od epochy, teda na celé
+    minúty a hodiny (aj v miestnom čase, posun zóny je v celých hodinách).
+    """
+
+    def __init__(self, cache, windows=LISTENERS_ROLLUP_WINDOWS):
+        self.cache = cache
+        self.sizes = tuple(windows)
+        self.lock = threading.Lock()
+        self.open = {}
+
+    def add(self, value, now):
+        with self.lock:
+            for size in self.sizes:
+                window = self.open.get(size)
+                start = now - now % size
+                if window is not None and start > window.start:
+                    self._emit(size, window, False)
+                    window = None
+                if window is None:
+                    self.open[size] = RollupWindow(start, value, now)
+                else:
+                    # Oneskorená vzorka z už uzavretého okna sa započíta do otvoreného
+                    window.add(value, now)
+
+    def close_due(self, now):
+        """Uzavrie okná, ktorých koniec už uplynul."""
+        with self.lock:
+            for size, window in list(self.open.items()):
+                if window.start + size <= now:
+                    self._emit(size, self.open.pop(size), False)
+
+    def close_all(self, now):
+        """Uzavrie všetky okná, aj nedokončené (pred pauzou alebo odovzdaním)."""
+        with self.lock:
+            for size, window in list(self.open.items()):
+                self._emit(size, self.open.pop(size), window.start + size > now)
+
+    def _emit(self, size, window, partial):
+        entry = {
+            "window_start": iso_time(window.start),
+            "window_seconds": size,
+            "listeners_min": window.min,
+            "listeners_max": window.max,
+            "listeners_mean": round(window.sum / window.count, 2),
+            "listeners_last": window.last,
+            "samples": window.count,
+            "last_at": iso_time(window.last_at),
+        }
+        if partial:
+            entry["partial"] = True
+        self.cache.append(entry)
+
+
+class SongSessionSummary:
+    """
+    Súhrn poslucháčov počas práve hranej skladby jednej stanice.
+
+    rotate() pri novej skladbe odošle súhrn predchádzajúcej a otvorí nový;
+    add() započíta platnú vzorku poslucháčov. Drží sa len jedna otvorená
+    session, vzorky sa nehromadia.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.session_id = None
+        self.song = None
+        self.started_at = None
+        self.window = None
+
+    def rotate(self, session_id, song, now):
+        with self.lock:
+            if self.session_id is not None and self.started_at is not None:
+                self._emit(now, False)
+            self.session_id = session_id
+            self.song = song
+            self.started_at = now
+            self.window = None
+
+    def add(self, value, now):
+        with self.lock:
+            if self.session_id is None:
+                return
+            if self.started_at is None:
+                self.started_at = now
+            if self.window is None:
+                self.window = RollupWindow(self.started_at, value, now)
+            else:
+                self.window.add(value, now)
+
+    def close(self, now):
+        """Odošle rozbehnutú session ako partial; ďalšie vzorky ju doplnia novým súhrnom."""
+        with self.lock:
+            if self.session_id is not None and self.started_at is not None:
+                self._emit(now, True)
+                self.started_at = None
+                self.window = None
+
+    def _emit(self, now, partial):
+        window = self.window
+        entry = {
+            "song_session_id": self.session_id,
+            "started_at": iso_time(self.started_at),
+            "ended_at": iso_time(now),
+            "song": self.song,
+            "listeners_min": window.min if window else None,
+            "listeners_max": window.max if window else None,
+            "listeners_mean": round(window.sum / window.count, 2) if window else None,
+            "listeners_first": window.first if window else None,
+            "listeners_last": window.last if window else None,
+            "samples": window.count if window else 0,
+        }
+        if partial:
+            entry["partial"] = True
+        self.cache.append(entry)
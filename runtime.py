@@ -0,0 +1,32 @@
+import asyncio
+import aiohttp
+
+HTTP_TIMEOUT = 5
+HTTP_POOL_LIMIT = 100
+
+
+async def upload_loop(radio_dict, flush, resume=None, check_interval=10):
+    # boto3 a zápis na disk sú blokujúce, preto bežia v executore mimo event loopu
+    if resume:
+        await asyncio.to_thread(resume, radio_dict)
+    while True:
+        await asyncio.sleep(check_interval)
+        await asyncio.to_thread(flush, radio_dict)
+
+
+async def run_stations(workers, radio_dicts, flush, resume=None, check_interval=10):
+    """
+    Spustí všetky stanice ako korutiny na jednom event loope.
+
+    :param workers: inštancie workerov s metódou run(session)
+    :param radio_dicts: konfigurácie staníc (pre upload slučky)
+    :param flush: funkcia, ktorá uloží a odošle cache jednej stanice, ak je flush na rade
+    :param resume: voliteľná funkcia, ktorá po štarte odošle nedokončené dáta
+    :param check_interval: ako často (s) sa kontrolujú podmienky flushu
+    """
+    connector = aiohttp.TCPConnector(limit=HTTP_POOL_LIMIT, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = [asyncio.create_task(worker.run(session)) for worker in workers]
+        tasks += [asyncio.create_task(upload_loop(radio_dict, flush, resume, check_interval)) for radio_dict in radio_dicts]
+        await asyncio.gather(*tasks)
@@ -0,0 +1,153 @@
+"""
+Rozdelenie staníc medzi viac procesov (aj na viacerých strojoch).
+
+Každý člen sa periodicky hlási do zdieľanej SQLite databázy (SHARD_DB).
+Živí členovia tvoria konzistentný hash ring, ktorý určí vlastníka každej
+stanice. Stanicu však zbiera len ten, kto drží jej lease - záznam v tabuľke
+leases s časom expirácie, ktorý vlastník obnovuje pri každom heartbeate.
+Nový vlastník ju preto prevezme až keď ju pôvodný uvoľní (po flushi) alebo
+keď jeho lease vyprší (proces zomrel), takže stanica nikdy nebeží dvakrát.
+
+Lepkavé kľúče (sticky) sa na ring nedávajú: drží ich ten, kto ich získa
+prvý, až do svojho konca. Tak sa pripína webhook server na jeden proces.
+Časy sú epoch sekundy, pri viacerých strojoch musia mať synchronizované
+hodiny a SHARD_DB na zdieľanom disku.
+"""
+import bisect
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+SHARD_DB = os.getenv("SHARD_DB", "data/shards.sqlite")
+# Ako často člen obnovuje heartbeat a leasy (s)
+SHARD_HEARTBEAT = float(os.getenv("SHARD_HEARTBEAT", "5"))
+# Po koľkých sekundách bez obnovy sa člen aj jeho leasy považujú za mŕtve
+SHARD_LEASE_TTL = float(os.getenv("SHARD_LEASE_TTL", "30"))
+# Virtuálne body na člena - rovnomernejšie rozdelenie a menší presun pri zmene
+SHARD_VNODES = 64
+
+
+def ring_hash(value):
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    def __init__(self, nodes, vnodes=SHARD_VNODES):
+        self.points = sorted((ring_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self.hashes = [point[0] for point in self.points]
+
+    def owner(self, key):
+        if not self.points:
+            return None
+        index = bisect.bisect(self.hashes, ring_hash(key)) % len(self.points)
+        return self.points[index][1]
+
+
+class LeaseStore:
+    def __init__(self, path=SHARD_DB, ttl=SHARD_LEASE_TTL):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS members (node TEXT PRIMARY KEY, seen REAL NOT NULL)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            return self.db.execute(sql, params)
+
+    def heartbeat(self, node, now):
+        self._execute("INSERT OR REPLACE INTO members (node, seen) VALUES (?, ?)", (node, now))
+
+    def members(self, now):
+        self._execute("DELETE FROM members WHERE seen < ?", (now - self.ttl,))
+        return sorted(row[0] for row in self._execute("SELECT node FROM members").fetchall())
+
+    def leave(self, node):
+        self._execute("DELETE FROM members WHERE node = ?", (node,))
+
+    def acquire(self, name, node, now):
+        """Získa alebo obnoví lease; False, ak ho drží niekto iný a nevypršal."""
+        cursor = self._execute(
+            "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE leases.owner = excluded.owner OR leases.expires < ?",
+            (name, node, now + self.ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, name, node):
+        self._execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, node))
+
+    def leases(self):
+        return dict(self._execute("SELECT name, owner FROM leases").fetchall())
+
+
+class ShardMember:
+    """
+    Jeden člen shardingu: podľa ringu a leasov spúšťa a zastavuje stanice.
+
+    :param start: start(key) spustí stanicu a vráti jej handle
+    :param stop: stop(key, handle, release) ju zastaví; pri release=True
+        ide o odovzdanie a má dáta odoslať pred uvoľnením leasu
+    :param sticky: kľúče mimo ringu, drží ich prvý, kto ich získa
+    """
+
+    def __init__(self, store, node, keys, start, stop, sticky=(), log=None, heartbeat=SHARD_HEARTBEAT):
+        self.store = store
+        self.node = node
+        self.keys = list(keys)
+        self.sticky = list(sticky)
+        self.start_key = start
+        self.stop_key = stop
+        self.log = log or (lambda msg, level="info": None)
+        self.heartbeat = heartbeat
+        self.owned = {}
+        self.ticks = 0
+
+    def tick(self, now=None):
+        now = time.time() if now is None else now
+        self.store.heartbeat(self.node, now)
+        self.ticks += 1
+        # Lease, ktorý sa nepodarilo obnoviť, už môže mať iný člen - stanicu hneď zastavíme
+        for key in list(self.owned):
+            if not self.store.acquire(key, self.node, now):
+                self.log(f"Stratený lease {key}, stanica sa zastavuje", "error")
+                self.stop_key(key, self.owned.pop(key), False)
+        # Prvý tick len ohlási člena, aby súčasne štartujúci videli celý ring
+        if self.ticks == 1:
+            return
+        ring = HashRing(self.store.members(now))
+        desired = {key for key in self.keys if ring.owner(key) == self.node}
+        for key in list(self.owned):
+            if key in self.keys and key not in desired:
+                self.log(f"Odovzdávam {key} (vlastník {ring.owner(key)})")
+                self.stop_key(key, self.owned.pop(key), True)
+                self.store.release(key, self.node)
+        for key in sorted(desired) + self.sticky:
+            if key not in self.owned and self.store.acquire(key, self.node, now):
+                self.log(f"Preberám {key}")
+                try:
+                    self.owned[key] = self.start_key(key)
+                except Exception as e:
+                    # Napr. obsadený port webhookov; skúsime znova v ďalšom ticku
+                    self.log(f"Prevzatie {key} zlyhalo: {e}", "error")
+                    self.store.release(key, self.node)
+
+    def run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                self.tick()
+            except sqlite3.Error as e:
+                self.log(f"Chyba shard databázy: {e}", "error")
+            time.sleep(max(0.0, self.heartbeat - (time.monotonic() - started)))
+
+    def shutdown(self):
+        for key in list(self.owned):
+            self.stop_key(key, self.owned.pop(key), True)
+            self.store.release(key, self.node)
+        self.store.leave(self.node)
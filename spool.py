@@ -0,0 +1,253 @@
+import os
+import queue
+import threading
+import time
+import codec
+from logger import log
+from record import as_dict
+
+OPEN_SUFFIX = ".open"
+SEALED_SUFFIX = ".seg"
+
+FSYNC_RECORDS = 50
+FSYNC_INTERVAL = 1.0
+SEGMENT_RECORDS = 5000
+SEGMENT_BYTES = 8 * 1024 * 1024
+
+
+class Batch:
+    """Dávka záznamov na odoslanie; commit po úspešnom uploade, inak rollback."""
+
+    def __init__(self, entries, on_commit=None, on_rollback=None):
+        self.entries = entries
+        self.on_commit = on_commit
+        self.on_rollback = on_rollback
+
+    def commit(self):
+        if self.on_commit:
+            self.on_commit()
+
+    def rollback(self):
+        if self.on_rollback:
+            self.on_rollback()
+
+
+class SpoolWriter:
+    """
+    Vlákno, ktoré zapisuje do spoolov namiesto volajúceho.
+
+    V režime async by write a fsync v Spool.append zdržali event loop a s ním
+    všetky stanice; spool s writerom záznam len vloží do fronty.
+    """
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        return self
+
+    def submit(self, spool, record):
+        if self.thread is None:
+            self.start()
+        self.queue.put((spool, record))
+
+    def wait(self):
+        """Počká, kým sa zapíšu záznamy vložené do fronty pred týmto volaním."""
+        if self.thread is None:
+            self.start()
+        done = threading.Event()
+        self.queue.put((None, done))
+        done.wait()
+
+    def _run(self):
+        while True:
+            spool, record = self.queue.get()
+            if spool is None:
+                record.set()
+                continue
+            try:
+                spool.write(record)
+            except Exception as e:
+                log(None, None, f"Spool ERROR: {spool.directory} :: {e}", "spool", "error")
+
+
+class Spool:
+    """
+    Append-only spool záznamov jednej stanice a typu dát na disku.
+
+    Záznamy sa zapisujú ako JSON riadky do aktívneho segmentu (*.open), fsync
+    sa robí dávkovo po FSYNC_RECORDS záznamoch alebo FSYNC_INTERVAL sekundách.
+    Plný segment sa zapečatí (*.seg) a čaká na odoslanie. Po páde sa
+    nedokončené segmenty pri štarte zapečatia, takže sa nič nestratí.
+
+    Má metódu append ako list, dá sa teda priamo podať workerom ako cache.
+    S writerom (SpoolWriter) append len zaradí záznam, zápis a fsync spraví
+    vlákno writera; take_batch najprv počká na záznamy zaradené pred ním.
+    """
+
+    def __init__(self, directory, fsync_records=FSYNC_RECORDS, fsync_interval=FSYNC_INTERVAL,
+                 segment_records=SEGMENT_RECORDS, segment_bytes=SEGMENT_BYTES, writer=None):
+        self.directory = directory
+        self.writer = writer
+        self.fsync_records = fsync_records
+        self.fsync_interval = fsync_interval
+        self.segment_records = segment_records
+        self.segment_bytes = segment_bytes
+        self.lock = threading.Lock()
+        # Segmenty v rozpracovanej dávke, ďalší take_batch ich nevráti znova
+        self.taken = set()
+        self.active = None
+        self.active_path = None
+        self.active_records = 0
+        self.active_bytes = 0
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        # Záznamy čakajúce na odoslanie a čas (epoch) najstaršieho z nich
+        self.pending_records = 0
+        self.pending_bytes = 0
+        self.first_at = None
+        os.makedirs(directory, exist_ok=True)
+        self.seq = self._recover()
+
+    def _segment_path(self, seq, suffix):
+        return os.path.join(self.directory, f"{seq:012d}{suffix}")
+
+    def _recover(self):
+        last_seq = 0
+        for name in sorted(os.listdir(self.directory)):
+            stem, suffix = os.path.splitext(name)
+            if not stem.isdigit():
+                continue
+            last_seq = max(last_seq, int(stem))
+            if suffix == OPEN_SUFFIX:
+                path = os.path.join(self.directory, name)
+                self._truncate_partial(path)
+                os.replace(path, self._segment_path(int(stem), SEALED_SUFFIX))
+        for path in self.sealed_segments():
+            with open(path, "rb") as f:
+                data = f.read()
+            self.pending_records += data.count(b"\n")
+            self.pending_bytes += len(data)
+            mtime = os.path.getmtime(path)
+            self.first_at = mtime if self.first_at is None else min(self.first_at, mtime)
+        return last_seq + 1
+
+    @staticmethod
+    def _truncate_partial(path):
+        # Posledný riadok mohol byť pri páde zapísaný len čiastočne
+        with open(path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+
+    def append(self, record):
+        if self.writer is not None:
+            self.writer.submit(self, record)
+            return
+        self.write(record)
+
+    def write(self, record):
+        line = codec.dumps(as_dict(record)) + b"\n"
+        with self.lock:
+            if self.active is None:
+                self.active_path = self._segment_path(self.seq, OPEN_SUFFIX)
+                self.seq += 1
+                self.active = open(self.active_path, "ab")
+            self.active.write(line)
+            self.active.flush()
+            self.active_records += 1
+            self.active_bytes += len(line)
+            self.pending_records += 1
+            self.pending_bytes += len(line)
+            if self.first_at is None:
+                self.first_at = time.time()
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_records or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self._sync()
+            if self.active_records >= self.segment_records or self.active_bytes >= self.segment_bytes:
+                self._seal()
+
+    def _sync(self):
+        os.fsync(self.active.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def _seal(self):
+        if self.active is None:
+            return
+        self._sync()
+        self.active.close()
+        os.replace(self.active_path, self.active_path[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+        self.active = None
+        self.active_path = None
+        self.active_records = 0
+        self.active_bytes = 0
+
+    def seal(self):
+        with self.lock:
+            self._seal()
+
+    def sealed_segments(self):
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(SEALED_SUFFIX)
+        )
+
+    @staticmethod
+    def read_segment(path):
+        entries = []
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    entries.append(codec.loads(line))
+        return entries
+
+    @staticmethod
+    def remove(path):
+        os.remove(path)
+
+    def take_batch(self):
+        if self.writer is not None:
+            self.writer.wait()
+        # Segmenty mažeme až pri commite, po neúspešnom uploade ostanú na disku
+        with self.lock:
+            self._seal()
+            segments = [segment for segment in self.sealed_segments() if segment not in self.taken]
+            self.taken.update(segments)
+            taken = (self.pending_records, self.pending_bytes, self.first_at)
+            self.pending_records = 0
+            self.pending_bytes = 0
+            self.first_at = None
+        try:
+            entries = [entry for segment in segments for entry in self.read_segment(segment)]
+        except Exception:
+            with self.lock:
+                self.taken.difference_update(segments)
+            raise
+
+        def commit():
+            for segment in segments:
+                self.remove(segment)
+            with self.lock:
+                self.taken.difference_update(segments)
+
+        def rollback():
+            with self.lock:
+                self.taken.difference_update(segments)
+                self.pending_records += taken[0]
+                self.pending_bytes += taken[1]
+                if taken[2] is not None:
+                    self.first_at = taken[2] if self.first_at is None else min(self.first_at, taken[2])
+        return Batch(entries, on_commit=commit, on_rollback=rollback)
+
+    def depth(self):
+        with self.lock:
+            return {"records": self.pending_records, "bytes": self.pending_bytes, "oldest": self.first_at}
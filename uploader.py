@@ -0,0 +1,218 @@
+import contextlib
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import writer
+from logger import log
+from manifest import ManifestWriter
+import metrics
+
+UPLOAD_WORKERS = 4
+BASE_DELAY = 2.0
+MAX_DELAY = 600.0
+
+
+def fsync_file(path):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+class DelayQueue:
+    """Thread-safe fronta, z ktorej get vráti položku až po uplynutí jej oneskorenia."""
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+
+    def put(self, item, delay=0.0):
+        with self.cond:
+            heapq.heappush(self.heap, (time.monotonic() + delay, next(self.counter), item))
+            self.cond.notify()
+
+    def get(self):
+        with self.cond:
+            while True:
+                if self.heap:
+                    wait = self.heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        return heapq.heappop(self.heap)[2]
+                    self.cond.wait(wait)
+                else:
+                    self.cond.wait()
+
+    def __len__(self):
+        with self.cond:
+            return len(self.heap)
+
+
+class Uploader:
+    """
+    Pool upload vlákien s perzistentnou frontou opakovaní.
+
+    Každý upload je najprv zapísaný ako JSON úloha do queue_dir a zmaže sa až
+    po úspešnom uploade, takže neodoslané dávky prežijú reštart. Neúspešný
+    upload sa opakuje s exponenciálnym backoffom s jitterom (BASE_DELAY až
+    MAX_DELAY) donekonečna - dávka sa nikdy nezahodí. Kľúč v R2 je súčasťou
+    úlohy a objekt nesie sha256 v metadátach, opakovanie je preto idempotentné.
+    Úloha s údajmi "manifest" je hotová až po zápise objektu do denného manifestu.
+    Výnimkou je zmazaný lokálny súbor (kvóta disku) - taká úloha sa zruší.
+
+    :param on_done: on_done(job) po potvrdenom uploade a zmazaní úlohy, napr. zmazanie lokálneho súboru
+    """
+
+    def __init__(self, queue_dir, workers=UPLOAD_WORKERS, base_delay=BASE_DELAY, max_delay=MAX_DELAY, on_done=None):
+        self.queue_dir = queue_dir
+        self.workers = workers
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_done = on_done
+        self.queue = DelayQueue()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.started = False
+        self.manifests = ManifestWriter()
+        self.stats = {"uploaded": 0, "skipped": 0, "failed_attempts": 0, "lost": 0, "bytes": 0, "seconds": 0.0}
+        os.makedirs(queue_dir, exist_ok=True)
+
+    def _job_path(self, r2_key):
+        return os.path.join(self.queue_dir, hashlib.sha1(r2_key.encode("utf-8")).hexdigest() + ".json")
+
+    def start(self):
+        if self.started:
+            return
+        self.started = True
+        # Úlohy, ktoré nestihli prejsť pred reštartom
+        for name in sorted(os.listdir(self.queue_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(self.queue_dir, name), "r", encoding="utf-8") as f:
+                    self._enqueue(json.load(f))
+        for _ in range(self.workers):
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _enqueue(self, job, delay=0.0):
+        with self.lock:
+            self.in_flight += 1
+        self.queue.put(job, delay)
+
+    def submit(self, local_file_path, r2_key, fmt="json", manifest=None):
+        """
+        Zaradí súbor na upload; po návrate je úloha trvalo uložená na disku.
+
+        :param manifest: údaje dávky z manifest.manifest_info, None = bez manifestu
+        """
+        fsync_file(local_file_path)
+        job = {
+            "local_file": local_file_path,
+            "r2_key": r2_key,
+            "fmt": fmt,
+            "checksum": writer.file_checksum(local_file_path),
+            "attempts": 0,
+        }
+        if manifest is not None:
+            job["manifest"] = manifest
+        self._save_job(job)
+        self._enqueue(job)
+        return job
+
+    def _save_job(self, job):
+        path = self._job_path(job["r2_key"])
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _backoff(self, attempts):
+        # Full jitter: náhodne z intervalu <0, min(max, base * 2^n)>
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempts))
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            done = True
+            try:
+                self._upload(job)
+            except FileNotFoundError as e:
+                done = False
+                with self.lock:
+                    self.stats["lost"] += 1
+                metrics.UPLOADS.inc(station=metrics.station_from_key(job["r2_key"]), result="lost")
+                log(None, None, f"Upload zrušený, lokálny súbor už neexistuje: {job['local_file']} -> {job['r2_key']} :: {e}",
+                    "upload", "error", key=job["r2_key"])
+            except Exception as e:
+                job["attempts"] += 1
+                delay = self._backoff(job["attempts"])
+                with self.lock:
+                    self.stats["failed_attempts"] += 1
+                metrics.UPLOADS.inc(station=metrics.station_from_key(job["r2_key"]), result="failed")
+                log(None, None, f"Upload ERROR ({job['attempts']}. pokus, ďalší o {delay:.1f} s): {job['local_file']} -> {job['r2_key']} :: {e}",
+                    "upload", "error", key=job["r2_key"], attempts=job["attempts"])
+                # Bez uloženého počtu pokusov (napr. plný disk) sa úloha aj tak skúsi znova,
+                # po reštarte ju obnoví predchádzajúci súbor úlohy
+                try:
+                    self._save_job(job)
+                except OSError as save_error:
+                    log(None, None, f"Upload: uloženie úlohy zlyhalo: {job['r2_key']} :: {save_error}",
+                        "upload", "error", key=job["r2_key"])
+                self.queue.put(job, delay)
+                continue
+            # Úlohu s rovnakým r2_key už mohol zmazať iný upload; vlákno poolu nesmie skončiť
+            try:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._job_path(job["r2_key"]))
+            except OSError as e:
+                log(None, None, f"Upload: zmazanie úlohy zlyhalo: {job['r2_key']} :: {e}",
+                    "upload", "error", key=job["r2_key"])
+            with self.lock:
+                self.in_flight -= 1
+            if done and self.on_done is not None:
+                try:
+                    self.on_done(job)
+                except Exception as e:
+                    log(None, None, f"Upload on_done ERROR: {job['local_file']} :: {e}", "upload", "error", key=job["r2_key"])
+
+    def _upload(self, job):
+        # Objekt už môže byť nahraný (pád po uploade, pred zmazaním úlohy)
+        if job["attempts"] and writer.remote_checksum(job["r2_key"]) == job["checksum"]:
+            with self.lock:
+                self.stats["skipped"] += 1
+            metrics.UPLOADS.inc(station=metrics.station_from_key(job["r2_key"]), result="skipped")
+            if "manifest" in job:
+                self.manifests.add(job, os.path.getsize(job["local_file"]))
+            return
+        size = os.path.getsize(job["local_file"])
+        start = time.perf_counter()
+        writer.upload_file(job["local_file"], job["r2_key"], job["fmt"], job["checksum"])
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.stats["uploaded"] += 1
+            self.stats["bytes"] += size
+            self.stats["seconds"] += elapsed
+        station = metrics.station_from_key(job["r2_key"])
+        metrics.UPLOADS.inc(station=station, result="ok")
+        metrics.UPLOAD_BYTES.inc(size, station=station)
+        metrics.UPLOAD_SECONDS.observe(elapsed, station=station)
+        log(None, None, f"Upload OK: {job['local_file']} -> {writer.R2_BUCKET}/{job['r2_key']} "
+            f"({elapsed * 1000:.0f} ms, {size / 1024 / max(elapsed, 1e-6):.0f} KiB/s)",
+            "upload", key=job["r2_key"], bytes=size, seconds=round(elapsed, 3))
+        if "manifest" in job:
+            self.manifests.add(job, size)
+
+    def pending(self):
+        with self.lock:
+            return self.in_flight
+
+    def wait_idle(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
@@ -1,7 +1,17 @@
 import os
+import gzip
+import hashlib
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
+import codec
+from record import as_dict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Načítaj .env súbor (musí byť v root adresári)
 load_dotenv(dotenv_path=".env")
@@ -10,6 +20,10 @@ R2_ENDPOINT = os.getenv("R2_ENDPOINT")
 R2_KEY_ID = os.getenv("R2_KEY_ID")
 R2_SECRET = os.getenv("R2_SECRET")
 R2_BUCKET = os.getenv("R2_BUCKET")
+# Počet HTTP spojení klienta, musí pokryť všetky upload vlákna
+R2_POOL_CONNECTIONS = 16
+# Opakovania s backoffom rieši uploader.Uploader, botocore skúša len raz
+R2_MAX_ATTEMPTS = 1
 
 # Inicializácia klienta pre Cloudflare R2
 session = boto3.session.Session()
@@ -18,25 +32,145 @@ client = session.client(
     region_name='auto',
     endpoint_url=R2_ENDPOINT,
     aws_access_key_id=R2_KEY_ID,
-    aws_secret_access_key=R2_SECRET
+    aws_secret_access_key=R2_SECRET,
+    config=Config(
+        max_pool_connections=R2_POOL_CONNECTIONS,
+        retries={"mode": "standard", "max_attempts": R2_MAX_ATTEMPTS},
+    )
 )
 
-def upload_json_to_r2(local_file_path, r2_key):
+# Výstupné formáty: prípona súboru, Content-Type a Content-Encoding objektu v R2
+OUTPUT_FORMATS = {
+    "json": (".json", "application/json", None),
+    "ndjson": (".ndjson", "application/x-ndjson", None),
+    "ndjson.gz": (".ndjson.gz", "application/x-ndjson", "gzip"),
+    "ndjson.zst": (".ndjson.zst", "application/x-ndjson", "zstd"),
+}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+def check_format(fmt):
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Neznámy výstupný formát: {fmt}")
+    if fmt == "ndjson.zst" and zstandard is None:
+        raise RuntimeError("Formát ndjson.zst vyžaduje balík zstandard")
+
+def open_output(local_file_path, fmt):
+    if fmt == "ndjson.gz":
+        return gzip.open(local_file_path, "wb", compresslevel=GZIP_LEVEL)
+    if fmt == "ndjson.zst":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(open(local_file_path, "wb"))
+    return open(local_file_path, "wb")
+
+def write_entries(entries, local_file_path, fmt="json"):
+    """
+    Zapíše záznamy do lokálneho súboru vo zvolenom formáte.
+
+    NDJSON formáty sa serializujú a komprimujú po jednom zázname, celý výstup
+    sa nikdy nedrží v pamäti ako jeden reťazec.
+    """
+    if fmt == "json":
+        with open(local_file_path, "wb") as f:
+            f.write(codec.dumps([as_dict(entry) for entry in entries], indent=True))
+        return
+    with open_output(local_file_path, fmt) as f:
+        for entry in entries:
+            f.write(codec.dumps(as_dict(entry)) + b"\n")
+
+def format_of(local_file_path):
+    """Výstupný formát podľa prípony súboru, None ak prípona nie je známa."""
+    for fmt, (suffix, _, _) in sorted(OUTPUT_FORMATS.items(), key=lambda item: -len(item[1][0])):
+        if local_file_path.endswith(suffix):
+            return fmt
+    return None
+
+def read_entries(local_file_path, fmt="json"):
+    """Záznamy zo súboru zapísaného cez write_entries (ako dicty)."""
+    if fmt == "json":
+        with open(local_file_path, "rb") as f:
+            return codec.loads(f.read())
+    if fmt == "ndjson.gz":
+        f = gzip.open(local_file_path, "rb")
+    elif fmt == "ndjson.zst":
+        f = zstandard.ZstdDecompressor().stream_reader(open(local_file_path, "rb"))
+    else:
+        f = open(local_file_path, "rb")
+    with f:
+        return [codec.loads(line) for line in f.read().splitlines() if line.strip()]
+
+def file_checksum(local_file_path):
+    digest = hashlib.sha256()
+    with open(local_file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def remote_head(r2_key):
+    """Odpoveď HEAD objektu, None ak objekt neexistuje. Ostatné chyby R2 prepadnú volajúcemu."""
+    try:
+        return client.head_object(Bucket=R2_BUCKET, Key=r2_key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+def remote_checksum(r2_key):
+    """
+    Vráti sha256 uložený v metadátach objektu, None ak objekt neexistuje.
+    Ostatné chyby R2 prepadnú volajúcemu.
+    """
+    head = remote_head(r2_key)
+    if head is None:
+        return None
+    return head.get("Metadata", {}).get("sha256", "")
+
+def upload_file(local_file_path, r2_key, fmt="json", checksum=None):
+    """
+    Uploaduje lokálny súbor na Cloudflare R2, chyby neodchytáva.
+
+    :param checksum: sha256 súboru, uloží sa do metadát objektu (idempotentné opakovanie)
+    """
+    _, content_type, content_encoding = OUTPUT_FORMATS[fmt]
+    extra_args = {"ContentType": content_type}
+    if content_encoding:
+        extra_args["ContentEncoding"] = content_encoding
+    if checksum:
+        extra_args["Metadata"] = {"sha256": checksum}
+    with open(local_file_path, 'rb') as f:
+        client.upload_fileobj(f, R2_BUCKET, r2_key, ExtraArgs=extra_args)
+
+def download_bytes(r2_key):
+    """Obsah objektu, None ak neexistuje. Ostatné chyby R2 prepadnú volajúcemu."""
+    return download_object(r2_key)[0]
+
+def download_object(r2_key):
+    """(obsah, ETag) objektu, (None, None) ak neexistuje. Ostatné chyby R2 prepadnú volajúcemu."""
+    try:
+        response = client.get_object(Bucket=R2_BUCKET, Key=r2_key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None, None
+        raise
+    return response["Body"].read(), response["ETag"]
+
+def upload_bytes(data, r2_key, content_type="application/json", etag=None, create=False):
     """
-    Uploaduje lokálny JSON súbor na Cloudflare R2.
+    Uploaduje malý objekt z pamäte (manifest), ostatné chyby neodchytáva.
 
-    :param local_file_path: cesta k lokálnemu súboru
-    :param r2_key: cieľový klúč v R2 (napr. bronze/ROCK/song/04-11-2025/16-16-20.json)
-    :return: True ak upload prebehol úspešne, inak False
+    :param etag: zapíše len ak má objekt stále tento ETag (If-Match)
+    :param create: zapíše len ak objekt ešte neexistuje (If-None-Match: *)
+    :return: False ak podmienka nesedí (objekt medzitým zmenil iný zápis)
     """
+    conditions = {}
+    if etag is not None:
+        conditions["IfMatch"] = etag
+    if create:
+        conditions["IfNoneMatch"] = "*"
     try:
-        with open(local_file_path, 'rb') as f:
-            client.upload_fileobj(f, R2_BUCKET, r2_key)
-        print(f"Upload OK: {local_file_path} -> {R2_BUCKET}/{r2_key}")
-        return True
+        client.put_object(Bucket=R2_BUCKET, Key=r2_key, Body=data, ContentType=content_type, **conditions)
     except ClientError as e:
-        print(f"Upload ERROR: {local_file_path} -> {R2_BUCKET}/{r2_key} :: {e}")
-        return False
-    except Exception as e:
-        print(f"General ERROR during upload {local_file_path}: {e}")
-        return False
+        # 409 ConditionalRequestConflict: súbežný podmienený zápis toho istého kľúča
+        if conditions and e.response.get("Error", {}).get("Code") in ("412", "PreconditionFailed", "409", "ConditionalRequestConflict"):
+            return False
+        raise
+    return True